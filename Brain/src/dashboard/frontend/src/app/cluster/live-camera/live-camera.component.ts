@@ -41,8 +41,11 @@ import { WebSocketService} from '../../webSocket/web-socket.service'
 export class LiveCameraComponent {
   public image: string | undefined;
   public loading: boolean = true;
+  // 'serialCamera' (lanes) or 'YoloFrame' (detections), switched by a click on the image
+  public view: string = 'serialCamera';
   private canvasSize: number[] = [512, 270];
   private cameraSubscription: Subscription | undefined;
+  private yoloSubscription: Subscription | undefined;
 
   constructor( private  webSocketService: WebSocketService) { }
 
@@ -51,22 +54,40 @@ export class LiveCameraComponent {
     this.image = this.createBlackImage();
 
     this.cameraSubscription = this.webSocketService.receiveCamera().subscribe(
-      (message) => {
-        this.image = `data:image/png;base64,${message.value}`;
-        this.loading = false;
-      },
-      (error) => {
-        this.image = this.createBlackImage();
-        this.loading = true;
-        console.error('Error receiving disk usage:', error);
-      }
+      (message) => this.showFrame('serialCamera', message),
+      (error) => this.showError(error)
     );
+    this.yoloSubscription = this.webSocketService.receiveYoloCamera().subscribe(
+      (message) => this.showFrame('YoloFrame', message),
+      (error) => this.showError(error)
+    );
+  }
+
+  showFrame(view: string, message: any) {
+    if (view === this.view) {
+      this.image = `data:image/png;base64,${message.value}`;
+      this.loading = false;
+    }
+  }
+
+  showError(error: any) {
+    this.image = this.createBlackImage();
+    this.loading = true;
+    console.error('Error receiving camera frames:', error);
+  }
+
+  toggleView() {
+    this.view = this.view === 'serialCamera' ? 'YoloFrame' : 'serialCamera';
+    this.loading = true;
   }
 
   ngOnDestroy() {
     if (this.cameraSubscription) {
       this.cameraSubscription.unsubscribe();
     }
+    if (this.yoloSubscription) {
+      this.yoloSubscription.unsubscribe();
+    }
     this.webSocketService.disconnectSocket();
   }
 
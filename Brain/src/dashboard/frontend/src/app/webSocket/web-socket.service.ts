@@ -54,6 +54,7 @@ export class WebSocketService {
     'BatteryLvl',
     'ResourceMonitor',
     'serialCamera',
+    'YoloFrame',
     'Recording',
     'CurrentSpeed',
     'CurrentSteer',
@@ -124,6 +125,12 @@ export class WebSocketService {
     );
   }
 
+  receiveYoloCamera(): Observable<any> {
+    return this.webSocket.fromEvent('YoloFrame').pipe(
+      throttleTime(33, undefined, { leading: false, trailing: true })
+    );
+  }
+
   receiveLocation(): Observable<any> {
     return this.webSocket.fromEvent('Location');
   }
@@ -31,13 +31,17 @@ if __name__ == "__main__":
     sys.path.insert(0, "../../..")
 
 
-import psutil, json, logging, inspect, eventlet
+import psutil, json, logging, inspect, eventlet, base64, cv2
 from flask import Flask, request
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
 from enum import Enum
-from src.utils.messages.messageHandlerSubscriber import messageHandlerSubscriber
 from src.utils.messages.messageHandlerSender import messageHandlerSender
+from src.utils.messages.messageHandlerSubscriber import messageHandlerSubscriber
+from src.utils.messages.detections import DetectionFrame
+from src.utils.messages.frameBus import FrameBus
+from src.utils.messages.subscriberGroup import SubscriberGroup
+from src.utils.messages.subscriptionManifest import SubscriptionManifest
 from src.templates.workerprocess import WorkerProcess
 from src.utils.messages.allMessages import Semaphores
 from src.dashboard.threads.threadStartFrontend import ThreadStartFrontend  
@@ -63,6 +67,18 @@ class processDashboard(WorkerProcess):
         self.sendMessages = {}
         self.messagesAndVals = {}
 
+        # frame descriptors are turned into JPEG images only here, on the channel read by the frontend
+        self.frameChannels = {"HoughFrame": "serialCamera", "YoloFrame": "YoloFrame"}
+        self.frameBuses = {}
+        # wider frames are scaled down before the JPEG encoding, which runs in the eventlet loop: the frontend shows
+        # them at a few hundred pixels (the 2048x1080 YOLO frame took 9 ms to encode, at 1024x540 3 ms with the resize)
+        self.frameWidth = 1024
+        # the frame channels are subscribed only while a browser is connected: the camera draws them only for subscribers
+        self.frameSubscribers = {}
+        self.viewers = set()
+        # channels published by several processes, where every message matters (the others only need the newest value)
+        self.fifoChannels = {"BusMetrics"}
+
         self.memoryUsage = 0
         self.cpuCoreUsage = 0
         self.cpuTemperature = 0
@@ -82,6 +98,8 @@ class processDashboard(WorkerProcess):
 
         # define WebSocket event handlers
         self.socketio.on_event('message', self.handleMessage)
+        self.socketio.on_event('connect', self.handleConnect)
+        self.socketio.on_event('disconnect', self.handleDisconnect)
         self.socketio.on_event('save', self.handleSaveTableState)
         self.socketio.on_event('load', self.handleLoadTableState)
 
@@ -107,16 +125,28 @@ class processDashboard(WorkerProcess):
 
     def subscribe(self):
         """Subscribe function. In this function we make all the required subscribe to process gateway"""
+        # all the subscriptions are sent to the gateway at once, see SubscriptionManifest
+        self.subscriptions = SubscriptionManifest(self.queueList, "processDashboard")
         for name, enum in self.messagesAndVals.items():
-            if enum["owner"] != "Dashboard":
-                subscriber = messageHandlerSubscriber(self.queueList, enum["enum"], "lastOnly", True)
+            if name in self.frameChannels:
+                subscriber = messageHandlerSubscriber(self.queueList, enum["enum"], "lastOnly", receiver="processDashboard")
+                self.frameSubscribers[name] = subscriber
+                self.messages[name] = {"obj": subscriber}
+            elif enum["owner"] != "Dashboard":
+                deliveryMode = "fifo" if name in self.fifoChannels else "lastOnly"
+                subscriber = self.subscriptions.add(name, enum["enum"], deliveryMode)
                 self.messages[name] = {"obj": subscriber}
             else:
                 sender = messageHandlerSender(self.queueList, enum["enum"])
                 self.sendMessages[str(name)] = {"obj": sender}
 
-        subscriber = messageHandlerSubscriber(self.queueList, Semaphores, "fifo", True)
+        subscriber = self.subscriptions.add("Semaphores", Semaphores, "fifo")
         self.messages["Semaphores"] = {"obj": subscriber}
+        self.subscriptions.subscribe()
+
+        # all the subscribers are checked with one select call, see sendContinuousMessages
+        self.subscriberGroup = SubscriberGroup([message["obj"] for message in self.messages.values()])
+        self.subscriberNames = {message["obj"]: name for name, message in self.messages.items()}
 
     def getNamesAndVals(self):
         """Extract all message names and values for processing."""
@@ -148,6 +178,21 @@ class processDashboard(WorkerProcess):
 
         emit('response', {'data': 'Message received: ' + str(data)}, room=socketId)
 
+    def handleConnect(self):
+        """Subscribe the frame channels when the first browser connects."""
+        if not self.viewers:
+            for subscriber in self.frameSubscribers.values():
+                subscriber.subscribe()
+        self.viewers.add(request.sid)
+
+    def handleDisconnect(self):
+        """Unsubscribe the frame channels when the last browser disconnects."""
+        self.viewers.discard(request.sid)
+        if not self.viewers:
+            for subscriber in self.frameSubscribers.values():
+                subscriber.unsubscribe()
+                subscriber.empty()
+
     def handleSingleUserSession(self, socketId):
         """Handle session access for a single user."""
         if not self.sessionActive:
@@ -203,9 +248,15 @@ class processDashboard(WorkerProcess):
         sendTime = 1
 
         while self.running:
-            for msg, subscriber in self.messages.items():
-                resp = subscriber["obj"].receive()
-                if resp is not None:
+            # timeout 0: the eventlet loop must not block, we only check which pipes have data
+            for subscriber in self.subscriberGroup.wait(0):
+                msg = self.subscriberNames[subscriber]
+                resp = subscriber.receiveWithBlock()
+                if resp is not None and msg in self.frameChannels:
+                    self.sendFrame(msg, resp)
+                elif resp is not None:
+                    if isinstance(resp, DetectionFrame):
+                        resp = resp.toDict()
                     self.socketio.emit(msg, {"value": resp})
                     if self.debugging:
                         self.logger.info(f"{msg}: {resp}")
@@ -219,6 +270,24 @@ class processDashboard(WorkerProcess):
 
             eventlet.sleep(socketSleep)
 
+    def sendFrame(self, msg, descriptor):
+        """Read a frame from its FrameBus and send it to the frontend as a base64 JPEG."""
+        bus = self.frameBuses.get(descriptor["bus"])
+        if bus is None:
+            bus = FrameBus(descriptor["bus"])
+            self.frameBuses[descriptor["bus"]] = bus
+        frame = bus.read(descriptor)
+        if frame is None:
+            return
+        height, width = frame.shape[:2]
+        if width > self.frameWidth:
+            frame = cv2.resize(frame, (self.frameWidth, height * self.frameWidth // width), interpolation=cv2.INTER_AREA)
+        _, encodedImg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        del frame
+        # the camera may have overwritten the slot while it was encoded
+        if bus.isValid(descriptor):
+            self.socketio.emit(self.frameChannels[msg], {"value": base64.b64encode(encodedImg).decode("utf-8")})
+
     # ===================================== INIT TH ======================================
     def _init_threads(self):
         """Initialize the Dashboard thread."""
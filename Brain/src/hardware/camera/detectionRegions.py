@@ -0,0 +1,72 @@
+import numpy as np
+
+
+class DetectionRegions:
+    """Regioni frejma koje detektor obradjuje umesto celog frejma (DetectorBackend.detectRegions).
+
+    Fiksni regioni su tamo gde se znakovi i semafori pojavljuju (desna trecina, gornja polovina slike); na sitnim
+    znakovima oni daju i vecu rezoluciju, jer se u ulaz detektora smanjuje samo region. Ostala mesta batch-a idu na
+    okoline traka koje fiksni regioni ne pokrivaju (trake vidi tracker), a svaka fullEvery-ta detekcija uzima ceo
+    frame, da se ne propuste objekti van regiona (automobili, pesaci).
+
+    Args:
+        regions (tuple): Fiksni regioni (x1, y1, x2, y2) kao deo sirine i visine frejma, 0..1.
+        maxRegions (int): Najvise regiona jedne detekcije (batch detektora).
+        fullEvery (int, optional): Svaka koja detekcija je na celom frejmu, 0 nikad. Defaults to 8.
+        margin (float, optional): Okolina trake, u velicinama njenog boxa sa svake strane. Defaults to 1.0.
+        minSize (int, optional): Najmanja sirina i visina regiona trake, u pikselima. Defaults to 320.
+    """
+    def __init__(self, regions, maxRegions, fullEvery=8, margin=1.0, minSize=320):
+        self.regions = tuple(regions)
+        self.maxRegions = maxRegions
+        self.fullEvery = fullEvery
+        self.margin = margin
+        self.minSize = minSize
+        self.count = 0
+        if len(self.regions) > maxRegions:
+            raise ValueError(f"{len(self.regions)} fiksnih regiona, a najvise ih moze {maxRegions}")
+
+    def fixed(self, width, height):
+        scale = np.array([width, height, width, height])
+        return [tuple(int(v) for v in np.round(np.array(region) * scale)) for region in self.regions]
+
+    def around(self, tracks, width, height, covered):
+        """Regioni oko traka koje nisu cele u nekom od covered regiona."""
+        regions = []
+        for _, x1, y1, x2, y2, _, _ in tracks:
+            if any(cx1 <= x1 and cy1 <= y1 and x2 <= cx2 and y2 <= cy2 for cx1, cy1, cx2, cy2 in covered):
+                continue
+            # Traka koju je tracker ekstrapolirao van frejma dala bi prazan region, pa se centar drzi u frejmu
+            cx, cy = min(max((x1 + x2) / 2, 0), width), min(max((y1 + y2) / 2, 0), height)
+            halfWidth = max((x2 - x1) * (0.5 + self.margin), self.minSize / 2)
+            halfHeight = max((y2 - y1) * (0.5 + self.margin), self.minSize / 2)
+            regions.append((int(max(0, cx - halfWidth)), int(max(0, cy - halfHeight)),
+                            int(min(width, cx + halfWidth)), int(min(height, cy + halfHeight))))
+        return regions
+
+    @staticmethod
+    def isEmpty(region):
+        """Region bez piksela; njegov isecak bi detektor smanjio deljenjem sa nultom sirinom (letterbox)."""
+        x1, y1, x2, y2 = region
+        return x2 <= x1 or y2 <= y1
+
+    def plan(self, shape, tracks=()):
+        """Regioni sledece detekcije za frame oblika shape, u pikselima.
+
+        Args:
+            shape (tuple): Oblik frejma (visina, sirina, ...).
+            tracks (list, optional): Trake trackera (id, x1, y1, x2, y2, conf, cls) u trenutku frejma. Defaults to ().
+        """
+        height, width = shape[:2]
+        self.count += 1
+        regions = [region for region in self.fixed(width, height) if not self.isEmpty(region)]
+        if self.fullEvery and self.count % self.fullEvery == 1 % self.fullEvery:
+            return regions[:self.maxRegions - 1] + [(0, 0, width, height)]
+        extra = [region for region in self.around(tracks, width, height, regions) if not self.isEmpty(region)]
+        free = self.maxRegions - len(regions)
+        if len(extra) > free > 0:
+            # Vise traka nego mesta: poslednje mesto pokriva sve preostale
+            boxes = np.array(extra[free - 1:])
+            extra = extra[:free - 1] + [(int(boxes[:, 0].min()), int(boxes[:, 1].min()),
+                                         int(boxes[:, 2].max()), int(boxes[:, 3].max()))]
+        return regions + extra[:max(free, 0)]
@@ -0,0 +1,357 @@
+import hashlib
+import os
+import shutil
+import time
+
+import cv2
+import numpy as np
+
+# Ulaz detektora: kvadrat sa letterbox-om (odnos stranica frejma se cuva, ostatak je siv)
+DETECTOR_INPUT_SIZE = 640
+# Eksportovani modeli se cuvaju ovde, po hash-u tezina, pa se export radi samo jednom po modelu
+DETECTOR_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "bfmc", "detector")
+# Varijante tezina modela: FP32, INT8 tezine sa aktivacijama kvantizovanim u letu, INT8 tezine i aktivacije
+# (skale aktivacija iz kalibracije na snimljenim frejmovima)
+QUANTIZATIONS = ("fp32", "int8-dynamic", "int8-static")
+
+
+def weightsHash(path):
+    """SHA-256 fajla sa tezinama (prvih 16 hex cifara), kljuc kesa eksportovanih modela."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as weights:
+        for chunk in iter(lambda: weights.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def letterbox(frame, size, dst=None):
+    """Smanjuje frame u kvadrat size x size bez promene odnosa stranica.
+    Returns:
+        tuple: (slika, scale, (padX, padY)); tacka ulaza je (x * scale + padX, y * scale + padY).
+    """
+    height, width = frame.shape[:2]
+    scale = min(size / width, size / height)
+    newWidth, newHeight = int(round(width * scale)), int(round(height * scale))
+    padX, padY = (size - newWidth) // 2, (size - newHeight) // 2
+    if dst is None:
+        dst = np.empty((size, size, 3), dtype=np.uint8)
+    dst[...] = 114
+    cv2.resize(frame, (newWidth, newHeight), dst=dst[padY:padY + newHeight, padX:padX + newWidth],
+               interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+    return dst, scale, (padX, padY)
+
+
+def decodeYolo(output, scale, pad, confThreshold=0.25, iouThreshold=0.45):
+    """Detekcije iz izlaza YOLOv8 glave (4 + broj klasa, broj predloga) za jednu sliku, u koordinatama frejma.
+    Returns:
+        list: (x1, y1, x2, y2, conf, cls).
+    """
+    predictions = output.T
+    scores = predictions[:, 4:]
+    classes = scores.argmax(axis=1)
+    confidences = scores[np.arange(len(scores)), classes]
+    keep = confidences >= confThreshold
+    if not keep.any():
+        return []
+    boxes = predictions[keep, :4]
+    confidences = confidences[keep]
+    classes = classes[keep]
+    # cx, cy, w, h ulaza -> x1, y1, x2, y2 frejma
+    xyxy = np.empty_like(boxes)
+    xyxy[:, 0] = boxes[:, 0] - boxes[:, 2] / 2
+    xyxy[:, 1] = boxes[:, 1] - boxes[:, 3] / 2
+    xyxy[:, 2] = boxes[:, 0] + boxes[:, 2] / 2
+    xyxy[:, 3] = boxes[:, 1] + boxes[:, 3] / 2
+    xyxy[:, [0, 2]] = (xyxy[:, [0, 2]] - pad[0]) / scale
+    xyxy[:, [1, 3]] = (xyxy[:, [1, 3]] - pad[1]) / scale
+    xywh = np.column_stack((xyxy[:, :2], xyxy[:, 2:] - xyxy[:, :2]))
+    indices = cv2.dnn.NMSBoxesBatched(xywh.tolist(), confidences.tolist(), classes.tolist(), confThreshold, iouThreshold)
+    return [
+        (float(xyxy[i, 0]), float(xyxy[i, 1]), float(xyxy[i, 2]), float(xyxy[i, 3]), float(confidences[i]), int(classes[i]))
+        for i in np.asarray(indices).reshape(-1)
+    ]
+
+
+def mergeDetections(detections, iouThreshold=0.45):
+    """NMS po klasi preko detekcija vise regiona (objekat u preklopu regiona je detektovan u oba)."""
+    boxes = np.array([detection[:4] for detection in detections])
+    xywh = np.column_stack((boxes[:, :2], boxes[:, 2:] - boxes[:, :2]))
+    indices = cv2.dnn.NMSBoxesBatched(xywh.tolist(), [detection[4] for detection in detections],
+                                      [detection[5] for detection in detections], 0.0, iouThreshold)
+    return [detections[i] for i in np.asarray(indices).reshape(-1)]
+
+
+def exportedModel(weights, exportFormat, size, cacheDir=DETECTOR_CACHE_DIR, batch=1):
+    """Putanja modela eksportovanog iz .pt tezina (Ultralytics export), iz kesa ako je vec eksportovan.
+    Kljuc kesa je hash tezina, format, velicina ulaza i broj slika u batch-u, pa promena tezina pravi novi export.
+    """
+    name = f"{weightsHash(weights)}-{size}" + (f"-b{batch}" if batch > 1 else "")
+    target = os.path.join(cacheDir, name + (".onnx" if exportFormat == "onnx" else "_openvino_model"))
+    if os.path.exists(target):
+        return target
+    from ultralytics import YOLO
+
+    os.makedirs(cacheDir, exist_ok=True)
+    exported = YOLO(weights).export(format=exportFormat, imgsz=size, batch=batch, dynamic=False, half=False)
+    shutil.move(str(exported), target)
+    return target
+
+
+def quantizedModel(modelPath, quantization, size, calibration=None):
+    """Putanja INT8 varijante ONNX modela (pored njega u kesu), iz kesa ako je vec napravljena.
+
+    Args:
+        modelPath (string): FP32 ONNX model.
+        quantization (string): Jedna od QUANTIZATIONS.
+        size (int): Velicina ulaza modela (za letterbox kalibracionih frejmova).
+        calibration (list, optional): Frejmovi za kalibraciju aktivacija (samo za "int8-static"). Bez njih varijanta
+            mora vec biti u kesu (pravi je benchmarks/benchDetectorVariants.py sa snimcima). Defaults to None.
+    """
+    if quantization == "fp32":
+        return modelPath
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Nepoznata kvantizacija: {quantization} (postoje: {', '.join(QUANTIZATIONS)})")
+    target = f"{modelPath[:-len('.onnx')]}-{quantization}.onnx"
+    if os.path.exists(target):
+        return target
+    if quantization == "int8-static" and calibration is None:
+        raise FileNotFoundError(f"{target} ne postoji; staticka kvantizacija trazi kalibraciju na snimljenim frejmovima")
+    from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType,
+                                          quant_pre_process, quantize_dynamic, quantize_static)
+
+    # Shape inference i fuzija pre kvantizacije, da bi kvantizovani cvorovi pokrili ceo graf
+    # (export je sa fiksnim ulazom, pa simbolicki oblici ne trebaju)
+    prepared = target + ".prep.onnx"
+    quant_pre_process(modelPath, prepared, skip_symbolic_shape=True)
+    try:
+        if quantization == "int8-dynamic":
+            # ConvInteger na CPU-u postoji samo sa uint8 tezinama
+            quantize_dynamic(prepared, target, weight_type=QuantType.QUInt8)
+        else:
+            import onnx
+
+            modelInput = onnx.load(prepared, load_external_data=False).graph.input[0]
+            inputName = modelInput.name
+            batch = max(1, modelInput.type.tensor_type.shape.dim[0].dim_value)
+            images = [letterbox(frame, size)[0] for frame in calibration]
+
+            class FrameReader(CalibrationDataReader):
+                def __init__(self):
+                    self.blobs = iter(
+                        cv2.dnn.blobFromImages(images[start:start + batch], 1.0 / 255.0, swapRB=True)
+                        for start in range(0, len(images) - batch + 1, batch)
+                    )
+
+                def get_next(self):
+                    blob = next(self.blobs, None)
+                    return None if blob is None else {inputName: blob}
+
+            # QDQ format (ORT ga spaja u QLinearConv), tezine po kanalu
+            quantize_static(prepared, target, FrameReader(), quant_format=QuantFormat.QDQ, per_channel=True,
+                            activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                            calibrate_method=CalibrationMethod.MinMax)
+    finally:
+        os.remove(prepared)
+    return target
+
+
+class DetectorBackend:
+    """Zajednicki deo backend-a detektora: letterbox ulaza fiksne velicine, warmup, dekodiranje izlaza.
+
+    Args:
+        weights (string): Putanja do .pt tezina.
+        size (int, optional): Velicina kvadratnog ulaza. Defaults to DETECTOR_INPUT_SIZE.
+        threads (int, optional): Broj intra-op niti inferencije. Defaults to 1.
+        warmup (int, optional): Broj inferencija na praznoj slici pri pokretanju. Defaults to 3.
+        confThreshold (float, optional): Najmanja pouzdanost detekcije. Defaults to 0.25.
+        cacheDir (string, optional): Kes eksportovanih modela. Defaults to DETECTOR_CACHE_DIR.
+        quantization (string, optional): Varijanta tezina (QUANTIZATIONS), ako je backend podrzava. Defaults to "fp32".
+        batch (int, optional): Najvise regiona frejma u jednoj inferenciji (detectRegions). Defaults to 1.
+    """
+    name = None
+    quantizations = ("fp32",)
+    # Eksportovani modeli imaju fiksan batch: nepopunjena mesta se racunaju, ali se ne dekodiraju
+    fixedBatch = True
+
+    def __init__(self, weights, size=DETECTOR_INPUT_SIZE, threads=1, warmup=3, confThreshold=0.25, cacheDir=DETECTOR_CACHE_DIR,
+                 quantization="fp32", batch=1):
+        if quantization not in self.quantizations:
+            raise ValueError(f"Backend {self.name} ne podrzava kvantizaciju {quantization}")
+        self.weights = weights
+        self.size = size
+        self.threads = threads
+        self.quantization = quantization
+        self.confThreshold = confThreshold
+        self.cacheDir = cacheDir
+        self.batch = batch
+        self.input = np.full((self.batch, self.size, self.size, 3), 114, dtype=np.uint8)
+        self.load()
+        start = time.perf_counter()
+        for _ in range(warmup):
+            self.detect(np.zeros((self.size, self.size, 3), dtype=np.uint8))
+        self.warmupTime = time.perf_counter() - start
+
+    def load(self):
+        raise NotImplementedError
+
+    def infer(self, blob):
+        """Izlaz modela za blob (batch, 3, size, size) float32 RGB 0..1."""
+        raise NotImplementedError
+
+    def detect(self, frame):
+        """Detekcije na RGB frejmu bilo koje velicine.
+        Returns:
+            list: (x1, y1, x2, y2, conf, cls) u koordinatama frejma.
+        """
+        height, width = frame.shape[:2]
+        return self.detectRegions(frame, [(0, 0, width, height)])
+
+    def detectRegions(self, frame, regions):
+        """Detekcije u regionima frejma (x1, y1, x2, y2 u pikselima), svi u jednoj inferenciji.
+
+        Svaki region se letterbox-uje u svoje mesto batch-a, a boxovi se vracaju u koordinate celog frejma; objekat
+        u preklopu dva regiona ostaje jednom (NMS preko regiona).
+        Returns:
+            list: (x1, y1, x2, y2, conf, cls) u koordinatama frejma.
+        """
+        if len(regions) > self.batch:
+            raise ValueError(f"{len(regions)} regiona, a batch detektora je {self.batch}")
+        if not regions:
+            return []
+        transforms = []
+        for index, (x1, y1, x2, y2) in enumerate(regions):
+            _, scale, pad = letterbox(frame[y1:y2, x1:x2], self.size, self.input[index])
+            transforms.append((scale, (pad[0] - x1 * scale, pad[1] - y1 * scale)))
+        count = self.batch if self.fixedBatch else len(regions)
+        # picamera2 RGB888 je u memoriji BGR (kao OpenCV), model ocekuje RGB
+        blob = cv2.dnn.blobFromImages(self.input[:count], 1.0 / 255.0, swapRB=True)
+        output = self.infer(blob)
+        detections = []
+        for index, (scale, pad) in enumerate(transforms):
+            detections += decodeYolo(output[index], scale, pad, self.confThreshold)
+        if len(regions) > 1 and detections:
+            detections = mergeDetections(detections)
+        return detections
+
+
+class TorchBackend(DetectorBackend):
+    """Ultralytics model iz .pt tezina, pozvan kao pre uvodjenja backend-a (results = model(frame)): letterbox,
+    dekodiranje i NMS radi Ultralytics. To je referenca sa kojom se porede eksportovani backend-i, koji to rade ovde
+    (letterbox, decodeYolo), vidi benchmarks/benchDetectorBackends.py.
+    """
+    name = "torch"
+    fixedBatch = False
+
+    def load(self):
+        import torch
+        from ultralytics import YOLO
+
+        torch.set_num_threads(self.threads)
+        self.model = YOLO(self.weights)
+
+    def detectRegions(self, frame, regions):
+        if len(regions) > self.batch:
+            raise ValueError(f"{len(regions)} regiona, a batch detektora je {self.batch}")
+        if not regions:
+            return []
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in regions]
+        results = self.model(crops, imgsz=self.size, conf=self.confThreshold, verbose=False)
+        detections = []
+        for (x1, y1, _, _), result in zip(regions, results):
+            for box in result.boxes:
+                bx1, by1, bx2, by2 = box.xyxy[0].cpu().numpy()
+                detections.append((float(bx1) + x1, float(by1) + y1, float(bx2) + x1, float(by2) + y1,
+                                   float(box.conf[0]), int(box.cls[0])))
+        if len(regions) > 1 and detections:
+            detections = mergeDetections(detections)
+        return detections
+
+
+class OnnxRuntimeBackend(DetectorBackend):
+    """ONNX Runtime na CPU-u, sa modelom eksportovanim u ONNX (FP32 ili INT8 varijanta, vidi quantizedModel)."""
+    name = "onnxruntime"
+    quantizations = QUANTIZATIONS
+
+    def load(self):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            self.modelPath(), options, providers=["CPUExecutionProvider"]
+        )
+        self.inputName = self.session.get_inputs()[0].name
+
+    def modelPath(self):
+        return quantizedModel(exportedModel(self.weights, "onnx", self.size, self.cacheDir, self.batch), self.quantization,
+                              self.size)
+
+    def infer(self, blob):
+        return self.session.run(None, {self.inputName: blob})[0]
+
+
+class OpenVinoBackend(DetectorBackend):
+    """OpenVINO na CPU-u, sa modelom eksportovanim u OpenVINO IR."""
+    name = "openvino"
+
+    def load(self):
+        import openvino
+
+        core = openvino.Core()
+        core.set_property("CPU", {"INFERENCE_NUM_THREADS": self.threads})
+        directory = self.modelPath()
+        xml = next(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".xml"))
+        self.request = core.compile_model(xml, "CPU").create_infer_request()
+
+    def modelPath(self):
+        return exportedModel(self.weights, "openvino", self.size, self.cacheDir, self.batch)
+
+    def infer(self, blob):
+        self.request.infer({0: blob})
+        return self.request.get_output_tensor(0).data
+
+
+BACKENDS = {backend.name: backend for backend in (TorchBackend, OnnxRuntimeBackend, OpenVinoBackend)}
+
+
+def createDetector(backend, weights, **options):
+    """Pravi backend detektora po imenu ("torch", "onnxruntime", "openvino"); options idu u DetectorBackend."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Nepoznat backend detektora: {backend} (postoje: {', '.join(BACKENDS)})")
+    return BACKENDS[backend](weights, **options)
+
+
+def boxIou(box, boxes):
+    """IoU jednog boxa (x1, y1, x2, y2) sa nizom boxova (N x 4)."""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    union = (box[2] - box[0]) * (box[3] - box[1]) + areas - intersection
+    return intersection / np.maximum(union, 1e-9)
+
+
+def detectionAgreement(reference, detections, iouThreshold=0.5):
+    """Poredi detekcije sa referentnim (npr. FP32 modela): svaka referentna se upari sa najboljom neuparenom detekcijom
+    iste klase sa IoU >= iouThreshold.
+    Returns:
+        tuple: (uparenih, referentnih, detekcija).
+    """
+    used = np.zeros(len(detections), dtype=bool)
+    matched = 0
+    for box in sorted(reference, key=lambda detection: -detection[4]):
+        candidates = [i for i, detection in enumerate(detections) if not used[i] and detection[5] == box[5]]
+        if not candidates:
+            continue
+        ious = boxIou(box[:4], [detections[i][:4] for i in candidates])
+        best = int(ious.argmax())
+        if ious[best] >= iouThreshold:
+            used[candidates[best]] = True
+            matched += 1
+    return matched, len(reference), len(detections)
@@ -0,0 +1,201 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class PipelineStage:
+    """Jedan cvor pipeline-a: funkcija, ulazi koje ceka, broj radnika i sta radi kad su svi radnici zauzeti.
+
+    Args:
+        name (string): Ime stage-a; pod njim se objavljuje njegov izlaz, ulaz drugih stage-ova.
+        function (callable): function(frame) -> izlaz ili None. frame je dict {"id", "timestamp", <ime ulaza>: vrednost}.
+            None znaci da nema izlaza za taj frame (stage-ovi posle njega ga ne dobijaju).
+        inputs (tuple): Imena ulaza: tokovi kamere ("main", "luma") ili imena drugih stage-ova.
+        workers (int): Broj niti; frame uzima prva slobodna.
+        mode (string): "latest" - ceka samo najnoviji frame, stariji koji nije stigao na red se odbacuje;
+            "every" - svaki frame, u redu do maxQueue, posle toga se odbacuje najstariji.
+        maxQueue (int): Najvise frejmova koji cekaju u "every" modu. Frejmovi glavnog toka su veliki (2048x1080x3, ~6.6 MB),
+            pa stage-ovi koji ih snimaju imaju mali red: kad pisanje na SD karticu zastane, odbacuju se frejmovi, a ne memorija.
+    """
+    def __init__(self, name, function, inputs, workers=1, mode="latest", maxQueue=32):
+        if mode not in ("latest", "every"):
+            raise ValueError(f"Nepoznat mode stage-a {name}: {mode}")
+        self.name = name
+        self.function = function
+        self.inputs = tuple(inputs)
+        self.workers = workers
+        self.mode = mode
+        self.maxQueue = 1 if mode == "latest" else maxQueue
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.threads = []
+        # Delimicno sakupljeni ulazi frejmova, za stage-ove sa vise ulaza: id -> {ime ulaza: vrednost}
+        self.partial = OrderedDict()
+        self.busy = 0
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.maxDepth = 0
+        self.busyTime = 0.0
+        # Kad je poslednji put prijavljeno odbacivanje iz punog reda ("every" mode) i koliko ih je tada bilo
+        self.dropLogTime = 0.0
+        self.dropLogCount = 0
+
+    def offer(self, frameId, timestamp, name, value):
+        """Prima jedan ulaz frejma; kad su stigli svi ulazi, frame ide u red stage-a.
+        Returns:
+            bool: True ako je "every" stage zbog punog reda odbacio najstariji frame.
+        """
+        with self.condition:
+            if len(self.inputs) == 1:
+                frame = {"id": frameId, "timestamp": timestamp, name: value}
+            else:
+                frame = self.partial.setdefault(frameId, {"id": frameId, "timestamp": timestamp})
+                frame[name] = value
+                if len(frame) - 2 < len(self.inputs):
+                    # Frejmovi kojima neki ulaz nikad ne stigne (npr. odbacen u prethodnom stage-u) ne ostaju zauvek
+                    while len(self.partial) > 2 * self.maxQueue + 2:
+                        self.partial.popitem(last=False)
+                        self.dropped += 1
+                    return False
+                del self.partial[frameId]
+            overflow = len(self.queue) >= self.maxQueue
+            if overflow:
+                self.queue.popleft()
+                self.dropped += 1
+            self.queue.append(frame)
+            self.maxDepth = max(self.maxDepth, len(self.queue))
+            self.condition.notify()
+            return overflow and self.mode == "every"
+
+    def take(self, running):
+        """Ceka sledeci frame reda (None kad se pipeline zaustavlja)."""
+        with self.condition:
+            while not self.queue:
+                if not running.is_set():
+                    return None
+                self.condition.wait(0.05)
+            self.busy += 1
+            return self.queue.popleft()
+
+    def done(self, elapsed, ok):
+        with self.condition:
+            self.busy -= 1
+            self.busyTime += elapsed
+            if ok:
+                self.processed += 1
+            else:
+                self.errors += 1
+
+    def stats(self):
+        with self.condition:
+            return {
+                "depth": len(self.queue),
+                "maxDepth": self.maxDepth,
+                "busy": self.busy,
+                "workers": self.workers,
+                "processed": self.processed,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "busyTime": round(self.busyTime, 3),
+            }
+
+
+class FramePipeline:
+    """Raspored obrade frejmova kao DAG stage-ova umesto fiksne podele frejmova (parni YOLO, neparni Hough).
+
+    Kamera objavljuje svaki frame (submit) sa svojim tokovima ("main", "luma"); svaki stage dobija frejmove cim ih ima
+    slobodan radnik, pa stage koji je brz vidi sve frejmove, a spor (YOLO) uvek uzima najnoviji. Izlaz stage-a se
+    objavljuje pod njegovim imenom i ulaz je stage-ova koji ga navode (npr. snimanje i stream obradjene slike).
+    Dubina reda i broj odbacenih frejmova svakog stage-a su u stats().
+
+    Args:
+        logger (logging.Logger): Logger za greske stage-ova.
+
+    Example:
+        pipeline = FramePipeline(logger)
+        pipeline.add("lanes", laneStage, inputs=("luma",))
+        pipeline.add("laneStream", streamStage, inputs=("lanes",))
+        pipeline.start()
+        pipeline.submit(timestamp, main=frame, luma=luma)
+    """
+    def __init__(self, logger):
+        self.logger = logger
+        self.stages = OrderedDict()
+        # ime ulaza -> stage-ovi koji ga cekaju
+        self.consumers = {}
+        self.running = threading.Event()
+        self.frameId = 0
+
+    def add(self, name, function, inputs=("main",), workers=1, mode="latest", maxQueue=32):
+        """Dodaje stage (pre start()); vidi PipelineStage."""
+        if name in self.stages:
+            raise ValueError(f"Stage {name} vec postoji")
+        stage = PipelineStage(name, function, inputs, workers, mode, maxQueue)
+        self.stages[name] = stage
+        for inputName in stage.inputs:
+            self.consumers.setdefault(inputName, []).append(stage)
+        return stage
+
+    def start(self):
+        self.running.set()
+        for stage in self.stages.values():
+            for index in range(stage.workers):
+                thread = threading.Thread(target=self.work, args=(stage,), name=f"{stage.name}-{index}", daemon=True)
+                stage.threads.append(thread)
+                thread.start()
+
+    def stop(self, timeout=1.0):
+        self.running.clear()
+        for stage in self.stages.values():
+            for thread in stage.threads:
+                thread.join(timeout)
+
+    def submit(self, timestamp=None, **streams):
+        """Objavljuje novi frame kamere; streams su njegovi tokovi, npr. main=frame, luma=y_ravan.
+        Returns:
+            int: id frejma.
+        """
+        self.frameId += 1
+        timestamp = time.time() if timestamp is None else timestamp
+        for name, value in streams.items():
+            self.publish(self.frameId, timestamp, name, value)
+        return self.frameId
+
+    def publish(self, frameId, timestamp, name, value):
+        for stage in self.consumers.get(name, ()):
+            if stage.offer(frameId, timestamp, name, value):
+                self.logDrop(stage)
+
+    def logDrop(self, stage):
+        """Prijavljuje frejmove koje je "every" stage odbacio jer ne stize da ih obradi, najvise jednom u sekundi."""
+        now = time.monotonic()
+        if now - stage.dropLogTime < 1.0:
+            return
+        self.logger.warning(
+            f"Stage {stage.name} ne stize: red od {stage.maxQueue} frejmova je pun, "
+            f"odbaceno {stage.dropped - stage.dropLogCount} frejmova (ukupno {stage.dropped})"
+        )
+        stage.dropLogTime = now
+        stage.dropLogCount = stage.dropped
+
+    def work(self, stage):
+        while self.running.is_set():
+            frame = stage.take(self.running)
+            if frame is None:
+                continue
+            start = time.perf_counter()
+            try:
+                output = stage.function(frame)
+                ok = True
+            except Exception as e:
+                output = None
+                ok = False
+                self.logger.error(f"Stage {stage.name} greška: {e}")
+            stage.done(time.perf_counter() - start, ok)
+            if output is not None:
+                self.publish(frame["id"], frame["timestamp"], stage.name, output)
+
+    def stats(self):
+        """Vraca {ime stage-a: {"depth", "maxDepth", "busy", "workers", "processed", "dropped", "errors", "busyTime"}}."""
+        return {name: stage.stats() for name, stage in self.stages.items()}
@@ -0,0 +1,233 @@
+import time
+
+import cv2
+import numpy as np
+
+# Velicina lores kanala kamere (YUV420); Y ravan je vec grayscale slika te velicine
+LORES_SIZE = (512, 270)
+
+
+def lumaPlane(lores, size=LORES_SIZE):
+    """Vraca Y ravan YUV420 lores frejma (bez kopiranja).
+
+    Picamera2 vraca YUV420 kao niz (visina * 3 / 2, stride): prvih `visina` redova je Y ravan,
+    a stride moze biti siri od slike, pa se sece i po sirini.
+    """
+    width, height = size
+    return lores[:height, :width]
+
+
+class LaneBuffers:
+    """Sve sto zavisi samo od rezolucije i gamma vrednosti: ROI, maska, LUT i prealocirani baferi za svaki korak."""
+    def __init__(self, width, height, gamma=None):
+        self.roi_pts = np.array([
+            [0, height],
+            [width, height],
+            [int(2 * width / 3), int(2 * height / 3)],
+            [int(width / 3), int(2 * height / 3)]
+        ], np.int32)
+        self.roi_pts[:, 0] = np.clip(self.roi_pts[:, 0], 0, width - 1)
+        self.roi_pts[:, 1] = np.clip(self.roi_pts[:, 1], 0, height - 1)
+        self.rect = cv2.boundingRect(self.roi_pts)
+        x, y, w, h = self.rect
+        self.mask = np.zeros((h, w), dtype=np.uint8)
+        cv2.fillPoly(self.mask, [self.roi_pts - [x, y]], 255)
+        # Ivica maske je i sama ivica na slici (put pa nula): ivice se zadrzavaju samo malo unutar maske
+        self.inner_mask = cv2.erode(self.mask, np.ones((5, 5), np.uint8))
+
+        self.lut = None
+        if gamma is not None and gamma != 1.0:
+            inv_gamma = 1.0 / gamma
+            self.lut = (((np.arange(256) / 255.0) ** inv_gamma) * 255).astype(np.uint8)
+
+        # Van maske bitwise_and ne pise u dst, pa ti pikseli ostaju nula iz prvog frejma
+        self.roi = np.zeros((h, w), dtype=np.uint8)
+        self.blurred = np.empty((h, w), dtype=np.uint8)
+        self.edges = np.empty((h, w), dtype=np.uint8)
+        self.output = np.empty((height, width, 3), dtype=np.uint8)
+
+        # Parametri Hough-a su podeseni za sirinu 1024 (stari ulaz) i skaliraju se na sirinu ulaza
+        scale = width / 1024.0
+        self.hough_threshold = max(1, int(round(50 * scale)))
+        self.min_line_length = max(1, int(round(50 * scale)))
+        self.max_line_gap = max(1, int(round(20 * scale)))
+
+
+# --- Klasa HoughTransformation ---
+class HoughTransformation:
+    """Klasa koja vrši detekciju linija Hough transformacijom na Y ravni lores kanala.
+
+    Ulaz je vec grayscale slika male rezolucije, pa nema resize-a ni cvtColor-a po frejmu. ROI, maska, LUT i baferi
+    se prave jednom po rezoluciji i gamma vrednosti (LaneBuffers), a koraci pisu u njih preko dst parametara OpenCV-a.
+    Slika sa linijama se crta samo kad je neko trazi (draw), i pise se u isti bafer: vazi do sledeceg poziva.
+
+    Args:
+        logger (logging.Logger): Logger.
+        gamma (float, optional): Gamma korekcija ulaza, None bez nje. Defaults to None.
+        profile (bool, optional): Meri trajanje svakog koraka u stage_ms. Defaults to False.
+    """
+    STAGES = ("roi", "blur", "canny", "hough", "draw")
+
+    def __init__(self, logger, gamma=None, profile=False):
+        self.logger = logger
+        self.gamma = gamma
+        self.profile = profile
+        self.cache = {}
+        # Trajanje poslednjeg izvrsenja svakog koraka, u ms (samo sa profile=True)
+        self.stage_ms = dict.fromkeys(self.STAGES, 0.0)
+
+    def buffers(self, shape):
+        key = (shape[1], shape[0], self.gamma)
+        buffers = self.cache.get(key)
+        if buffers is None:
+            buffers = LaneBuffers(shape[1], shape[0], self.gamma)
+            self.cache[key] = buffers
+        return buffers
+
+    def detect_lines(self, luma):
+        """Vraca linije (N x 4, x1 y1 x2 y2 u koordinatama ulaza) ili None."""
+        b = self.buffers(luma.shape)
+        x, y, w, h = b.rect
+        roi = luma[y:y+h, x:x+w]
+        t0 = time.perf_counter() if self.profile else 0.0
+        cv2.bitwise_and(roi, roi, dst=b.roi, mask=b.mask)
+        if b.lut is not None:
+            cv2.LUT(b.roi, b.lut, dst=b.roi)
+        t1 = time.perf_counter() if self.profile else 0.0
+        cv2.blur(b.roi, (3, 3), dst=b.blurred)
+        t2 = time.perf_counter() if self.profile else 0.0
+        cv2.Canny(b.blurred, 50, 150, edges=b.edges)
+        cv2.bitwise_and(b.edges, b.inner_mask, dst=b.edges)
+        t3 = time.perf_counter() if self.profile else 0.0
+        lines = cv2.HoughLinesP(b.edges, 1, np.pi/180, threshold=b.hough_threshold,
+                                minLineLength=b.min_line_length, maxLineGap=b.max_line_gap)
+        if self.profile:
+            t4 = time.perf_counter()
+            self.stage_ms["roi"] = (t1 - t0) * 1000
+            self.stage_ms["blur"] = (t2 - t1) * 1000
+            self.stage_ms["canny"] = (t3 - t2) * 1000
+            self.stage_ms["hough"] = (t4 - t3) * 1000
+        if lines is None:
+            return None
+        lines = lines.reshape(-1, 4)
+        lines[:, [0, 2]] += x
+        lines[:, [1, 3]] += y
+        return lines
+
+    def draw(self, luma, lines):
+        """Crta linije i ROI na ulazu u boji, u prealocirani bafer."""
+        t0 = time.perf_counter() if self.profile else 0.0
+        b = self.buffers(luma.shape)
+        cv2.cvtColor(luma, cv2.COLOR_GRAY2BGR, dst=b.output)
+        if lines is not None:
+            for x1, y1, x2, y2 in lines:
+                cv2.line(b.output, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+        else:
+            self.logger.debug("Nije pronađena nijedna linija u ROI-ju za HoughTransformation.")
+        cv2.polylines(b.output, [b.roi_pts], isClosed=True, color=(0, 0, 255), thickness=1)
+        if self.profile:
+            self.stage_ms["draw"] = (time.perf_counter() - t0) * 1000
+        return b.output
+
+    def process_frame(self, luma, annotate=True):
+        """Detekcija linija; vraca (linije, slika sa linijama ili None ako annotate nije trazen)."""
+        if luma is None:
+            self.logger.error("Primljen lores frame je None u HoughTransformation.")
+            return None, None
+
+        lines = self.detect_lines(luma)
+        if not annotate:
+            if self.profile:
+                self.stage_ms["draw"] = 0.0
+            return lines, None
+        return lines, self.draw(luma, lines)
+
+
+# --- Klasa LaneModel ---
+class LaneModel:
+    """Model trake iz duzi HoughLinesP: leva i desna linija, polinomi x(y) i pomeraj vozila od centra trake.
+
+    Duzi se razvrstavaju vektorski (NumPy, bez petlje po duzima): skoro horizontalne se odbacuju, leve imaju negativan
+    nagib u slici i nalaze se levo od centra, desne obrnuto. Svaka strana se fituje polinomom x(y) kroz krajeve svojih
+    duzi, sa duzinom duzi kao tezinom. Kad se vidi samo jedna linija, druga se pretpostavlja na poslednjoj izmerenoj
+    sirini trake.
+
+    Args:
+        size (tuple, optional): (sirina, visina) ulaza. Defaults to LORES_SIZE.
+        degree (int, optional): Stepen polinoma linija. ROI zahvata samo donju trecinu slike, gde je kvadratni fit
+            nestabilan; 2 ima smisla tek sa visim ROI-jem. Defaults to 1.
+        lane_width_mm (float, optional): Sirina trake na stazi, za pretvaranje piksela u mm. Defaults to 350.
+        min_slope (float, optional): Najmanji |dy/dx| duzi koja moze biti linija trake. Defaults to 0.3.
+    """
+    def __init__(self, size=LORES_SIZE, degree=1, lane_width_mm=350.0, min_slope=0.3):
+        width, height = size
+        self.center_x = (width - 1) / 2.0
+        self.y_bottom = float(height - 1)
+        self.degree = degree
+        self.lane_width_mm = lane_width_mm
+        self.min_slope = min_slope
+        # Sirina trake na dnu slike u pikselima; pocetna procena dok se ne vide obe linije
+        self.lane_width_px = 0.6 * width
+        self.left_fit = None
+        self.right_fit = None
+        self.center_fit = None
+
+    def fit_side(self, x1, y1, x2, y2, weight):
+        """Polinom x(y) kroz krajeve duzi jedne strane, ili None bez duzi."""
+        if len(x1) == 0:
+            return None
+        ys = np.concatenate((y1, y2))
+        xs = np.concatenate((x1, x2))
+        weights = np.sqrt(np.concatenate((weight, weight)))
+        # Za krivinu treba dovoljno razlicitih visina, inace prava
+        degree = self.degree if np.ptp(ys) > 20 and len(x1) > 2 else 1
+        return np.polyfit(ys, xs, degree, w=weights)
+
+    def update(self, lines):
+        """Racuna model trake iz linija jednog frejma.
+        Returns:
+            tuple: (pomeraj u mm, ugao u stepenima), ili None ako nijedna linija trake nije nadjena.
+        """
+        self.left_fit = self.right_fit = self.center_fit = None
+        if lines is None or len(lines) == 0:
+            return None
+        x1, y1, x2, y2 = lines.astype(np.float64).T
+        dx = x2 - x1
+        dy = y2 - y1
+        length = np.hypot(dx, dy)
+        mid_x = (x1 + x2) * 0.5
+        steep = np.abs(dy) >= self.min_slope * np.abs(dx)
+        left = steep & (dx * dy <= 0) & (mid_x < self.center_x)
+        right = steep & (dx * dy >= 0) & (mid_x >= self.center_x)
+
+        self.left_fit = self.fit_side(x1[left], y1[left], x2[left], y2[left], length[left])
+        self.right_fit = self.fit_side(x1[right], y1[right], x2[right], y2[right], length[right])
+        if self.left_fit is None and self.right_fit is None:
+            return None
+
+        half = self.lane_width_px / 2.0
+        if self.left_fit is not None and self.right_fit is not None:
+            width_px = np.polyval(self.right_fit, self.y_bottom) - np.polyval(self.left_fit, self.y_bottom)
+            # Sirina se azurira samo iz verovatnih merenja
+            if 0.3 * self.center_x < width_px < 2.4 * self.center_x:
+                self.lane_width_px = 0.8 * self.lane_width_px + 0.2 * width_px
+            self.center_fit = np.polyadd(self.left_fit, self.right_fit) / 2.0
+        elif self.left_fit is not None:
+            self.center_fit = np.polyadd(self.left_fit, [half])
+        else:
+            self.center_fit = np.polyadd(self.right_fit, [-half])
+
+        center_bottom = np.polyval(self.center_fit, self.y_bottom)
+        offset_mm = (self.center_x - center_bottom) * self.lane_width_mm / self.lane_width_px
+        # Napred je ka manjem y, pa je ugao od -dx/dy
+        heading = np.degrees(np.arctan(-np.polyval(np.polyder(self.center_fit), self.y_bottom)))
+        return int(round(offset_mm)), float(heading)
+
+    def draw(self, output):
+        """Crta centar trake iz poslednjeg modela (plavo) na sliku sa linijama."""
+        if self.center_fit is None:
+            return output
+        ys = np.linspace(self.y_bottom * 2 / 3, self.y_bottom, 12)
+        points = np.stack((np.polyval(self.center_fit, ys), ys), axis=1).astype(np.int32)
+        cv2.polylines(output, [points], isClosed=False, color=(255, 0, 0), thickness=2)
+        return output
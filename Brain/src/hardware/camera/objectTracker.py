@@ -0,0 +1,235 @@
+import threading
+
+import numpy as np
+
+# Kvadrat Mahalanobisove udaljenosti centra (2 stepena slobode, 99%) za uparivanje bez preklapanja boxova
+CENTER_GATE = 9.21
+
+
+def iouMatrix(boxes, others):
+    """IoU svakog boxa (N x 4, x1 y1 x2 y2) sa svakim drugim (M x 4); vraca N x M."""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 1, 4)
+    others = np.asarray(others, dtype=np.float64).reshape(1, -1, 4)
+    width = np.clip(np.minimum(boxes[..., 2], others[..., 2]) - np.maximum(boxes[..., 0], others[..., 0]), 0, None)
+    height = np.clip(np.minimum(boxes[..., 3], others[..., 3]) - np.maximum(boxes[..., 1], others[..., 1]), 0, None)
+    intersection = width * height
+    areas = (boxes[..., 2] - boxes[..., 0]) * (boxes[..., 3] - boxes[..., 1])
+    otherAreas = (others[..., 2] - others[..., 0]) * (others[..., 3] - others[..., 1])
+    return intersection / np.maximum(areas + otherAreas - intersection, 1e-9)
+
+
+def toCenter(boxes):
+    """x1 y1 x2 y2 -> cx cy w h."""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    return np.column_stack(((boxes[:, :2] + boxes[:, 2:]) / 2, boxes[:, 2:] - boxes[:, :2]))
+
+
+def toCorners(centers):
+    """cx cy w h -> x1 y1 x2 y2 (sirina i visina najmanje 1 px)."""
+    half = np.maximum(centers[:, 2:4], 1.0) / 2
+    return np.column_stack((centers[:, :2] - half, centers[:, :2] + half))
+
+
+def greedyPairs(cost, valid):
+    """Parovi (red, kolona) pohlepno od najmanjeg cost-a, samo gde je valid, svaki red i kolona najvise jednom."""
+    rows, columns = [], []
+    usedRows = np.zeros(cost.shape[0], dtype=bool)
+    usedColumns = np.zeros(cost.shape[1], dtype=bool)
+    candidates = np.flatnonzero(valid)
+    for flat in candidates[np.argsort(cost.ravel()[candidates], kind="stable")]:
+        row, column = divmod(int(flat), cost.shape[1])
+        if usedRows[row] or usedColumns[column]:
+            continue
+        usedRows[row] = usedColumns[column] = True
+        rows.append(row)
+        columns.append(column)
+    return np.array(rows, dtype=np.int64), np.array(columns, dtype=np.int64)
+
+
+class ObjectTracker:
+    """IoU tracker (SORT) sa Kalman filterom konstantne brzine za svaki box, vektorski za sve trake odjednom.
+
+    Stanje trake je (cx, cy, w, h) i njihove brzine u px/s. Detekcije (update) pomeraju filter do vremena svog frejma,
+    uparuju se sa trakama iste klase (associate), uparene azuriraju filter, neuparene prave nove trake sa novim id-jem, a traka koja se ne vidi duze od maxAge sekundi se brise. Izmedju detekcija boxovi frejma se
+    dobijaju ekstrapolacijom stanja do vremena tog frejma (tracks), bez menjanja filtera, pa YOLO ne mora na svaki frame
+    a id objekta ostaje isti dok ga YOLO vidi.
+    update i tracks se zovu iz razlicitih niti (stage-ovi pipeline-a).
+
+    Args:
+        iouThreshold (float, optional): Najmanji IoU para traka-detekcija. Defaults to 0.3.
+        maxAge (float, optional): Sekunde bez detekcije posle kojih se traka brise. Defaults to 0.5.
+        minHits (int, optional): Broj detekcija posle kog se traka objavljuje. Defaults to 1.
+        accelerationNoise (float, optional): Sum ubrzanja, u visinama boxa po s^2. Defaults to 2.0.
+        measurementNoise (float, optional): Sum detekcije, u visinama boxa. Defaults to 0.05.
+    """
+    def __init__(self, iouThreshold=0.3, maxAge=0.5, minHits=1, accelerationNoise=2.0, measurementNoise=0.05):
+        self.iouThreshold = iouThreshold
+        self.maxAge = maxAge
+        self.minHits = minHits
+        self.accelerationNoise = accelerationNoise
+        self.measurementNoise = measurementNoise
+        self.lock = threading.Lock()
+        self.time = None
+        self.nextId = 1
+        # Paralelni nizovi, jedan red po traci
+        self.state = np.zeros((0, 8))
+        self.covariance = np.zeros((0, 8, 8))
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.classes = np.zeros(0, dtype=np.int64)
+        self.confidences = np.zeros(0)
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.lastSeen = np.zeros(0)
+        # Rezultat poslednjeg update-a, za raspored detekcija
+        self.matched = self.created = self.lost = 0
+
+    def predict(self, dt):
+        """Pomera filter svih traka za dt sekundi."""
+        if len(self.state) == 0 or dt <= 0:
+            return
+        transition = np.eye(8)
+        transition[:4, 4:] = dt * np.eye(4)
+        self.state = self.state @ transition.T
+        # Diskretni beli sum ubrzanja, srazmeran visini boxa
+        sigma = (self.accelerationNoise * np.maximum(self.state[:, 3], 1.0)) ** 2
+        block = np.array([[dt ** 4 / 4, dt ** 3 / 2], [dt ** 3 / 2, dt ** 2]])
+        noise = np.zeros((8, 8))
+        for axis in range(4):
+            noise[np.ix_((axis, axis + 4), (axis, axis + 4))] = block
+        self.covariance = transition @ self.covariance @ transition.T + sigma[:, None, None] * noise
+
+    def correct(self, index, measurements):
+        """Kalman korekcija traka index sa merenjima (M x 4, cx cy w h)."""
+        covariance = self.covariance[index]
+        noise = (self.measurementNoise * np.maximum(measurements[:, 3], 1.0)) ** 2
+        innovation = covariance[:, :4, :4] + noise[:, None, None] * np.eye(4)
+        gain = covariance[:, :, :4] @ np.linalg.inv(innovation)
+        residual = measurements - self.state[index, :4]
+        self.state[index] += (gain @ residual[:, :, None])[:, :, 0]
+        self.covariance[index] = covariance - gain @ covariance[:, :4, :]
+
+    def associate(self, boxes, classes):
+        """Uparivanje traka i detekcija iste klase; vraca (trake, detekcije) parova.
+
+        Prvo pohlepno po IoU predvidjenog boxa i detekcije, od najveceg. Ostale trake i detekcije se uparuju po
+        Mahalanobisovoj udaljenosti centra (sa nesigurnoscu filtera) i slicnoj velicini: traka koja je tek nastala
+        nema brzinu, a objekat se do sledece detekcije pomeri i za vise od svoje sirine, pa IoU bude nula.
+        """
+        tracks = np.zeros(0, dtype=np.int64)
+        detections = np.zeros(0, dtype=np.int64)
+        if len(self.state) == 0 or len(boxes) == 0:
+            return tracks, detections
+        sameClass = self.classes[:, None] == classes[None, :]
+        ious = iouMatrix(toCorners(self.state[:, :4]), boxes)
+        tracks, detections = greedyPairs(-ious, sameClass & (ious >= self.iouThreshold))
+
+        free = np.ones(len(self.state), dtype=bool)
+        free[tracks] = False
+        freeDetections = np.ones(len(boxes), dtype=bool)
+        freeDetections[detections] = False
+        if free.any() and freeDetections.any():
+            trackIndex, detectionIndex = np.flatnonzero(free), np.flatnonzero(freeDetections)
+            centers = toCenter(boxes[detectionIndex])
+            predicted = self.state[trackIndex, :4]
+            variance = self.covariance[trackIndex][:, [0, 1], [0, 1]] + (self.measurementNoise * predicted[:, 3:4]) ** 2
+            distance = (((predicted[:, None, :2] - centers[None, :, :2]) ** 2) / variance[:, None, :]).sum(axis=2)
+            ratio = centers[None, :, 2:4] / np.maximum(predicted[:, None, 2:4], 1.0)
+            valid = (sameClass[np.ix_(trackIndex, detectionIndex)] & (distance <= CENTER_GATE)
+                     & (ratio > 0.5).all(axis=2) & (ratio < 2.0).all(axis=2))
+            extraTracks, extraDetections = greedyPairs(distance, valid)
+            tracks = np.concatenate((tracks, trackIndex[extraTracks]))
+            detections = np.concatenate((detections, detectionIndex[extraDetections]))
+        return tracks, detections
+
+    def update(self, detections, timestamp):
+        """Azurira trake detekcijama frejma snimljenog u timestamp.
+
+        Args:
+            detections (list): (x1, y1, x2, y2, conf, cls) iz detektora.
+            timestamp (float): Vreme frejma (time.time() kamere).
+        Returns:
+            list: Trake u tom trenutku, kao u tracks().
+        """
+        detections = np.asarray(detections, dtype=np.float64).reshape(-1, 6)
+        with self.lock:
+            if self.time is not None:
+                self.predict(timestamp - self.time)
+            self.time = timestamp
+            classes = detections[:, 5].astype(np.int64)
+            tracks, matched = self.associate(detections[:, :4], classes)
+            if len(tracks):
+                self.correct(tracks, toCenter(detections[matched, :4]))
+                self.confidences[tracks] = detections[matched, 4]
+                self.hits[tracks] += 1
+                self.lastSeen[tracks] = timestamp
+
+            new = np.ones(len(detections), dtype=bool)
+            new[matched] = False
+            count = int(new.sum())
+            if count:
+                state = np.zeros((count, 8))
+                state[:, :4] = toCenter(detections[new, :4])
+                # Brzina nove trake je nepoznata: velika pocetna nesigurnost brzine
+                scale = np.maximum(state[:, 3], 1.0)
+                variances = np.column_stack([(self.measurementNoise * scale) ** 2] * 4 + [(2.0 * scale) ** 2] * 4)
+                self.state = np.concatenate((self.state, state))
+                self.covariance = np.concatenate((self.covariance, variances[:, :, None] * np.eye(8)))
+                self.ids = np.concatenate((self.ids, np.arange(self.nextId, self.nextId + count)))
+                self.nextId += count
+                self.classes = np.concatenate((self.classes, classes[new]))
+                self.confidences = np.concatenate((self.confidences, detections[new, 4]))
+                self.hits = np.concatenate((self.hits, np.ones(count, dtype=np.int64)))
+                self.lastSeen = np.concatenate((self.lastSeen, np.full(count, timestamp)))
+
+            alive = timestamp - self.lastSeen <= self.maxAge
+            self.matched, self.created, self.lost = len(tracks), count, int((~alive).sum())
+            if not alive.all():
+                self.state, self.covariance = self.state[alive], self.covariance[alive]
+                self.ids, self.classes = self.ids[alive], self.classes[alive]
+                self.confidences, self.hits, self.lastSeen = self.confidences[alive], self.hits[alive], self.lastSeen[alive]
+            return self.extrapolate(timestamp)
+
+    def tracks(self, timestamp):
+        """Boxovi potvrdjenih traka ekstrapolirani do vremena frejma.
+        Returns:
+            list: (id, x1, y1, x2, y2, conf, cls).
+        """
+        with self.lock:
+            return self.extrapolate(timestamp)
+
+    def extrapolate(self, timestamp):
+        if self.time is None or len(self.state) == 0:
+            return []
+        visible = (self.hits >= self.minHits) & (timestamp - self.lastSeen <= self.maxAge)
+        centers = self.state[visible, :4] + self.state[visible, 4:] * (timestamp - self.time)
+        boxes = toCorners(centers)
+        return [
+            (int(trackId), float(box[0]), float(box[1]), float(box[2]), float(box[3]), float(conf), int(cls))
+            for trackId, box, conf, cls in zip(self.ids[visible], boxes, self.confidences[visible], self.classes[visible])
+        ]
+
+
+class DetectionSchedule:
+    """Na koje frejmove ide YOLO: najvise na svaki maxInterval-ti, a kad je adaptive, cesce dok se scena menja.
+
+    Posle detekcije u kojoj je nastala ili nestala neka traka razmak pada na 1 frame; dok se sve detekcije uparuju sa
+    postojecim trakama, razmak raste za 1 do maxInterval.
+
+    Args:
+        maxInterval (int, optional): Najveci razmak detekcija, u frejmovima. Defaults to 4.
+        adaptive (bool, optional): Prilagodjava razmak promenama scene. Defaults to True.
+    """
+    def __init__(self, maxInterval=4, adaptive=True):
+        self.maxInterval = maxInterval
+        self.adaptive = adaptive
+        self.interval = 1 if adaptive else maxInterval
+        self.lastFrame = None
+
+    def due(self, frameId):
+        return self.lastFrame is None or frameId - self.lastFrame >= self.interval
+
+    def record(self, frameId, tracker):
+        """Posle detekcije na frejmu frameId i update-a trackera."""
+        self.lastFrame = frameId
+        if self.adaptive:
+            changed = tracker.created or tracker.lost
+            self.interval = 1 if changed else min(self.interval + 1, self.maxInterval)
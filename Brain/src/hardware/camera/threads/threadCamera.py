@@ -1,13 +1,9 @@
 #!/usr/bin/env python
 import cv2
 import threading
-import base64
-import json
 import time
-import numpy as np
 from concurrent.futures import ThreadPoolExecutor
 import psutil
-from ultralytics import YOLO
 import os
 import picamera2
 
@@ -19,116 +15,69 @@ from src.utils.messages.allMessages import (
     Record,
     Brightness,
     Contrast,
+    HoughFrame,
+    YoloFrame,
+    LaneKeeping,
+    LaneHeading,
+    Detections,
 )
-
+from src.utils.messages.detections import DetectionFrame
+
+from src.utils.messages.frameBus import FrameBus
+from src.hardware.camera.laneDetection import HoughTransformation, LaneModel, LORES_SIZE, lumaPlane
+from src.hardware.camera.framePipeline import FramePipeline
+from src.hardware.camera.detectorBackends import createDetector, DETECTOR_INPUT_SIZE
+from src.hardware.camera.detectionRegions import DetectionRegions
+from src.hardware.camera.objectTracker import DetectionSchedule, ObjectTracker
 from src.utils.messages.messageHandlerSender import messageHandlerSender
-from src.utils.messages.messageHandlerSubscriber import messageHandlerSubscriber
+from src.utils.messages.subscriptionManifest import SubscriptionManifest
 from src.templates.threadwithstop import ThreadWithStop
 
 # Dobijamo direktorijum u kojem se nalazi trenutna skripta
 script_dir = os.path.dirname(os.path.abspath(__file__))
 # Kreiramo apsolutnu putanju do modela koji se nalazi u istom folderu
 model_path_yolo = os.path.join(script_dir, "best.pt")
-
-
-# --- FrameBuffer definicija ---
-class FrameBuffer:
-    """Jednostavni buffer koji drži frame i timestamp preuzimanja."""
-    def __init__(self):
-        self.frame = None
-        self.timestamp = 0
-        self.lock = threading.Lock()
-        self.event = threading.Event()
-
-    def update(self, frame):
-        with self.lock:
-            self.frame = frame
-            self.timestamp = time.time()
-            self.event.set()
-
-    def get(self):
-        with self.lock:
-            return self.frame, self.timestamp
-
-    def clear(self):
-        self.event.clear()
-
-# --- Klasa HoughTransformation ---
-class HoughTransformation:
-    """Klasa koja vrši obradu frameova koristeći Hough transformaciju."""
-    def __init__(self, logger, gamma=1.2):
+# Backend detektora ("torch", "onnxruntime", "openvino", vidi detectorBackends) i broj njegovih intra-op niti;
+# detektor je vezan za jedno jezgro (ObjectDetection.cpu_core), pa vise niti samo smeta.
+# "torch" poziva Ultralytics model na best.pt kao ranije (model(frame)); ostali imaju svoj letterbox i NMS.
+# "onnxruntime" i "openvino" traze pip pakete kojih nema u requirement.txt (onnxruntime ili openvino, onnx i ultralytics
+# za export) i na prvom startu exportuju best.pt u ~/.cache/bfmc/detector; export se moze uraditi unapred sa
+# benchmarks/benchDetectorBackends.py, koji ostavlja model u istom kesu
+DETECTOR_BACKEND = "torch"
+DETECTOR_THREADS = 1
+# Varijanta tezina ("fp32", "int8-dynamic", "int8-static", samo za onnxruntime) i velicina ulaza (320/416/640);
+# tacnost i brzina varijanti: benchmarks/benchDetectorVariants.py, koji pravi i "int8-static" iz snimaka
+DETECTOR_QUANTIZATION = "fp32"
+DETECTOR_SIZE = DETECTOR_INPUT_SIZE
+# YOLO ide najvise na svaki DETECT_EVERY-ti frame (cesce dok se pojavljuju i nestaju objekti, ako je DETECT_ADAPTIVE);
+# boxovi ostalih frejmova su iz trackera (benchmarks/benchObjectTracker.py)
+DETECT_EVERY = 4
+DETECT_ADAPTIVE = True
+# Detekcija po regionima frejma (deo sirine i visine, x1 y1 x2 y2) umesto na celom frejmu, svi u jednoj inferenciji
+# sa batch-om DETECTION_BATCH; ostala mesta batch-a su okoline traka, a svaka DETECTION_FULL_EVERY-ta je ceo frame.
+# None: uvek ceo frame. Npr. ((0.6, 0.0, 1.0, 0.55),) za znakove i semafore, uz DETECTOR_SIZE 416 ili 320
+# (region se manje smanjuje od celog frejma); latencija i odziv: benchmarks/benchDetectorRegions.py
+DETECTION_REGIONS = None
+DETECTION_BATCH = 2
+DETECTION_FULL_EVERY = 8
+
+
+# --- Klasa ObjectDetection za YOLO obradu (stage "yolo" pipeline-a) ---
+class ObjectDetection:
+    def __init__(self, logger, model_path=model_path_yolo, backend=DETECTOR_BACKEND, size=DETECTOR_SIZE,
+                 threads=DETECTOR_THREADS, quantization=DETECTOR_QUANTIZATION, regions=DETECTION_REGIONS):
         self.logger = logger
-        self.gamma = gamma
-
-    def adjust_gamma(self, image, gamma=1.2):
-        inv_gamma = 1.0 / gamma
-        table = np.array([((i / 255.0) ** inv_gamma) * 255 for i in range(256)]).astype("uint8")
-        return cv2.LUT(image, table)
-
-    def process_frame(self, frame):
-        if frame is None:
-            self.logger.error("Primljen main frame je None u HoughTransformation.")
-            return None
-
-        resized_frame = cv2.resize(frame, (1024, 540))
-        height, width = resized_frame.shape[:2]
-
-        roi_pts = np.array([
-            [0, height],
-            [width, height],
-            [int(2 * width / 3), int(2 * height / 3)],
-            [int(width / 3), int(2 * height / 3)]
-        ], np.int32)
-        roi_pts[:, 0] = np.clip(roi_pts[:, 0], 0, width - 1)
-        roi_pts[:, 1] = np.clip(roi_pts[:, 1], 0, height - 1)
-        x, y, w, h = cv2.boundingRect(roi_pts)
-        if w == 0 or h == 0:
-            self.logger.error("Degenerisana ROI oblast u HoughTransformation.")
-            return resized_frame
-
-        roi_img = resized_frame[y:y+h, x:x+w].copy()
-        roi_pts_adjusted = roi_pts - [x, y]
-        mask = np.zeros((h, w), dtype=np.uint8)
-        cv2.fillPoly(mask, [roi_pts_adjusted], 255)
-        self.logger.debug(f"ROI shape: {roi_img.shape}, mask shape: {mask.shape}")
-        try:
-            roi_only = cv2.bitwise_and(roi_img, roi_img, mask=mask)
-        except Exception as e:
-            self.logger.error(f"cv2.bitwise_and greška u HoughTransformation: {e}")
-            return resized_frame
-
-        roi_gamma = self.adjust_gamma(roi_only, gamma=self.gamma)
-        gray = cv2.cvtColor(roi_gamma, cv2.COLOR_BGR2GRAY)
-        blurred = cv2.blur(gray, (3, 3))
-        edges = cv2.Canny(blurred, 50, 150)
-        lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=50, minLineLength=50, maxLineGap=20)
-        roi_processed = np.copy(roi_img)
-        if lines is not None:
-            for line in lines:
-                x1, y1, x2, y2 = line[0]
-                cv2.line(roi_processed, (x1, y1), (x2, y2), (0, 255, 0), 2)
-        else:
-            self.logger.debug("Nije pronađena nijedna linija u ROI-ju za HoughTransformation.")
-
-        roi_final = roi_img.copy()
-        roi_final[mask == 255] = roi_processed[mask == 255]
-        output_frame = np.copy(resized_frame)
-        output_frame[y:y+h, x:x+w] = roi_final
-        cv2.polylines(output_frame, [roi_pts], isClosed=True, color=(0, 0, 255), thickness=2)
-        return output_frame
-
-# --- Klasa ObjectDetectionThread za YOLO obradu ---
-class ObjectDetectionThread(threading.Thread):
-    def __init__(self, frame_buffer, queuesList, logger, parent, model_path=model_path_yolo):
-        super(ObjectDetectionThread, self).__init__()
-        self.frame_buffer = frame_buffer
-        self.queuesList = queuesList
-        self.logger = logger
-        self.running = True
-        self.parent = parent  # Reference to threadCamera instance (za pristup record_yolo)
-        self.model = YOLO(model_path)
         self.cpu_core = 0
         self.set_cpu_affinity()
+        self.regions = None
+        batch = 1
+        if regions is not None:
+            self.regions = DetectionRegions(regions, DETECTION_BATCH, DETECTION_FULL_EVERY)
+            batch = DETECTION_BATCH
+        # Export modela (samo prvi put, posle iz kesa) i warmup inferencije su ovde, ne na prvom frejmu
+        self.detector = createDetector(backend, model_path, size=size, threads=threads, quantization=quantization,
+                                       batch=batch)
+        self.logger.info(f"Detektor {backend} {quantization} {size}x{size} x{batch}, warmup {self.detector.warmupTime:.2f}s")
 
     def set_cpu_affinity(self):
         pid = os.getpid()
@@ -136,54 +85,37 @@ class ObjectDetectionThread(threading.Thread):
         p.cpu_affinity([self.cpu_core])
         p.nice(0)
 
-    def detect_objects(self, frame):
-        results = self.model(frame)
-        detections = []
-        for result in results:
-            for box in result.boxes:
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                conf = float(box.conf[0])
-                cls = int(box.cls[0])
-                detections.append((x1, y1, x2, y2, conf, cls))
-        return detections
-
-    def run(self):
-        while self.running:
-            if not self.frame_buffer.event.wait(timeout=0.01):
-                continue
-            frame, timestamp = self.frame_buffer.get()
-            self.frame_buffer.clear()
-            if frame is None:
-                continue
-            start_time = time.time()
-            detections = self.detect_objects(frame)
-            end_time = time.time()
-            processing_time = end_time - start_time
-            self.logger.info(f"YOLO processing time: {processing_time:.3f}s, Detections: {len(detections)}")
-            # Crtanje bounding box-ova
-            for x1, y1, x2, y2, conf, cls in detections:
-                cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
-                cv2.putText(frame, f"{cls} {conf:.2f}", (int(x1), int(y1)-10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-            # Kodiranje slike u JPEG format i kreiranje JSON payloada
-            _, encodedImg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-            encodedImageData = base64.b64encode(encodedImg).decode("utf-8")
-            payload = json.dumps({"parity": "even", "image": encodedImageData})
-            self.queuesList.setdefault("yolo_output", threading.Queue()).put(payload)
-            # Ako je snimanje YOLO izlaza aktivno, snimi frejm u video
-            if self.parent.recording and self.parent.record_yolo:
-                if self.parent.yolo_video_writer is None:
-                    fourcc = cv2.VideoWriter_fourcc(*"XVID")
-                    filename = "yolo_output_" + str(time.time()) + ".avi"
-                    self.logger.info(f"Starting YOLO recording with filename {filename}")
-                    self.parent.yolo_video_writer = cv2.VideoWriter(filename, fourcc, self.parent.frame_rate, (1024, 540))
-                self.parent.yolo_video_writer.write(frame)
+    def detect_objects(self, frame, tracks=()):
+        if self.regions is None:
+            return self.detector.detect(frame)
+        return self.detector.detectRegions(frame, self.regions.plan(frame.shape, tracks))
 
-    def stop(self):
-        self.running = False
+    def annotate(self, frame, tracks):
+        """Crta bounding box-ove traka (id, x1, y1, x2, y2, conf, cls) na kopiji frejma (isti main frame citaju i drugi stage-ovi)."""
+        frame = frame.copy()
+        for track_id, x1, y1, x2, y2, conf, cls in tracks:
+            cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+            cv2.putText(frame, f"#{track_id} {cls} {conf:.2f}", (int(x1), int(y1)-10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+        return frame
 
 # --- Glavna klasa threadCamera ---
 class threadCamera(ThreadWithStop):
+    # Stage-ovi obrade frejmova (vidi FramePipeline): (ime, metoda, ulazi, broj radnika, mode, maxQueue).
+    # Ulazi su tokovi kamere ("main" 2048x1080 RGB, "luma" Y ravan lores-a) ili izlazi drugih stage-ova.
+    # Snimanje punih frejmova ceka u redu od najvise 4 (~26 MB), lores frejmovi traka od 8.
+    PIPELINE = (
+        ("yolo", "yolo_stage", ("main",), 1, "latest", 1),
+        ("objects", "objects_stage", ("main",), 1, "latest", 1),
+        ("yoloAnnotate", "yolo_annotate_stage", ("objects",), 1, "latest", 1),
+        ("yoloStream", "yolo_stream_stage", ("yoloAnnotate",), 1, "latest", 1),
+        ("yoloRecord", "yolo_record_stage", ("yoloAnnotate",), 1, "every", 4),
+        ("lanes", "lane_stage", ("luma",), 1, "latest", 1),
+        ("laneStream", "lane_stream_stage", ("lanes",), 1, "latest", 1),
+        ("laneRecord", "lane_record_stage", ("lanes",), 1, "every", 8),
+        ("rawRecord", "raw_record_stage", ("main",), 1, "every", 4),
+    )
+
     def __init__(self, queuesList, logger, debugger):
         super(threadCamera, self).__init__()
         self.queuesList = queuesList
@@ -196,6 +128,13 @@ class threadCamera(ThreadWithStop):
         self.recordingSender = messageHandlerSender(self.queuesList, Recording)
         self.mainCameraSender = messageHandlerSender(self.queuesList, mainCamera)
         self.serialCameraSender = messageHandlerSender(self.queuesList, serialCamera)
+        self.houghFrameSender = messageHandlerSender(self.queuesList, HoughFrame)
+        self.laneKeepingSender = messageHandlerSender(self.queuesList, LaneKeeping)
+        self.laneHeadingSender = messageHandlerSender(self.queuesList, LaneHeading)
+
+        # Frame busovi u deljenoj memoriji (prstenovi preallociranih slotova za potrošače)
+        self.houghFrameBus = FrameBus("hough", (LORES_SIZE[1], LORES_SIZE[0], 3), slots=4, create=True)
+        self.yoloFrameBus = FrameBus("yolo", (1080, 2048, 3), slots=4, create=True)
 
         self.subscribe()
         self._init_camera()
@@ -212,19 +151,24 @@ class threadCamera(ThreadWithStop):
         self.processed_video_writer = None
         self.yolo_video_writer = None
 
-        # Kreiranje dva frame buffera i brojača
-        self.frame_buffer_even = FrameBuffer()
-        self.frame_buffer_odd = FrameBuffer()
-        self.frame_counter = 0
-
-        # Pokretanje YOLO niti (radi obrade parnih frejmova)
-        self.yolo_thread = ObjectDetectionThread(self.frame_buffer_even, self.queuesList, self.logger, parent=self)
-        self.yolo_thread.start()
-
-        # Instanciranje HoughTransformation i pokretanje niti za obradu neparnih frejmova
-        self.hough_transform = HoughTransformation(self.logger, gamma=1.2)
-        self.hough_thread = threading.Thread(target=self.processing_loop_odd, name="HoughProcessing")
-        self.hough_thread.start()
+        self.yoloFrameSender = messageHandlerSender(self.queuesList, YoloFrame)
+        self.detectionsSender = messageHandlerSender(self.queuesList, Detections)
+        self.object_detection = ObjectDetection(self.logger)
+        # Trake objekata sa stabilnim id-jem; YOLO ih azurira, a boxovi svakog frejma su iz njih
+        self.tracker = ObjectTracker()
+        self.detection_schedule = DetectionSchedule(DETECT_EVERY, DETECT_ADAPTIVE)
+
+        # Instanciranje HoughTransformation (radi na Y ravni lores kanala)
+        self.hough_transform = HoughTransformation(self.logger)
+        # Model trake: pomeraj od centra trake (LaneKeeping) i ugao (LaneHeading) za svaki obradjen frame
+        self.lane_model = LaneModel(LORES_SIZE)
+
+        # Pipeline obrade: svaki stage uzima frejmove cim je slobodan, umesto podele parni/neparni
+        self.pipeline = FramePipeline(self.logger)
+        for name, method, inputs, workers, mode, maxQueue in self.PIPELINE:
+            self.pipeline.add(name, getattr(self, method), inputs, workers, mode, maxQueue)
+        self.pipeline.start()
+        self.stats_time = time.time()
 
         self._acquisition_running = threading.Event()
         self._acquisition_running.set()
@@ -237,9 +181,16 @@ class threadCamera(ThreadWithStop):
         return logging.getLogger("DummyLogger")
 
     def subscribe(self):
-        self.recordSubscriber = messageHandlerSubscriber(self.queuesList, Record, "lastOnly", True)
-        self.brightnessSubscriber = messageHandlerSubscriber(self.queuesList, Brightness, "lastOnly", True)
-        self.contrastSubscriber = messageHandlerSubscriber(self.queuesList, Contrast, "lastOnly", True)
+        # jedna poruka gateway-u za sve pretplate
+        self.subscriptions = SubscriptionManifest(self.queuesList, "threadCamera", {
+            "record": (Record, "lastOnly"),
+            "brightness": (Brightness, "lastOnly"),
+            "contrast": (Contrast, "lastOnly"),
+        })
+        self.subscriptions.subscribe()
+        self.recordSubscriber = self.subscriptions["record"]
+        self.brightnessSubscriber = self.subscriptions["brightness"]
+        self.contrastSubscriber = self.subscriptions["contrast"]
 
     def Queue_Sending(self):
         self.recordingSender.send(self.recording)
@@ -269,78 +220,131 @@ class threadCamera(ThreadWithStop):
     def capture_loop(self):
         while self._running and self._acquisition_running.is_set():
             try:
-                frame = self.camera.capture_array("main", wait=True)
+                # main i lores kanal istog zahteva; lores skalira ISP, ne procesor
+                (frame, lores), _ = self.camera.capture_arrays(["main", "lores"], wait=True)
                 if frame is not None:
-                    self.frame_counter += 1
-                    if self.frame_counter >= 16:
-                        self.frame_counter = 1
-                    # Podela frejmova: parni idu u buffer za YOLO, neparni u buffer za Hough obradu
-                    if self.frame_counter % 2 == 0:
-                        self.frame_buffer_even.update(frame)
-                    else:
-                        self.frame_buffer_odd.update(frame)
-                    # Ako je aktivno snimanje raw frejmova, snimaj ulazni frame (resize-ovan)
-                    if self.recording and self.record_raw:
-                        if self.raw_video_writer is None:
-                            fourcc = cv2.VideoWriter_fourcc(*"XVID")
-                            filename = "raw_output_" + str(time.time()) + ".avi"
-                            self.logger.info(f"Starting raw recording with filename {filename}")
-                            self.raw_video_writer = cv2.VideoWriter(filename, fourcc, self.frame_rate, (1024, 540))
-                        self.raw_video_writer.write(cv2.resize(frame, (1024, 540)))
+                    # Pun frame (YOLO, snimanje) i Y ravan lores-a (trake) idu u pipeline
+                    self.pipeline.submit(time.time(), main=frame, luma=lumaPlane(lores))
                 else:
                     self.logger.error("Capture loop: frame je None.")
             except Exception as e:
                 self.logger.error(f"Capture loop error: {e}")
             time.sleep(0.001)
 
-    def processing_loop_odd(self):
-        while self._running and self._processing_running.is_set():
-            if not self.frame_buffer_odd.event.wait(timeout=0.005):
-                continue
-            frame, capture_time = self.frame_buffer_odd.get()
-            self.frame_buffer_odd.clear()
-            if frame is None:
-                continue
-            proc_start = time.time()
-            processed_frame = self.hough_transform.process_frame(frame)
-            proc_end = time.time()
-            self.logger.info(f"Hough processing delay: {(proc_end - capture_time):.3f}s")
-            # Ako je aktivno snimanje obrađenih frejmova (Hough), snimi obrađeni frame
-            if self.recording and self.record_processed:
-                if self.processed_video_writer is None:
-                    fourcc = cv2.VideoWriter_fourcc(*"XVID")
-                    filename = "processed_output_" + str(time.time()) + ".avi"
-                    self.logger.info(f"Starting processed recording with filename {filename}")
-                    self.processed_video_writer = cv2.VideoWriter(filename, fourcc, self.frame_rate, (1024, 540))
-                self.processed_video_writer.write(processed_frame)
-            _, encodedImg = cv2.imencode(".jpg", processed_frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-            encodedImageData = base64.b64encode(encodedImg).decode("utf-8")
-            payload = json.dumps({"parity": "odd", "image": encodedImageData})
-            self.queuesList.setdefault("hough_output", threading.Queue()).put(payload)
+    # --- Stage-ovi pipeline-a ---
+    def yolo_stage(self, frame):
+        # Frejmovi izmedju detekcija su samo u trackeru
+        if not self.detection_schedule.due(frame["id"]):
+            return None
+        start_time = time.time()
+        detections = self.object_detection.detect_objects(frame["main"], self.tracker.tracks(frame["timestamp"]))
+        self.tracker.update(detections, frame["timestamp"])
+        self.detection_schedule.record(frame["id"], self.tracker)
+        processing_time = time.time() - start_time
+        self.logger.info(f"YOLO processing time: {processing_time:.3f}s, Detections: {len(detections)}, "
+                         f"next after {self.detection_schedule.interval} frame(s)")
+        return None
+
+    def objects_stage(self, frame):
+        # Boxovi traka u trenutku ovog frejma su glavni izlaz detekcije (Detections, bez slike)
+        tracks = self.tracker.tracks(frame["timestamp"])
+        self.detectionsSender.send(DetectionFrame.fromTracks(frame["id"], frame["timestamp"], tracks))
+        # Slika sa boxovima samo ako je neko gleda (dashboard je pretplacen dok je otvoren) ili se snima
+        if not ((self.recording and self.record_yolo) or self.yoloFrameSender.hasSubscribers()):
+            return None
+        return frame["main"], tracks
+
+    def yolo_annotate_stage(self, frame):
+        image, tracks = frame["objects"]
+        return self.object_detection.annotate(image, tracks)
+
+    def yolo_stream_stage(self, frame):
+        # Frejm ide u deljenu memoriju, kroz gateway šaljemo samo deskriptor
+        descriptor = self.yoloFrameBus.write(frame["yoloAnnotate"], frame["timestamp"])
+        self.yoloFrameSender.send(descriptor)
+
+    def yolo_record_stage(self, frame):
+        # Ako je snimanje YOLO izlaza aktivno, snimi frejm u video
+        if self.recording and self.record_yolo:
+            if self.yolo_video_writer is None:
+                fourcc = cv2.VideoWriter_fourcc(*"XVID")
+                filename = "yolo_output_" + str(time.time()) + ".avi"
+                self.logger.info(f"Starting YOLO recording with filename {filename}")
+                self.yolo_video_writer = cv2.VideoWriter(filename, fourcc, self.frame_rate, (1024, 540))
+            self.yolo_video_writer.write(cv2.resize(frame["yoloAnnotate"], (1024, 540)))
+
+    def lane_stage(self, frame):
+        # Slika sa linijama se crta samo ako je neko gleda (dashboard) ili se snima
+        annotate = (self.recording and self.record_processed) or self.houghFrameSender.hasSubscribers()
+        lines, processed_frame = self.hough_transform.process_frame(frame["luma"], annotate)
+        lane = self.lane_model.update(lines)
+        if lane is not None:
+            offset_mm, heading = lane
+            self.laneKeepingSender.send(offset_mm)
+            self.laneHeadingSender.send(heading)
+        self.logger.info(f"Hough processing delay: {(time.time() - frame['timestamp']):.3f}s")
+        if processed_frame is None:
+            return None
+        # Bafer HoughTransformation-a se prepisuje sledecim frejmom, stage-ovi posle ovog dobijaju kopiju
+        return self.lane_model.draw(processed_frame).copy()
+
+    def lane_stream_stage(self, frame):
+        descriptor = self.houghFrameBus.write(frame["lanes"], frame["timestamp"])
+        self.houghFrameSender.send(descriptor)
+
+    def lane_record_stage(self, frame):
+        # Ako je aktivno snimanje obrađenih frejmova (Hough), snimi obrađeni frame
+        if self.recording and self.record_processed:
+            if self.processed_video_writer is None:
+                fourcc = cv2.VideoWriter_fourcc(*"XVID")
+                filename = "processed_output_" + str(time.time()) + ".avi"
+                self.logger.info(f"Starting processed recording with filename {filename}")
+                self.processed_video_writer = cv2.VideoWriter(filename, fourcc, self.frame_rate, LORES_SIZE)
+            self.processed_video_writer.write(frame["lanes"])
+
+    def raw_record_stage(self, frame):
+        # Ako je aktivno snimanje raw frejmova, snimaj ulazni frame (resize-ovan)
+        if self.recording and self.record_raw:
+            if self.raw_video_writer is None:
+                fourcc = cv2.VideoWriter_fourcc(*"XVID")
+                filename = "raw_output_" + str(time.time()) + ".avi"
+                self.logger.info(f"Starting raw recording with filename {filename}")
+                self.raw_video_writer = cv2.VideoWriter(filename, fourcc, self.frame_rate, (1024, 540))
+            self.raw_video_writer.write(cv2.resize(frame["main"], (1024, 540)))
+
+    def log_pipeline_stats(self):
+        """Dubina reda i odbaceni frejmovi svakog stage-a, svakih 5 s u debug modu."""
+        if not self.debugger or time.time() - self.stats_time < 5.0:
+            return
+        self.stats_time = time.time()
+        for name, stats in self.pipeline.stats().items():
+            self.logger.info(
+                f"Stage {name}: depth {stats['depth']} (max {stats['maxDepth']}), "
+                f"processed {stats['processed']}, dropped {stats['dropped']}, errors {stats['errors']}"
+            )
 
     def run(self):
         self.capture_thread = threading.Thread(target=self.capture_loop, name="CameraCapture")
         self.capture_thread.start()
         while self._running:
             time.sleep(0.1)
+            self.log_pipeline_stats()
         self._acquisition_running.clear()
         self._processing_running.clear()
         self.capture_thread.join()
-        self.hough_thread.join()
+        self.pipeline.stop()
 
     def stop(self):
+        super(threadCamera, self).stop()
+        self.pipeline.stop()
         if self.raw_video_writer is not None:
             self.raw_video_writer.release()
         if self.processed_video_writer is not None:
             self.processed_video_writer.release()
         if self.yolo_video_writer is not None:
             self.yolo_video_writer.release()
-        super(threadCamera, self).stop()
-        if self.yolo_thread is not None:
-            self.yolo_thread.stop()
-            self.yolo_thread.join()
-        if self.hough_thread is not None:
-            self.hough_thread.join()
+        self.houghFrameBus.close()
+        self.yoloFrameBus.close()
 
     def _init_camera(self):
         self.camera = picamera2.Picamera2()
@@ -348,7 +352,7 @@ class threadCamera(ThreadWithStop):
             buffer_count=1,
             queue=False,
             main={"format": "RGB888", "size": (2048, 1080)},
-            lores={"format": "YUV420", "size": (512, 270)}
+            lores={"format": "YUV420", "size": LORES_SIZE}
         )
         self.camera.configure(config)
         self.camera.start()
@@ -361,24 +365,12 @@ if __name__ == "__main__":
     # cam.record_processed = True
     # cam.record_yolo = True
     while True:
-        if "yolo_output" in cam.queuesList and not cam.queuesList["yolo_output"].empty():
-            yolo_payload = cam.queuesList["yolo_output"].get()
-            data = json.loads(yolo_payload)
-            encoded_image = data.get("image", "")
-            if encoded_image:
-                decoded_image = base64.b64decode(encoded_image)
-                np_arr = np.frombuffer(decoded_image, dtype=np.uint8)
-                frame = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
-                cv2.imshow("YOLO Output", frame)
-        if "hough_output" in cam.queuesList and not cam.queuesList["hough_output"].empty():
-            hough_payload = cam.queuesList["hough_output"].get()
-            data = json.loads(hough_payload)
-            encoded_image = data.get("image", "")
-            if encoded_image:
-                decoded_image = base64.b64decode(encoded_image)
-                np_arr = np.frombuffer(decoded_image, dtype=np.uint8)
-                frame = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
-                cv2.imshow("Hough Output", frame)
+        # Demo čita poslednje frejmove direktno iz frame busova
+        for bus, window in ((cam.yoloFrameBus, "YOLO Output"), (cam.houghFrameBus, "Hough Output")):
+            if bus.lastDescriptor is not None:
+                frame = bus.read(bus.lastDescriptor)
+                if frame is not None:
+                    cv2.imshow(window, frame)
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
     cam.stop()
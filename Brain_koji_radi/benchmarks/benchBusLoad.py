@@ -0,0 +1,332 @@
+# Load test of the message bus: a real processGateway with synthetic publishers and subscribers.
+#
+# Every scenario starts the gateway, the subscriber processes and the publisher processes, sends
+# for a fixed time and reports:
+#   - the delivered msgs/s;
+#   - the delivery latency (send -> subscriber decode, see busMetrics) p50 / p99 / p999;
+#   - the CPU used by every process, in % of one core;
+#   - the messages dropped or conflated by the senders and lost on the way (FIFO subscribers).
+# The results are printed and written as JSON (with the git commit), to compare branches.
+#
+# in terminal:    python3 benchmarks/benchBusLoad.py                      (the default suite)
+#                 python3 benchmarks/benchBusLoad.py --topics 8 --rate 200 --payload dict --mode fifo
+#                 python3 benchmarks/benchBusLoad.py --output results/main.json
+#                 python3 benchmarks/benchBusLoad.py --shards 3             (topics split between 3 gateway processes)
+# The synthetic topics are registered in messageCodec before the processes are forked (Linux).
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import time
+from enum import Enum
+from multiprocessing import Event, Process, Queue
+
+from src.gateway.processGateway import processGateway
+from src.utils.messages.busMetrics import latencyHistogram
+import src.utils.messages.busMetrics as busMetrics
+import src.utils.messages.messageCodec as messageCodec
+from src.utils.messages.messageHandlerSender import messageHandlerSender
+from src.utils.messages.messageHandlerSubscriber import messageHandlerSubscriber
+from src.utils.messages.subscriberGroup import SubscriberGroup
+
+# payload: (msgType, wireSchema, value factory)
+PAYLOADS = {
+    "scalar": ("float", "float64", lambda: 1.5),
+    "dict": ("dict", "pickle", lambda: {"x": 1.25, "y": 3.5, "yaw": 0.1, "speed": 20.0, "id": 7, "state": "run"}),
+    "frame": ("bytes", "pickle", lambda: bytes(640 * 480 * 3)),
+}
+
+# The default suite: (topics, rate per topic in Hz (0 = as fast as possible), payload, delivery mode)
+SUITE = [
+    (4, 100, "scalar", "fifo"),
+    (4, 100, "scalar", "lastOnly"),
+    (16, 200, "scalar", "fifo"),
+    (4, 0, "scalar", "fifo"),
+    (4, 100, "dict", "fifo"),
+    (4, 0, "dict", "lastOnly"),
+    (1, 30, "frame", "lastOnly"),
+    (2, 30, "frame", "fifo"),
+]
+
+
+def syntheticTopics(count, payload, policy):
+    """Returns the messages of a scenario, registered in messageCodec."""
+    msgType, wireSchema, _ = PAYLOADS[payload]
+    topics = []
+    for index in range(count):
+        message = Enum(
+            f"load{payload.capitalize()}{index}",
+            [
+                ("Queue", "General"),
+                ("Owner", f"busLoad_{payload}_{policy}"),
+                ("msgID", index),
+                ("msgType", msgType),
+                ("wireSchema", wireSchema),
+                ("policy", policy),
+            ],
+        )
+        messageCodec.register(message)
+        topics.append(message)
+    return topics
+
+
+def processCpuTime(pid):
+    """Returns the user + system CPU seconds consumed by a process (Linux only)."""
+    with open(f"/proc/{pid}/stat") as statFile:
+        fields = statFile.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def gitCommit():
+    """Returns the current git commit, or None outside of a repository."""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ===================================== PUBLISHERS =======================================
+
+def publish(queueList, topics, payload, rate, duration, start, results):
+    """Target of a publisher process: sends every topic at the given rate (0 = as fast as possible)."""
+    senders = [messageHandlerSender(queueList, topic) for topic in topics]
+    value = PAYLOADS[payload][2]()
+    start.wait()
+    cpuStart = time.process_time()
+    period = 1.0 / rate if rate > 0 else 0.0
+    end = time.monotonic() + duration
+    nextTime = time.monotonic()
+    while time.monotonic() < end:
+        for sender in senders:
+            sender.send(value)
+        if period:
+            nextTime += period
+            delay = nextTime - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+    for sender in senders:
+        sender.flush()
+    counters = {"sent": 0, "dropped": 0, "conflated": 0}
+    for sender in senders:
+        for name, value in sender.counters().items():
+            counters[name] += value
+    # the process is gone when the results are read, so it measures its own CPU time
+    counters["cpu"] = time.process_time() - cpuStart
+    results.put(("publisher", os.getpid(), counters))
+
+
+# ===================================== SUBSCRIBERS ======================================
+
+class loadSubscriber:
+    """Subscribes to all the topics and reads them with a SubscriberGroup."""
+
+    def __init__(self, queueList, topics, mode):
+        self.subscribers = []
+        for topic in topics:
+            self.subscribers.append(messageHandlerSubscriber(queueList, topic, mode, True))
+        self.group = SubscriberGroup(self.subscribers)
+
+    def run(self, ready, stop):
+        """Returns the number of messages received and the time of the last one."""
+        received = 0
+        last = time.monotonic()
+        ready.set()
+        while True:
+            ready = self.group.wait(0.05)
+            for subscriber in ready:
+                subscriber.receiveWithBlock()
+                received += 1
+            if ready:
+                last = time.monotonic()
+            # after the publishers are done, the backlog of the gateway is still read until the bus is quiet
+            elif stop.is_set() and time.monotonic() - last > 0.5:
+                return received, last
+
+
+def subscribe(queueList, topics, mode, index, ready, stop, results):
+    """Target of a subscriber process. Every process needs its own class name, the gateway knows the receivers by it."""
+    subscriberClass = type(f"loadSubscriber{index}", (loadSubscriber,), {})
+    received, last = subscriberClass(queueList, topics, mode).run(ready, stop)
+    delivery = latencyHistogram()
+    lost = 0
+    for topic in topics:
+        histogram = busMetrics.registry.stages.get(topic.__name__, {}).get("delivery")
+        if histogram is not None:
+            delivery.merge(histogram)
+        lost += busMetrics.registry.lost.get(topic.__name__, 0)
+    results.put(("subscriber", os.getpid(), {"received": received, "last": last, "lost": lost, "delivery": delivery}))
+
+
+# ====================================== SCENARIO ========================================
+
+def shardTopics(topics, shards):
+    """Splits the topics between the gateway shards, round robin; the first part stays on the main gateway."""
+    return {
+        f"load{index}": [(topic.Owner.value, topic.msgID.value) for topic in topics[index::shards]]
+        for index in range(1, shards)
+    }
+
+
+def runScenario(
+    topicCount, rate, payload, mode, publishers=1, subscribers=1, duration=3.0, batching=False, policy="deliver", shards=1
+):
+    """Runs one scenario.
+    Returns:
+        dict: The configuration and the results of the scenario.
+    """
+    queueList = {
+        "Critical": Queue(),
+        "Warning": Queue(),
+        "General": Queue(),
+        "Config": Queue(),
+    }
+    topics = syntheticTopics(topicCount, payload, policy)
+    gateway = processGateway(queueList, logging.getLogger(), batching=batching, shards=shardTopics(topics, shards))
+    gateway.start()
+
+    results = Queue()
+    stop = Event()
+    subscriberProcesses = []
+    for index in range(subscribers):
+        ready = Event()
+        process = Process(target=subscribe, args=(queueList, topics, mode, index, ready, stop, results), daemon=True)
+        process.start()
+        ready.wait()
+        subscriberProcesses.append(process)
+
+    start = Event()
+    publisherProcesses = []
+    for index in range(publishers):
+        process = Process(
+            target=publish,
+            args=(queueList, topics[index::publishers], payload, rate, duration, start, results),
+            daemon=True,
+        )
+        process.start()
+        publisherProcesses.append(process)
+    # leaves time for the subscriptions to reach the gateway
+    time.sleep(0.5)
+
+    processes = {"gateway": [gateway] + gateway.shardProcesses, "subscribers": subscriberProcesses}
+    cpuBefore = {name: [processCpuTime(process.pid) for process in group] for name, group in processes.items()}
+    startTime = time.monotonic()
+    start.set()
+    for process in publisherProcesses:
+        process.join()
+    elapsed = time.monotonic() - startTime
+    cpuAfter = {name: [processCpuTime(process.pid) for process in group] for name, group in processes.items()}
+    stop.set()
+
+    counters = {"sent": 0, "dropped": 0, "conflated": 0}
+    publisherCpu = []
+    received = 0
+    lastReceived = startTime
+    lost = 0
+    delivery = latencyHistogram()
+    for _ in range(publishers + subscribers):
+        kind, _, values = results.get()
+        if kind == "publisher":
+            for name in counters:
+                counters[name] += values[name]
+            publisherCpu.append(round(100.0 * values["cpu"] / elapsed, 1))
+        else:
+            received += values["received"]
+            lastReceived = max(lastReceived, values["last"])
+            lost += values["lost"]
+            delivery.merge(values["delivery"])
+    for process in subscriberProcesses:
+        process.join()
+    for process in processes["gateway"]:
+        process._blocker.set()
+    for process in processes["gateway"]:
+        process.join(2)
+
+    attempted = counters["sent"] + counters["dropped"] + counters["conflated"]
+    expected = counters["sent"] * subscribers
+    latency = delivery.snapshot()
+    cpuPercent = {
+        name: [round(100.0 * (after - before) / elapsed, 1) for before, after in zip(cpuBefore[name], cpuAfter[name])]
+        for name in processes
+    }
+    cpuPercent["publishers"] = publisherCpu
+    return {
+        "config": {
+            "topics": topicCount,
+            "rate": rate,
+            "payload": payload,
+            "mode": mode,
+            "publishers": publishers,
+            "subscribers": subscribers,
+            "duration": duration,
+            "batching": batching,
+            "policy": policy,
+            "shards": shards,
+        },
+        "results": {
+            # until the last message arrived, so that a backlog left in the gateway does not inflate the rate
+            "msgsPerSecond": received / max(elapsed, lastReceived - startTime),
+            "latencyUs": {"p50": latency["p50"], "p99": latency["p99"], "p999": latency["p999"], "max": latency["max"]},
+            "cpuPercent": cpuPercent,
+            "sent": counters["sent"],
+            "received": received,
+            "dropped": counters["dropped"],
+            "conflated": counters["conflated"],
+            "lost": lost,
+            "senderDropRate": (counters["dropped"] + counters["conflated"]) / attempted if attempted else 0.0,
+            "deliveryRate": received / expected if expected else 0.0,
+        },
+    }
+
+
+def printResult(result):
+    config = result["config"]
+    values = result["results"]
+    print(
+        f"{config['topics']:>3} x {config['rate'] or 'max':>4} Hz {config['payload']:>6} {config['mode']:>8}"
+        f"  {values['msgsPerSecond']:9.0f} msgs/s"
+        f"  p50 {values['latencyUs']['p50']:6} us  p99 {values['latencyUs']['p99']:7} us  p999 {values['latencyUs']['p999']:7} us"
+        f"  cpu gw {sum(values['cpuPercent']['gateway']):5.1f}%"
+        f" pub {sum(values['cpuPercent']['publishers']):5.1f}% sub {sum(values['cpuPercent']['subscribers']):5.1f}%"
+        f"  drop {values['senderDropRate'] * 100:5.1f}%  delivered {values['deliveryRate'] * 100:5.1f}%"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test of the message bus.")
+    parser.add_argument("--topics", type=int, help="number of topics (runs a single scenario instead of the suite)")
+    parser.add_argument("--rate", type=float, default=100, help="messages per second per topic, 0 = as fast as possible")
+    parser.add_argument("--payload", choices=sorted(PAYLOADS), default="scalar")
+    parser.add_argument("--mode", choices=["fifo", "lastOnly"], default="fifo", help="delivery mode of the subscribers")
+    parser.add_argument("--policy", choices=["deliver", "conflate"], default="deliver", help="policy of the senders")
+    parser.add_argument("--publishers", type=int, default=1, help="publisher processes, the topics are split between them")
+    parser.add_argument("--subscribers", type=int, default=1, help="subscriber processes, each one subscribes to every topic")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds of sending per scenario")
+    parser.add_argument("--batching", action="store_true", help="run the gateway in batching mode")
+    parser.add_argument("--shards", type=int, default=1, help="gateway processes, the topics are split between them")
+    parser.add_argument("--output", default="busLoad.json", help="JSON file of the results")
+    args = parser.parse_args()
+
+    if args.topics is not None:
+        scenarios = [(args.topics, args.rate, args.payload, args.mode)]
+    else:
+        scenarios = SUITE
+
+    results = []
+    for topicCount, rate, payload, mode in scenarios:
+        result = runScenario(
+            topicCount, rate, payload, mode, args.publishers, args.subscribers, args.duration, args.batching, args.policy,
+            args.shards,
+        )
+        printResult(result)
+        results.append(result)
+
+    with open(args.output, "w") as outputFile:
+        json.dump({"commit": gitCommit(), "time": time.strftime("%Y-%m-%d %H:%M:%S"), "scenarios": results}, outputFile, indent=2)
+    print("results written to", args.output)
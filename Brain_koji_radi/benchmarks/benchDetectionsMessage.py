@@ -0,0 +1,82 @@
+# Size and cost of the object detection output of one frame on the bus:
+#   - annotated JPEG: boxes drawn on the 2048x1080 frame, JPEG, base64 and JSON (what the YOLO thread published);
+#   - pickled list: the (x1, y1, x2, y2, conf, cls) tuples pickled into the frame (wireSchema "pickle");
+#   - Detections: the DetectionFrame of the "detections" wire schema, decoded as a numpy view.
+# Decode is what a subscriber pays to get the detections, including reading the classes and boxes out of them.
+#
+# in terminal:    python3 benchmarks/benchDetectionsMessage.py
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import base64
+import json
+import pickle
+import timeit
+
+import cv2
+import numpy as np
+
+import src.utils.messages.messageCodec as messageCodec
+from src.utils.messages.allMessages import Detections
+from src.utils.messages.detections import DetectionFrame
+
+
+def sampleTracks(count, seed=0):
+    rng = np.random.default_rng(seed)
+    tracks = []
+    for track in range(count):
+        x, y = rng.uniform(0, 1900), rng.uniform(0, 950)
+        tracks.append((track + 1, x, y, x + rng.uniform(20, 150), y + rng.uniform(20, 130), rng.uniform(0.3, 1.0), int(rng.integers(0, 10))))
+    return tracks
+
+
+def annotatedJpeg(frame, tracks):
+    image = frame.copy()
+    for _, x1, y1, x2, y2, conf, cls in tracks:
+        cv2.rectangle(image, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+        cv2.putText(image, f"{cls} {conf:.2f}", (int(x1), int(y1) - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+    _, encoded = cv2.imencode(".jpg", image)
+    return json.dumps({"value": base64.b64encode(encoded).decode("utf-8")}).encode()
+
+
+def readJpeg(payload):
+    encoded = base64.b64decode(json.loads(payload)["value"])
+    return cv2.imdecode(np.frombuffer(encoded, np.uint8), cv2.IMREAD_COLOR)
+
+
+if __name__ == "__main__":
+    cv2.setNumThreads(1)
+    codec = messageCodec.codecFor(Detections)
+    frame = np.random.default_rng(1).integers(0, 255, (1080, 2048, 3), dtype=np.uint8)
+    print(f"{'output':>16} {'detections':>10} {'bytes':>8} {'encode us':>10} {'decode us':>10}")
+    for count in (0, 5, 20):
+        tracks = sampleTracks(count)
+        detectionFrame = DetectionFrame.fromTracks(1234, 1700000000.0, tracks)
+        boxes = [track[1:] for track in tracks]
+
+        payload = annotatedJpeg(frame, tracks)
+        encodeTime = timeit.timeit(lambda: annotatedJpeg(frame, tracks), number=5) / 5 * 1e6
+        decodeTime = timeit.timeit(lambda: readJpeg(payload), number=5) / 5 * 1e6
+        print(f"{'annotated JPEG':>16} {count:>10} {len(payload):>8} {encodeTime:>10.0f} {decodeTime:>10.0f}")
+
+        pickled = messageCodec.HEADER.pack(0, messageCodec.PICKLE, 0, 0, 0) + pickle.dumps(boxes, pickle.HIGHEST_PROTOCOL)
+        number = 20000
+        encodeTime = timeit.timeit(
+            lambda: messageCodec.HEADER.pack(0, messageCodec.PICKLE, 0, 0, 0) + pickle.dumps(boxes, pickle.HIGHEST_PROTOCOL), number=number
+        ) / number * 1e6
+        decodeTime = timeit.timeit(
+            lambda: [box[5] for box in pickle.loads(memoryview(pickled)[messageCodec.HEADER.size:])], number=number
+        ) / number * 1e6
+        print(f"{'pickled list':>16} {count:>10} {len(pickled):>8} {encodeTime:>10.2f} {decodeTime:>10.2f}")
+
+        encoded = codec.encode(detectionFrame)
+        decoded = messageCodec.decode(encoded)["value"]
+        assert decoded.frame == 1234 and np.array_equal(decoded.detections, detectionFrame.detections)
+        encodeTime = timeit.timeit(lambda: codec.encode(detectionFrame), number=number) / number * 1e6
+        decodeTime = timeit.timeit(lambda: messageCodec.decode(encoded)["value"].detections["cls"], number=number) / number * 1e6
+        fromTracksTime = timeit.timeit(lambda: DetectionFrame.fromTracks(1234, 0.0, tracks), number=number) / number * 1e6
+        print(f"{'Detections':>16} {count:>10} {len(encoded):>8} {encodeTime:>10.2f} {decodeTime:>10.2f}"
+              f"   (+{fromTracksTime:.2f} us to build it from the tracks)")
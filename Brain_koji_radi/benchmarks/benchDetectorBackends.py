@@ -0,0 +1,89 @@
+# Latency of the object detector backends (detectorBackends: PyTorch, ONNX Runtime, OpenVINO) on recorded frames,
+# with the same letterboxed input size and the same number of intra-op threads for all of them.
+# Reports the one-time cost (export, cached by the hash of the weights, + load + warmup), the median and p95 latency
+# of a frame, and the agreement of the detections with the first backend (IoU >= 0.5, same class).
+# The first one is "torch" by default: it runs Ultralytics' own predict on best.pt, what the car ran before the
+# backends, so the agreement checks the letterbox, decoding and NMS of the exported backends against it.
+#
+# in terminal:    python3 benchmarks/benchDetectorBackends.py --weights ../Brain/src/hardware/camera/threads/best.pt
+#                 python3 benchmarks/benchDetectorBackends.py --weights best.pt --clip raw_output_<time>.avi --threads 4
+# The camera code lives in the Brain tree, next to this one. The backends that are not installed are skipped.
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../Brain"))
+
+import argparse
+import statistics
+import time
+
+import cv2
+import numpy as np
+
+from src.hardware.camera.detectorBackends import BACKENDS, DETECTOR_INPUT_SIZE, createDetector, detectionAgreement
+
+
+def loadFrames(path, limit=100, size=(2048, 1080)):
+    """Returns the frames of a video (BGR, resized to the size of the main camera stream), or noise frames without a clip."""
+    if path is None:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8) for _ in range(20)]
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(cv2.resize(frame, size))
+    capture.release()
+    return frames
+
+
+def runBackend(name, weights, frames, size, threads):
+    """Returns the one-time cost, the latencies in ms and the detections of every frame."""
+    start = time.perf_counter()
+    detector = createDetector(name, weights, size=size, threads=threads)
+    setup = time.perf_counter() - start
+    latencies = []
+    detections = []
+    for frame in frames:
+        start = time.perf_counter()
+        detections.append(detector.detect(frame))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return setup, detector.warmupTime, latencies, detections
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency of the object detector backends.")
+    parser.add_argument("--weights", required=True, help="the .pt weights (exported once per backend, then cached)")
+    parser.add_argument("--clip", help="video of recorded frames, noise frames without it")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--size", type=int, default=DETECTOR_INPUT_SIZE, help="letterboxed input size")
+    parser.add_argument("--threads", type=int, default=1, help="intra-op threads of every backend")
+    parser.add_argument("--frames", type=int, default=100, help="frames read from the clip")
+    args = parser.parse_args()
+
+    frames = loadFrames(args.clip, args.frames)
+    print(f"{len(frames)} frames, input {args.size}x{args.size}, {args.threads} thread(s)")
+    reference = None
+    for name in args.backends:
+        try:
+            setup, warmup, latencies, detections = runBackend(name, args.weights, frames, args.size, args.threads)
+        except ImportError as e:
+            print(f"{name:12} skipped ({e})")
+            continue
+        latencies.sort()
+        line = (
+            f"{name:12} setup {setup:6.2f} s (warmup {warmup:5.2f} s)"
+            f"  median {statistics.median(latencies):7.1f} ms  p95 {latencies[int(0.95 * (len(latencies) - 1))]:7.1f} ms"
+        )
+        if reference is None:
+            reference = (name, detections)
+        else:
+            totals = [detectionAgreement(ref, own) for ref, own in zip(reference[1], detections)]
+            matched = sum(total[0] for total in totals)
+            expected = sum(total[1] for total in totals)
+            line += f"  agreement with {reference[0]} {matched}/{expected}"
+        print(line)
@@ -0,0 +1,96 @@
+# Latency and recall of the object detector on regions of the frame (DetectionRegions + detectRegions: the fixed
+# sign/semaphore region and the surroundings of the tracks, batched into one inference) against the whole frame.
+# The reference are the detections of the whole frame at a large input (--reference-size), which sees the small
+# signs best: recall is the share of its detections a mode finds (IoU >= 0.5, same class), over the whole frame and
+# inside the fixed regions only (where the signs are). The tracker of the region mode is fed with its own detections.
+#
+# in terminal:    python3 benchmarks/benchDetectorRegions.py --weights best.pt --clip raw_output_<time>.avi
+#                 python3 benchmarks/benchDetectorRegions.py --weights best.pt --clip raw_output_<time>.avi --size 320 --batch 3
+# The camera code lives in the Brain tree, next to this one. The region is given as fractions of the frame.
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../Brain"))
+
+import argparse
+import statistics
+import time
+
+import cv2
+
+from src.hardware.camera.detectionRegions import DetectionRegions
+from src.hardware.camera.detectorBackends import createDetector, detectionAgreement
+from src.hardware.camera.objectTracker import ObjectTracker
+from benchDetectorBackends import loadFrames
+
+FPS = 16
+
+
+def runMode(detector, frames, regions=None):
+    """Returns the latencies in ms and the detections of every frame."""
+    tracker = ObjectTracker()
+    latencies = []
+    detections = []
+    for index, frame in enumerate(frames):
+        start = time.perf_counter()
+        if regions is None:
+            found = detector.detect(frame)
+        else:
+            found = detector.detectRegions(frame, regions.plan(frame.shape, tracker.tracks(index / FPS)))
+        latencies.append((time.perf_counter() - start) * 1000)
+        tracker.update(found, index / FPS)
+        detections.append(found)
+    return latencies, detections
+
+
+def recall(reference, detections, area=None):
+    """Found/total reference detections, only those whose center is in area (x1, y1, x2, y2) if given."""
+    if area is not None:
+        reference = [
+            [box for box in frame if area[0] <= (box[0] + box[2]) / 2 < area[2] and area[1] <= (box[1] + box[3]) / 2 < area[3]]
+            for frame in reference
+        ]
+    totals = [detectionAgreement(ref, own) for ref, own in zip(reference, detections)]
+    return sum(total[0] for total in totals), sum(total[1] for total in totals)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detection on regions of the frame against the whole frame.")
+    parser.add_argument("--weights", required=True, help="the .pt weights of threadCamera")
+    parser.add_argument("--clip", help="recorded video, noise frames without it (latency only)")
+    parser.add_argument("--region", nargs=4, type=float, default=[0.6, 0.0, 1.0, 0.55], help="fixed region x1 y1 x2 y2, 0..1")
+    parser.add_argument("--size", type=int, default=416, help="input size of the region mode")
+    parser.add_argument("--batch", type=int, default=2, help="regions per inference")
+    parser.add_argument("--full-size", type=int, default=640, help="input size of the whole-frame mode")
+    parser.add_argument("--reference-size", type=int, default=1280, help="input size of the reference")
+    parser.add_argument("--backend", default="onnxruntime")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--frames", type=int, default=100)
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)
+    frames = loadFrames(args.clip, args.frames)
+    height, width = frames[0].shape[:2]
+    area = DetectionRegions([args.region], args.batch).fixed(width, height)[0]
+    options = dict(threads=args.threads)
+    print(f"{len(frames)} frames, fixed region {area}, reference: whole frame at {args.reference_size}")
+
+    _, reference = runMode(createDetector(args.backend, args.weights, size=args.reference_size, **options), frames)
+    modes = [
+        (f"whole frame {args.full_size}", createDetector(args.backend, args.weights, size=args.full_size, **options), None),
+        (f"region only {args.size}", createDetector(args.backend, args.weights, size=args.size, **options),
+         DetectionRegions([args.region], 1, fullEvery=0)),
+        (f"regions {args.size} x{args.batch}", createDetector(args.backend, args.weights, size=args.size, batch=args.batch, **options),
+         DetectionRegions([args.region], args.batch)),
+    ]
+    for name, detector, regions in modes:
+        latencies, detections = runMode(detector, frames, regions)
+        latencies.sort()
+        foundAll, totalAll = recall(reference, detections)
+        foundArea, totalArea = recall(reference, detections, area)
+        print(
+            f"{name:20} median {statistics.median(latencies):7.1f} ms  p95 {latencies[int(0.95 * (len(latencies) - 1))]:7.1f} ms"
+            f"  recall {foundAll}/{totalAll}, in the region {foundArea}/{totalArea}"
+        )
@@ -0,0 +1,133 @@
+# Accuracy, latency and memory of the variants of the object detector (best.pt) on the CPU: input size 320/416/640
+# and FP32, INT8 with dynamic quantization and INT8 with static quantization (the activation scales calibrated on
+# recorded frames), all on the onnxruntime backend.
+# The reference is FP32 at the largest size: its detections stand in for the ground truth, and every variant
+# reports the AP@0.5 of its detections against them (averaged over the classes, the mAP proxy) and the share of
+# the reference detections it found (IoU >= 0.5, same class). Latency is per frame (letterbox + inference + NMS),
+# RSS is the growth of the resident memory of a fresh process from loading the model to the end of the frames.
+# The variants are left in the cache of the exported models (detectorBackends.DETECTOR_CACHE_DIR), where threadCamera
+# loads them from (DETECTOR_QUANTIZATION, DETECTOR_SIZE); "int8-static" exists only after this calibration.
+#
+# in terminal:    python3 benchmarks/benchDetectorVariants.py --weights best.pt --clip raw_output_<time>.avi
+#                 python3 benchmarks/benchDetectorVariants.py --weights best.pt --clip raw_output_<time>.avi --sizes 416 --threads 4
+# The camera code lives in the Brain tree, next to this one. Even frames of the clip calibrate, odd frames evaluate.
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../Brain"))
+
+import argparse
+import statistics
+import time
+from multiprocessing import Process, Queue
+
+import cv2
+import numpy as np
+
+from src.hardware.camera.detectorBackends import (QUANTIZATIONS, boxIou, createDetector, detectionAgreement,
+                                                  exportedModel, quantizedModel)
+from benchDetectorBackends import loadFrames
+
+
+def residentMb(field):
+    """VmRSS (current) or VmHWM (peak) of this process, in MB."""
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024.0
+    return 0.0
+
+
+def averagePrecision(reference, detections, iouThreshold=0.5):
+    """Mean over the classes of the reference of the AP of the detections (all frames, ranked by confidence)."""
+    precisions = []
+    for cls in sorted({box[5] for frame in reference for box in frame}):
+        truth = [np.array([box[:4] for box in frame if box[5] == cls]).reshape(-1, 4) for frame in reference]
+        used = [np.zeros(len(boxes), dtype=bool) for boxes in truth]
+        ranked = sorted(
+            ((box[4], index, box[:4]) for index, frame in enumerate(detections) for box in frame if box[5] == cls),
+            key=lambda item: -item[0],
+        )
+        hits = np.zeros(len(ranked))
+        for rank, (_, index, box) in enumerate(ranked):
+            if len(truth[index]) == 0:
+                continue
+            ious = np.where(used[index], 0.0, boxIou(box, truth[index]))
+            best = int(ious.argmax())
+            if ious[best] >= iouThreshold:
+                used[index][best] = True
+                hits[rank] = 1
+        total = sum(len(boxes) for boxes in truth)
+        if not ranked:
+            precisions.append(0.0)
+            continue
+        recall = np.concatenate(([0.0], np.cumsum(hits) / total))
+        precision = np.concatenate(([1.0], np.cumsum(hits) / np.arange(1, len(hits) + 1)))
+        # all-point interpolation: precision is made monotonic from the right
+        precision = np.maximum.accumulate(precision[::-1])[::-1]
+        precisions.append(float(np.sum((recall[1:] - recall[:-1]) * precision[1:])))
+    return statistics.mean(precisions) if precisions else float("nan")
+
+
+def measureVariant(weights, clip, limit, size, quantization, threads, results):
+    """Runs in a fresh process, so the RSS of one variant does not include the others."""
+    cv2.setNumThreads(1)
+    frames = loadFrames(clip, limit)[1::2]
+    before = residentMb("VmRSS")
+    start = time.perf_counter()
+    detector = createDetector("onnxruntime", weights, size=size, threads=threads, quantization=quantization)
+    setup = time.perf_counter() - start
+    latencies = []
+    detections = []
+    for frame in frames:
+        start = time.perf_counter()
+        detections.append(detector.detect(frame))
+        latencies.append((time.perf_counter() - start) * 1000)
+    results.put((setup, latencies, detections, residentMb("VmHWM") - before))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accuracy, latency and RSS of the quantized and smaller detector variants.")
+    parser.add_argument("--weights", required=True, help="the .pt weights of threadCamera")
+    parser.add_argument("--clip", help="recorded video (calibration and evaluation), noise frames without it")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[640, 416, 320], help="input sizes")
+    parser.add_argument("--quantizations", nargs="+", default=list(QUANTIZATIONS), choices=list(QUANTIZATIONS))
+    parser.add_argument("--threads", type=int, default=1, help="intra-op threads (threadCamera uses 1)")
+    parser.add_argument("--frames", type=int, default=200, help="frames read from the clip")
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)
+    if args.clip is None:
+        print("no --clip: noise frames, the latencies are valid but the accuracy and the calibration are not")
+    calibration = loadFrames(args.clip, args.frames)[0::2]
+    variants = []
+    for size in sorted(args.sizes, reverse=True):
+        for quantization in ["fp32"] + [q for q in args.quantizations if q != "fp32"]:
+            start = time.perf_counter()
+            quantizedModel(exportedModel(args.weights, "onnx", size), quantization, size, calibration)
+            variants.append((size, quantization, time.perf_counter() - start))
+    del calibration
+
+    reference = None
+    print(f"{'variant':20} {'prepare':>8} {'setup':>7} {'median':>9} {'p95':>9} {'speedup':>8} {'RSS':>9} {'mAP50*':>7} {'found':>10}")
+    for size, quantization, prepare in variants:
+        results = Queue()
+        process = Process(target=measureVariant,
+                          args=(args.weights, args.clip, args.frames, size, quantization, args.threads, results))
+        process.start()
+        setup, latencies, detections, rss = results.get()
+        process.join()
+        latencies.sort()
+        median = statistics.median(latencies)
+        if reference is None:
+            reference = (median, detections)
+        totals = [detectionAgreement(ref, own) for ref, own in zip(reference[1], detections)]
+        found = f"{sum(total[0] for total in totals)}/{sum(total[1] for total in totals)}"
+        print(
+            f"{quantization + ' ' + str(size):20} {prepare:7.1f}s {setup:6.2f}s {median:7.1f}ms"
+            f" {latencies[int(0.95 * (len(latencies) - 1))]:7.1f}ms {reference[0] / median:7.2f}x {rss:6.1f} MB"
+            f" {averagePrecision(reference[1], detections):7.3f} {found:>10}"
+        )
+    print("* against the detections of the first variant, not against labels")
@@ -0,0 +1,74 @@
+# Latency of a command sent through the gateway (DrivingMode) and on a direct channel (SpeedMotor,
+# delivery = "direct"): the publisher writes on the subscriber pipe itself after the gateway handshake.
+#
+# in terminal:    python3 benchmarks/benchDirectChannels.py
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import logging
+import statistics
+import time
+from multiprocessing import Process, Queue
+
+from src.gateway.processGateway import processGateway
+from src.utils.messages.allMessages import DrivingMode, SpeedMotor
+from src.utils.messages.messageHandlerSender import messageHandlerSender
+from src.utils.messages.messageHandlerSubscriber import messageHandlerSubscriber
+
+
+def publish(queueList, message, samples):
+    """Target of the publisher process: sends the send time as the value, every 2 ms."""
+    sender = messageHandlerSender(queueList, message)
+    # leaves time for the handshake with the gateway
+    time.sleep(0.2)
+    for _ in range(samples):
+        sender.send(repr(time.perf_counter()))
+        time.sleep(0.002)
+    print(f"{message.__name__}: direct channel {'used' if sender.directPipes else 'not used'}")
+
+
+class commandReader:
+    def __init__(self, queueList, message):
+        self.subscriber = messageHandlerSubscriber(queueList, message, "fifo", True)
+
+    def run(self, samples):
+        latencies = []
+        for _ in range(samples):
+            value = self.subscriber.receiveWithBlock()
+            latencies.append(time.perf_counter() - float(value))
+        return sorted(latencies)
+
+
+def runCase(message, samples):
+    queueList = {
+        "Critical": Queue(),
+        "Warning": Queue(),
+        "General": Queue(),
+        "Config": Queue(),
+    }
+    gateway = processGateway(queueList, logging.getLogger())
+    gateway.start()
+    reader = commandReader(queueList, message)
+    time.sleep(0.5)
+
+    publisher = Process(target=publish, args=(queueList, message, samples))
+    publisher.start()
+    latencies = reader.run(samples)
+    publisher.join()
+
+    gateway._blocker.set()
+    gateway.join(1)
+    return latencies
+
+
+if __name__ == "__main__":
+    samples = 1000
+    for name, message in [("gateway", DrivingMode), ("direct", SpeedMotor)]:
+        latencies = runCase(message, samples)
+        print(
+            f"{name:>8}: median {statistics.median(latencies) * 1e6:6.0f} us   "
+            f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1e6:6.0f} us   max {latencies[-1] * 1e6:6.0f} us"
+        )
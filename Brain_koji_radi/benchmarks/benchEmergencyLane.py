@@ -0,0 +1,113 @@
+# Brake latency, from the send to the subscriber pipe, while the General queue is flooded with 50 kB frames,
+# with the Critical queue dispatched by the gateway thread and by the emergency lane (threadEmergency, with the
+# 0.5 ms GIL switch interval of GATEWAY_SWITCH_INTERVAL in main.py).
+# Two processes flood serialCamera (a third one drains it), another one sends Brake at 100 Hz.
+#
+# in terminal:    python3 benchmarks/benchEmergencyLane.py
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import logging
+import time
+from multiprocessing import Event, Pipe, Process, Queue
+
+from src.gateway.processGateway import processGateway
+from src.utils.messages.allMessages import Brake, serialCamera
+import src.utils.messages.messageCodec as messageCodec
+
+
+def flood(queueList, stop):
+    """Target of the camera processes: the frames are put without the conflation of the sender."""
+    value = "x" * 50000
+    seq = 0
+    while not stop.is_set():
+        seq += 1
+        queueList["General"].put(messageCodec.encode(serialCamera, value, seq, time.monotonic_ns()))
+
+
+def drain(pipe, stop):
+    """Target of the camera subscriber."""
+    while not stop.is_set():
+        if pipe.poll(0.1):
+            pipe.recv_bytes()
+
+
+def subscribe(queueList, message, name, pipe):
+    queueList["Config"].put(
+        {
+            "Subscribe/Unsubscribe": "subscribe",
+            "Owner": message.Owner.value,
+            "msgID": message.msgID.value,
+            "To": {"receiver": name, "pipe": pipe},
+        }
+    )
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def runCase(emergencyLane, commands):
+    queueList = {
+        "Critical": Queue(),
+        "Warning": Queue(),
+        "General": Queue(),
+        "Config": Queue(),
+    }
+    gateway = processGateway(
+        queueList, logging.getLogger(), emergencyLane=emergencyLane, switchInterval=0.0005 if emergencyLane else None
+    )
+    gateway.start()
+    brakeRecv, brakeSend = Pipe(duplex=False)
+    cameraRecv, cameraSend = Pipe(duplex=False)
+    subscribe(queueList, Brake, "brake", brakeSend)
+    subscribe(queueList, serialCamera, "camera", cameraSend)
+    time.sleep(0.5)
+
+    stop = Event()
+    processes = [Process(target=drain, args=(cameraRecv, stop))]
+    processes += [Process(target=flood, args=(queueList, stop)) for _ in range(2)]
+    for process in processes:
+        process.start()
+    time.sleep(0.5)
+
+    latencies = []
+    for seq in range(1, commands + 1):
+        queueList["Critical"].put(messageCodec.encode(Brake, 0.0, seq, time.monotonic_ns()))
+        end = time.monotonic() + 0.01
+        while brakeRecv.poll(max(0.0, end - time.monotonic())):
+            frame = brakeRecv.recv_bytes()
+            latencies.append(time.monotonic_ns() - messageCodec.stamp(frame)[1])
+        time.sleep(max(0.0, end - time.monotonic()))
+    while brakeRecv.poll(1.0):
+        frame = brakeRecv.recv_bytes()
+        latencies.append(time.monotonic_ns() - messageCodec.stamp(frame)[1])
+
+    stop.set()
+    for process in processes:
+        process.join(1)
+        if process.is_alive():
+            process.terminate()
+    gateway._blocker.set()
+    gateway.join(1)
+    if gateway.is_alive():
+        gateway.terminate()
+    return sorted(latencies)
+
+
+if __name__ == "__main__":
+    commands = 500
+    deadline = Brake.deadline.value * 1e9
+    for name, emergencyLane in [("gateway", False), ("emergency", True)]:
+        latencies = runCase(emergencyLane, commands)
+        missed = sum(1 for latency in latencies if latency > deadline)
+        print(
+            f"{name:>9}: Brake {len(latencies)}/{commands}"
+            f"   p50 {percentile(latencies, 50) / 1e3:7.0f} us"
+            f"   p99 {percentile(latencies, 99) / 1e3:7.0f} us"
+            f"   max {latencies[-1] / 1e3:7.0f} us"
+            f"   over {Brake.deadline.value * 1e3:.0f} ms: {missed}"
+        )
@@ -0,0 +1,81 @@
+# Frames seen by every stage of the camera pipeline with the old even/odd split (even frames to YOLO, odd frames to
+# the lane detection) and with the FramePipeline scheduler (every stage takes the newest frame as soon as it is free).
+# The camera is simulated at 16 fps. YOLO is simulated by a sleep (the inference releases the GIL like torch does),
+# the lane stage runs the real HoughTransformation + LaneModel on synthetic frames.
+#
+# in terminal:    python3 benchmarks/benchFramePipeline.py
+#                 python3 benchmarks/benchFramePipeline.py --yolo 0.15 --duration 10
+# The camera code lives in the Brain tree, next to this one.
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../Brain"))
+
+import argparse
+import logging
+import statistics
+import time
+
+import cv2
+
+from src.hardware.camera.framePipeline import FramePipeline
+from src.hardware.camera.laneDetection import HoughTransformation, LaneModel
+from benchLaneModel import syntheticFrames
+
+FPS = 16
+
+
+def runScenario(split, yoloSeconds, duration, frames):
+    """Returns {stage: (frames processed, frames dropped, median age of the frame when the stage finished, in ms)}."""
+    hough = HoughTransformation(logging.getLogger())
+    model = LaneModel()
+    ages = {"yolo": [], "lanes": []}
+
+    def yoloStage(frame):
+        time.sleep(yoloSeconds)
+        ages["yolo"].append((time.time() - frame["timestamp"]) * 1000)
+
+    def laneStage(frame):
+        model.update(hough.detect_lines(frame["luma"]))
+        ages["lanes"].append((time.time() - frame["timestamp"]) * 1000)
+
+    pipeline = FramePipeline(logging.getLogger())
+    pipeline.add("yolo", yoloStage, inputs=("main",))
+    pipeline.add("lanes", laneStage, inputs=("luma",))
+    pipeline.start()
+    start = time.time()
+    index = 0
+    while time.time() - start < duration:
+        luma = frames[index % len(frames)][0]
+        if not split:
+            pipeline.submit(time.time(), main=luma, luma=luma)
+        elif index % 2 == 0:
+            pipeline.submit(time.time(), main=luma)
+        else:
+            pipeline.submit(time.time(), luma=luma)
+        index += 1
+        time.sleep(max(0.0, start + index / FPS - time.time()))
+    time.sleep(yoloSeconds + 0.1)
+    pipeline.stop()
+    stats = pipeline.stats()
+    return index, {
+        name: (stats[name]["processed"], stats[name]["dropped"], statistics.median(ages[name]) if ages[name] else 0.0)
+        for name in ages
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Frames per stage: even/odd split against FramePipeline.")
+    parser.add_argument("--yolo", type=float, default=0.15, help="seconds of a simulated YOLO inference")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of camera frames")
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)
+    frames = syntheticFrames()
+    for split in (True, False):
+        captured, stages = runScenario(split, args.yolo, args.duration, frames)
+        print(f"{'even/odd split' if split else 'FramePipeline':15} {captured} frames captured")
+        for name, (processed, dropped, age) in stages.items():
+            print(f"    {name:6} processed {processed:4} ({processed / args.duration:5.1f} fps)  dropped {dropped:4}  age {age:6.1f} ms")
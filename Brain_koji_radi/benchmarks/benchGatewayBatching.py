@@ -0,0 +1,83 @@
+# Throughput of the gateway with and without batched delivery.
+#
+# A publisher process pushes a burst of telemetry-like messages (a few topics, like the
+# IMU and speed messages of threadRead) into the General queue, while the subscribers in
+# this process read them in FIFO mode. The gateway runs in its own process, as in main.py.
+#
+# in terminal:    python3 benchmarks/benchGatewayBatching.py
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import logging
+import time
+from multiprocessing import Process, Queue
+
+import src.utils.messages.messageCodec as messageCodec
+from src.gateway.processGateway import processGateway
+from src.utils.messages.messageHandlerSubscriber import messageHandlerSubscriber
+
+
+def benchTopics(topics):
+    """Returns the first string topics declared in allMessages, so the frames use their wire schema."""
+    codecs = [codec for codec in messageCodec.codecsByIndex if codec.msgType == "str"]
+    return codecs[:topics]
+
+
+def publish(queueList, topics, burst):
+    """Target of the publisher process: puts the whole burst in the General queue, as messageHandlerSender does."""
+    codecs = benchTopics(topics)
+    for index in range(burst):
+        queueList["General"].put(codecs[index % topics].encode(str(index)))
+
+
+class batchingBench:
+    def __init__(self, queueList, topics):
+        self.subscribers = []
+        for codec in benchTopics(topics):
+            self.subscribers.append(messageHandlerSubscriber(queueList, codec.message, "fifo", True))
+
+    def receiveAll(self, burst):
+        """Reads messages from all the subscribers until the whole burst arrived."""
+        received = 0
+        while received < burst:
+            for subscriber in self.subscribers:
+                while subscriber.isDataInPipe():
+                    subscriber.receiveWithBlock()
+                    received += 1
+
+
+def runCase(batching, topics, burst):
+    """Returns the delivered messages per second for one configuration."""
+    queueList = {
+        "Critical": Queue(),
+        "Warning": Queue(),
+        "General": Queue(),
+        "Config": Queue(),
+    }
+    gateway = processGateway(queueList, logging.getLogger(), batching=batching)
+    gateway.start()
+    bench = batchingBench(queueList, topics)
+    time.sleep(0.5)
+
+    publisher = Process(target=publish, args=(queueList, topics, burst))
+    start = time.perf_counter()
+    publisher.start()
+    bench.receiveAll(burst)
+    elapsed = time.perf_counter() - start
+    publisher.join()
+
+    gateway._blocker.set()
+    gateway.join(1)
+    return burst / elapsed
+
+
+if __name__ == "__main__":
+    burst = 50000
+    print(f"{'topics':>7} {'unbatched msgs/s':>17} {'batched msgs/s':>15}")
+    for topics in [1, 4, 16]:
+        unbatched = runCase(False, topics, burst)
+        batched = runCase(True, topics, burst)
+        print(f"{topics:>7} {unbatched:>17.0f} {batched:>15.0f}")
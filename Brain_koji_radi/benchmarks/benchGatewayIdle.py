@@ -0,0 +1,130 @@
+# Benchmark for the threadGateway dispatch loop.
+#
+# It runs the gateway in its own process, once with the current (blocking) dispatcher
+# and once with the old busy-spinning one, and measures:
+#   - the CPU time burnt by the gateway process while the bus is idle;
+#   - the delivery latency of isolated messages (sender Queue -> gateway -> subscriber Pipe);
+#   - the throughput of a burst, where the gateway never has time to go to sleep.
+#
+# in terminal:    python3 benchmarks/benchGatewayIdle.py
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import logging
+import os
+import statistics
+import time
+from multiprocessing import Pipe, Process, Queue
+
+from src.gateway.threads.threadGateway import threadGateway
+
+
+class busySpinGateway(threadGateway):
+    """The dispatch loop used before the blocking wait was introduced, kept only for comparison."""
+
+    def run(self):
+        while self._running:
+            message = None
+            if not self.queuesList["Critical"].empty():
+                message = self.queuesList["Critical"].get()
+            elif not self.queuesList["Warning"].empty():
+                message = self.queuesList["Warning"].get()
+            elif not self.queuesList["General"].empty():
+                message = self.queuesList["General"].get()
+            if message is not None:
+                self.send(message)
+            if not self.queuesList["Config"].empty():
+                message2 = self.queuesList["Config"].get()
+                if str.lower(message2["Subscribe/Unsubscribe"]) == "subscribe":
+                    self.subscribe(message2)
+                else:
+                    self.unsubscribe(message2)
+
+
+def runGateway(gatewayClass, queueList):
+    """Target of the gateway process."""
+    gateway = gatewayClass(queueList, logging.getLogger(), False)
+    gateway.run()
+
+
+def processCpuTime(pid):
+    """Returns the user + system CPU seconds consumed by a process (Linux only)."""
+    with open(f"/proc/{pid}/stat") as statFile:
+        fields = statFile.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def runCase(gatewayClass, idleSeconds, samples, burst):
+    """Starts a gateway process, measures the idle CPU usage, the delivery latency and the burst throughput.
+    Returns:
+        dict: The results of the run.
+    """
+    queueList = {
+        "Critical": Queue(),
+        "Warning": Queue(),
+        "General": Queue(),
+        "Config": Queue(),
+    }
+    process = Process(target=runGateway, args=(gatewayClass, queueList), daemon=True)
+    process.start()
+
+    pipeRecv, pipeSend = Pipe(duplex=False)
+    queueList["Config"].put(
+        {
+            "Subscribe/Unsubscribe": "subscribe",
+            "Owner": "bench",
+            "msgID": 1,
+            "To": {"receiver": "bench", "pipe": pipeSend},
+        }
+    )
+    time.sleep(0.5)
+
+    cpuStart = processCpuTime(process.pid)
+    wallStart = time.perf_counter()
+    time.sleep(idleSeconds)
+    idleCpu = (processCpuTime(process.pid) - cpuStart) / (time.perf_counter() - wallStart)
+
+    # Isolated messages: every message finds the gateway idle.
+    latencies = []
+    for _ in range(samples):
+        queueList["General"].put(
+            {"Owner": "bench", "msgID": 1, "msgType": "float", "msgValue": time.perf_counter()}
+        )
+        message = pipeRecv.recv()
+        latencies.append(time.perf_counter() - message["value"])
+        time.sleep(0.005)
+
+    # Burst: the queue never runs empty, so the gateway never goes to sleep.
+    burstStart = time.perf_counter()
+    for _ in range(burst):
+        queueList["General"].put({"Owner": "bench", "msgID": 1, "msgType": "float", "msgValue": 0.0})
+    for _ in range(burst):
+        pipeRecv.recv()
+    burstRate = burst / (time.perf_counter() - burstStart)
+
+    process.kill()
+    process.join()
+
+    latencies.sort()
+    return {
+        "idleCpuPercent": idleCpu * 100,
+        "latencyMedianUs": statistics.median(latencies) * 1e6,
+        "latencyP99Us": latencies[int(len(latencies) * 0.99) - 1] * 1e6,
+        "burstMsgsPerSecond": burstRate,
+    }
+
+
+if __name__ == "__main__":
+    idleSeconds = 3
+    samples = 500
+    burst = 20000
+    for name, gatewayClass in [("busy-spin", busySpinGateway), ("blocking", threadGateway)]:
+        result = runCase(gatewayClass, idleSeconds, samples, burst)
+        print(
+            f"{name:>10}: idle CPU {result['idleCpuPercent']:6.1f} %   "
+            f"latency median {result['latencyMedianUs']:8.1f} us   p99 {result['latencyP99Us']:8.1f} us   "
+            f"burst {result['burstMsgsPerSecond']:8.0f} msgs/s"
+        )
@@ -0,0 +1,97 @@
+# Microbenchmark of the per-message routing cost of threadGateway.send.
+#
+# The pipes are replaced by objects whose send() does nothing, so only the routing
+# (approval check, subscriber lookup, envelope creation) is measured. The compiled
+# routing table is compared with the list-based approval and nested dictionary walk
+# that the gateway used before.
+#
+# in terminal:    python3 benchmarks/benchGatewayRouting.py
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import logging
+import os
+import time
+from multiprocessing import Queue
+
+from src.gateway.threads.threadGateway import threadGateway
+
+
+class nullPipe:
+    """Stand-in for the sending end of a Pipe. The flow control of the gateway (subscriberWindow) writes on /dev/null."""
+
+    null = os.open(os.devnull, os.O_WRONLY)
+
+    def send(self, obj):
+        pass
+
+    def send_bytes(self, frame):
+        pass
+
+    def fileno(self):
+        return self.null
+
+
+class legacyRoutingGateway(threadGateway):
+    """The routing used before the compiled table was introduced, kept only for comparison."""
+
+    def __init__(self, queueList, logger, debugging):
+        super(legacyRoutingGateway, self).__init__(queueList, logger, debugging)
+        self.messageApproved = []
+
+    def subscribe(self, message):
+        Owner = message["Owner"]
+        Id = message["msgID"]
+        To = message["To"]["receiver"]
+        self.sendingList.setdefault(Owner, {}).setdefault(Id, {})[To] = message["To"]["pipe"]
+        self.messageApproved.append((Owner, Id))
+
+    def send(self, message):
+        Owner = message["Owner"]
+        Id = message["msgID"]
+        Type = message["msgType"]
+        Value = message["msgValue"]
+        if (Owner, Id) in self.messageApproved:
+            for element in self.sendingList[Owner][Id]:
+                self.sendingList[Owner][Id][element].send(
+                    {"Type": Type, "value": Value, "id": Id, "Owner": Owner}
+                )
+
+
+def routingCost(gatewayClass, topics, subscribers, rounds):
+    """Returns the average cost in microseconds of routing one message."""
+    queueList = {"Critical": Queue(), "Warning": Queue(), "General": Queue(), "Config": Queue()}
+    gateway = gatewayClass(queueList, logging.getLogger(), False)
+    for topic in range(topics):
+        for subscriber in range(subscribers):
+            gateway.subscribe(
+                {
+                    "Subscribe/Unsubscribe": "subscribe",
+                    "Owner": "owner" + str(topic % 5),
+                    "msgID": topic,
+                    "To": {"receiver": "receiver" + str(subscriber), "pipe": nullPipe()},
+                }
+            )
+    messages = [
+        {"Owner": "owner" + str(topic % 5), "msgID": topic, "msgType": "float", "msgValue": 1.0}
+        for topic in range(topics)
+    ]
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            gateway.send(message)
+    return (time.perf_counter() - start) / (rounds * topics) * 1e6
+
+
+if __name__ == "__main__":
+    print(f"{'topics':>7} {'subs':>5} {'legacy us/msg':>14} {'table us/msg':>13}")
+    for topics in [1, 10, 30, 100]:
+        for subscribers in [1, 3, 10]:
+            rounds = max(1, 20000 // topics)
+            legacy = routingCost(legacyRoutingGateway, topics, subscribers, rounds)
+            table = routingCost(threadGateway, topics, subscribers, rounds)
+            print(f"{topics:>7} {subscribers:>5} {legacy:>14.2f} {table:>13.2f}")
@@ -0,0 +1,103 @@
+# CPU cost per frame of the lane detection input: the 2048x1080 RGB main frame resized to 1024x540, masked,
+# gamma corrected and converted to gray (before), against the Y plane of the 512x270 YUV420 lores stream,
+# which the ISP scales and is already gray (after). Both run the same blur / Canny / HoughLinesP afterwards.
+# The frames are synthetic: a road with two lane lines, the lores frame is made from the main one.
+#
+# in terminal:    python3 benchmarks/benchLaneInput.py
+# The camera code lives in the Brain tree, next to this one.
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../Brain"))
+
+import logging
+import statistics
+import time
+
+import cv2
+import numpy as np
+
+from src.hardware.camera.laneDetection import HoughTransformation, LORES_SIZE, lumaPlane
+
+
+def syntheticFrames():
+    """Returns a 2048x1080 RGB main frame and the matching 512x270 YUV420 lores frame."""
+    rng = np.random.default_rng(0)
+    main = rng.integers(60, 90, (1080, 2048, 3), dtype=np.uint8)
+    cv2.line(main, (300, 1079), (900, 700), (235, 235, 235), 24)
+    cv2.line(main, (1750, 1079), (1150, 700), (235, 235, 235), 24)
+    lores = cv2.cvtColor(cv2.resize(main, LORES_SIZE, interpolation=cv2.INTER_AREA), cv2.COLOR_RGB2YUV_I420)
+    return main, lores
+
+
+class legacyHough:
+    """The lane detection as it ran on the main frame (resize, mask, gamma, cvtColor, then Hough)."""
+
+    def __init__(self, gamma=1.2):
+        inv_gamma = 1.0 / gamma
+        self.table = np.array([((i / 255.0) ** inv_gamma) * 255 for i in range(256)]).astype("uint8")
+
+    def process_frame(self, frame):
+        resized_frame = cv2.resize(frame, (1024, 540))
+        height, width = resized_frame.shape[:2]
+        roi_pts = np.array([
+            [0, height - 1],
+            [width - 1, height - 1],
+            [int(2 * width / 3), int(2 * height / 3)],
+            [int(width / 3), int(2 * height / 3)]
+        ], np.int32)
+        x, y, w, h = cv2.boundingRect(roi_pts)
+        roi_img = resized_frame[y:y+h, x:x+w].copy()
+        mask = np.zeros((h, w), dtype=np.uint8)
+        cv2.fillPoly(mask, [roi_pts - [x, y]], 255)
+        roi_only = cv2.bitwise_and(roi_img, roi_img, mask=mask)
+        gray = cv2.cvtColor(cv2.LUT(roi_only, self.table), cv2.COLOR_BGR2GRAY)
+        edges = cv2.Canny(cv2.blur(gray, (3, 3)), 50, 150)
+        lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=50, minLineLength=50, maxLineGap=20)
+        roi_processed = np.copy(roi_img)
+        if lines is not None:
+            for x1, y1, x2, y2 in lines.reshape(-1, 4):
+                cv2.line(roi_processed, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+        roi_final = roi_img.copy()
+        roi_final[mask == 255] = roi_processed[mask == 255]
+        output_frame = np.copy(resized_frame)
+        output_frame[y:y+h, x:x+w] = roi_final
+        cv2.polylines(output_frame, [roi_pts], isClosed=True, color=(0, 0, 255), thickness=2)
+        return output_frame, lines
+
+
+def measure(function, frames=300):
+    """Returns the median CPU time and wall time of a call, in ms."""
+    for _ in range(20):
+        function()
+    cpu = []
+    wall = []
+    for _ in range(frames):
+        cpuStart = time.process_time()
+        wallStart = time.perf_counter()
+        function()
+        wall.append((time.perf_counter() - wallStart) * 1000)
+        cpu.append((time.process_time() - cpuStart) * 1000)
+    return statistics.median(cpu), statistics.median(wall)
+
+
+if __name__ == "__main__":
+    # one thread, as on the Pi where the other cores run YOLO and the gateway
+    cv2.setNumThreads(1)
+    main, lores = syntheticFrames()
+    legacy = legacyHough()
+    hough = HoughTransformation(logging.getLogger())
+
+    _, legacyLines = legacy.process_frame(main)
+    newLines = hough.detect_lines(lumaPlane(lores))
+    print(f"lines found: main frame {0 if legacyLines is None else len(legacyLines)}, lores {0 if newLines is None else len(newLines)}")
+
+    results = {
+        "main frame (resize + gamma + cvtColor + Hough)": measure(lambda: legacy.process_frame(main)),
+        "lores Y plane (Hough)": measure(lambda: hough.process_frame(lumaPlane(lores))),
+        "lores Y plane (Hough, no annotated frame)": measure(lambda: hough.detect_lines(lumaPlane(lores))),
+    }
+    for name, (cpu, wall) in results.items():
+        print(f"{name:48} cpu {cpu:6.2f} ms/frame  wall {wall:6.2f} ms/frame")
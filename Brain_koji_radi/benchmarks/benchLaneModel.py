@@ -0,0 +1,87 @@
+# Cost and accuracy of the lane model (LaneModel) which turns the HoughLinesP segments into the LaneKeeping offset
+# and the LaneHeading angle, on stored frames, against the 62.5 ms budget of a frame at 16 fps.
+#   - model: the classification and the polynomial fits of one frame;
+#   - frame: the Hough stages + the model, i.e. what the camera runs for every lane frame.
+# The synthetic frames are drawn with a known offset and heading, so the errors of the estimate are reported too.
+#
+# in terminal:    python3 benchmarks/benchLaneModel.py                       (synthetic frames, with errors)
+#                 python3 benchmarks/benchLaneModel.py raw_output_<time>.avi (clip recorded by threadCamera, timing only)
+# The camera code lives in the Brain tree, next to this one.
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../Brain"))
+
+import logging
+import statistics
+import time
+
+import cv2
+import numpy as np
+
+from src.hardware.camera.laneDetection import HoughTransformation, LaneModel, LORES_SIZE
+from benchLaneStages import loadClip
+
+FRAME_BUDGET_MS = 1000.0 / 16
+LANE_WIDTH_PX = 300
+
+
+def syntheticFrames(count=240):
+    """Returns (frame, offset mm, heading deg) of a car that sways in a straight lane and turns slightly."""
+    rng = np.random.default_rng(1)
+    width, height = LORES_SIZE
+    center = (width - 1) / 2.0
+    top = 2 * height // 3
+    frames = []
+    for index in range(count):
+        frame = rng.integers(50, 90, (height, width), dtype=np.uint8)
+        # the car is `offset` px right of the lane center at the bottom, the lane center moves `lean` px at the top
+        offset = 50 * np.sin(index / 25.0)
+        lean = 40 * np.sin(index / 40.0)
+        bottom = center - offset
+        for side in (-1, 1):
+            xBottom = bottom + side * LANE_WIDTH_PX / 2
+            xTop = bottom + lean + side * LANE_WIDTH_PX / 5
+            cv2.line(frame, (int(round(xBottom)), height - 1), (int(round(xTop)), top), 230, 5)
+        heading = np.degrees(np.arctan(lean / (height - 1 - top)))
+        frames.append((frame, offset * 350.0 / LANE_WIDTH_PX, heading))
+    return frames
+
+
+def measure(function, items, repeats=3):
+    """Returns the median ms of a call over the items."""
+    times = []
+    for _ in range(repeats):
+        for item in items:
+            start = time.perf_counter()
+            function(item)
+            times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), max(times)
+
+
+if __name__ == "__main__":
+    # one thread, as on the Pi where the other cores run YOLO and the gateway
+    cv2.setNumThreads(1)
+    if len(sys.argv) > 1:
+        frames = [(frame, None, None) for frame in loadClip(sys.argv[1])]
+    else:
+        frames = syntheticFrames()
+    hough = HoughTransformation(logging.getLogger())
+    model = LaneModel()
+    lines = [hough.detect_lines(frame) for frame, _, _ in frames]
+
+    estimates = [model.update(frameLines) for frameLines in lines]
+    found = [(estimate, offset, heading) for estimate, (_, offset, heading) in zip(estimates, frames) if estimate is not None]
+    print(f"{len(frames)} frames, lane found in {len(found)}")
+    if found and found[0][1] is not None:
+        offsetErrors = [abs(estimate[0] - offset) for estimate, offset, _ in found]
+        headingErrors = [abs(estimate[1] - heading) for estimate, _, heading in found]
+        print(f"offset error  median {statistics.median(offsetErrors):5.1f} mm  max {max(offsetErrors):5.1f} mm")
+        print(f"heading error median {statistics.median(headingErrors):5.2f} deg max {max(headingErrors):5.2f} deg")
+
+    modelMedian, modelMax = measure(model.update, lines)
+    frameMedian, frameMax = measure(lambda frame: model.update(hough.detect_lines(frame)), [frame for frame, _, _ in frames])
+    print(f"model  median {modelMedian:6.3f} ms  max {modelMax:6.3f} ms")
+    print(f"frame  median {frameMedian:6.3f} ms  max {frameMax:6.3f} ms  ({100 * frameMedian / FRAME_BUDGET_MS:.1f}% of the 16 fps budget)")
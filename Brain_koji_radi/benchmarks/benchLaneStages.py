@@ -0,0 +1,87 @@
+# Per-stage timing of the lane detection (HoughTransformation) on a recorded clip:
+#   roi (mask + gamma), blur, canny, hough, draw (the annotated frame, only when someone views or records it).
+# Every frame of the clip is turned into the gray lores input before the timing (as the Y plane of the camera).
+# Also reports the bytes allocated per frame (tracemalloc sees the numpy arrays made by OpenCV).
+#
+# in terminal:    python3 benchmarks/benchLaneStages.py                       (synthetic clip)
+#                 python3 benchmarks/benchLaneStages.py raw_output_<time>.avi (clip recorded by threadCamera)
+# The camera code lives in the Brain tree, next to this one.
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../Brain"))
+
+import logging
+import statistics
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from src.hardware.camera.laneDetection import HoughTransformation, LORES_SIZE
+
+
+def loadClip(path, limit=600):
+    """Returns the frames of a video as gray frames of the lores size."""
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), LORES_SIZE, interpolation=cv2.INTER_AREA))
+    capture.release()
+    return frames
+
+
+def syntheticClip(count=240):
+    """Returns gray frames of the lores size: a noisy road with two lane lines that sway, and dashed markings."""
+    rng = np.random.default_rng(0)
+    width, height = LORES_SIZE
+    frames = []
+    for index in range(count):
+        frame = rng.integers(50, 90, (height, width), dtype=np.uint8)
+        shift = int(40 * np.sin(index / 20.0))
+        cv2.line(frame, (80 + shift, height - 1), (215 + shift // 2, 175), 230, 6)
+        cv2.line(frame, (430 + shift, height - 1), (295 + shift // 2, 175), 230, 6)
+        if (index // 8) % 2 == 0:
+            cv2.line(frame, (255 + shift, height - 1), (255 + shift // 2, 225), 200, 3)
+        frames.append(frame)
+    return frames
+
+
+def run(hough, frames, annotate, repeats=3):
+    """Returns the median ms of every stage and of the whole frame, and the bytes allocated per frame."""
+    stages = {stage: [] for stage in hough.STAGES}
+    for frame in frames[:20]:
+        hough.process_frame(frame, annotate)
+    for _ in range(repeats):
+        for frame in frames:
+            hough.process_frame(frame, annotate)
+            for stage, value in hough.stage_ms.items():
+                stages[stage].append(value)
+    medians = {stage: statistics.median(values) for stage, values in stages.items()}
+    medians["total"] = sum(medians.values())
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    for frame in frames:
+        hough.process_frame(frame, annotate)
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return medians, peak
+
+
+if __name__ == "__main__":
+    # one thread, as on the Pi where the other cores run YOLO and the gateway
+    cv2.setNumThreads(1)
+    frames = loadClip(sys.argv[1]) if len(sys.argv) > 1 else syntheticClip()
+    print(f"{len(frames)} frames of {LORES_SIZE[0]}x{LORES_SIZE[1]}")
+    hough = HoughTransformation(logging.getLogger(), profile=True)
+    for annotate in (True, False):
+        medians, peak = run(hough, frames, annotate)
+        stages = "  ".join(f"{stage} {medians[stage]:.3f}" for stage in hough.STAGES)
+        print(f"annotate={annotate!s:5}  {stages}  total {medians['total']:.3f} ms  peak alloc {peak / 1024:.0f} KiB")
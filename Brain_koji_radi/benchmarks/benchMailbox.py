@@ -0,0 +1,83 @@
+# Cost of reading the newest value of a high-rate topic, through the gateway and a lastOnly pipe
+# (CurrentSteer) and through the shared memory mailbox (CurrentSpeed, delivery = "mailbox").
+# A publisher process sends the topic at full speed, the consumer reads it every 10 ms like a control loop.
+#
+# in terminal:    python3 benchmarks/benchMailbox.py
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import logging
+import statistics
+import time
+from multiprocessing import Event, Process, Queue
+
+from src.gateway.processGateway import processGateway
+from src.utils.messages.allMessages import CurrentSpeed, CurrentSteer
+from src.utils.messages.messageHandlerSender import messageHandlerSender
+from src.utils.messages.messageHandlerSubscriber import messageHandlerSubscriber
+
+
+def publish(queueList, message, ready, stop):
+    """Target of the publisher process: sends the send time on a topic as fast as possible."""
+    sender = messageHandlerSender(queueList, message)
+    ready.set()
+    while not stop.is_set():
+        sender.send(time.perf_counter())
+
+
+class controlLoop:
+    def __init__(self, queueList, message):
+        self.subscriber = messageHandlerSubscriber(queueList, message, "lastOnly", True)
+
+    def run(self, reads):
+        """Returns the duration of every read and the age of the value it returned, in seconds."""
+        durations = []
+        ages = []
+        while len(durations) < reads:
+            time.sleep(0.01)
+            start = time.perf_counter()
+            value = self.subscriber.receive()
+            end = time.perf_counter()
+            if value is not None:
+                durations.append(end - start)
+                ages.append(end - value)
+        return durations, ages
+
+
+def runCase(message, reads):
+    queueList = {
+        "Critical": Queue(),
+        "Warning": Queue(),
+        "General": Queue(),
+        "Config": Queue(),
+    }
+    gateway = processGateway(queueList, logging.getLogger())
+    gateway.start()
+    loop = controlLoop(queueList, message)
+    time.sleep(0.5)
+
+    ready, stop = Event(), Event()
+    publisher = Process(target=publish, args=(queueList, message, ready, stop))
+    publisher.start()
+    ready.wait()
+    time.sleep(0.1)
+    durations, ages = loop.run(reads)
+    stop.set()
+    publisher.join()
+
+    gateway._blocker.set()
+    gateway.join(1)
+    return durations, ages
+
+
+if __name__ == "__main__":
+    reads = 200
+    for name, message in [("pipe", CurrentSteer), ("mailbox", CurrentSpeed)]:
+        durations, ages = runCase(message, reads)
+        print(
+            f"{name:>8}: read median {statistics.median(durations) * 1e6:7.1f} us   max {max(durations) * 1e6:7.1f} us   "
+            f"value age median {statistics.median(ages) * 1e6:7.1f} us   max {max(ages) * 1e6:7.1f} us"
+        )
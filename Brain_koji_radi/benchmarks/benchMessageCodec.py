@@ -0,0 +1,59 @@
+# Size and encode/decode time of the gateway envelopes, pickled dictionaries against messageCodec frames.
+#
+# The dictionary path is what the bus did before: the sender pickled
+# {"Owner", "msgID", "msgType", "msgValue"} into the queue and the gateway pickled
+# {"Type", "value", "id", "Owner"} into every pipe. With messageCodec the same frame
+# travels on both hops.
+#
+# in terminal:    python3 benchmarks/benchMessageCodec.py
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pickle
+import timeit
+
+import src.utils.messages.messageCodec as messageCodec
+from src.utils.messages.allMessages import BatteryLvl, Control, CurrentSpeed, ImuData, Recording
+
+SAMPLES = [
+    (CurrentSpeed, 12.5),
+    (BatteryLvl, 87),
+    (Recording, True),
+    (ImuData, str({"roll": "0.1", "pitch": "-0.2", "yaw": "12.3", "accelx": "0.01", "accely": "0.0", "accelz": "9.8"})),
+    (Control, {"Time": "10", "Speed": "20", "Steer": "5"}),
+]
+
+
+def dictionaryHops(message, value):
+    """Both pickles and unpickles of the old envelopes."""
+    queued = pickle.dumps(
+        {"Owner": message.Owner.value, "msgID": message.msgID.value, "msgType": message.msgType.value, "msgValue": value}
+    )
+    received = pickle.loads(queued)
+    piped = pickle.dumps(
+        {"Type": received["msgType"], "value": received["msgValue"], "id": received["msgID"], "Owner": received["Owner"]}
+    )
+    return pickle.loads(piped), len(queued) + len(piped)
+
+
+def codecHops(message, value, codec):
+    """Encoding once, routing by header in the gateway and decoding in the subscriber."""
+    frame = codec.encode(value)
+    messageCodec.topicKey(frame)
+    return messageCodec.decode(frame), 2 * len(frame)
+
+
+if __name__ == "__main__":
+    number = 20000
+    print(f"{'message':>13} {'dict bytes':>11} {'codec bytes':>12} {'dict us':>8} {'codec us':>9}")
+    for message, value in SAMPLES:
+        codec = messageCodec.codecFor(message)
+        envelope, dictBytes = dictionaryHops(message, value)
+        decoded, codecBytes = codecHops(message, value, codec)
+        assert decoded["value"] == envelope["value"] and decoded["Type"] == envelope["Type"]
+        dictTime = timeit.timeit(lambda: dictionaryHops(message, value), number=number) / number * 1e6
+        codecTime = timeit.timeit(lambda: codecHops(message, value, codec), number=number) / number * 1e6
+        print(f"{message.__name__:>13} {dictBytes:>11} {codecBytes:>12} {dictTime:>8.2f} {codecTime:>9.2f}")
@@ -0,0 +1,141 @@
+# Per-frame object boxes with YOLO on every Nth frame: holding the last detections until the next ones (what the
+# camera streamed before) against the ObjectTracker, which extrapolates its Kalman boxes to every frame.
+# The scene is synthetic with known boxes: signs that drift outward and grow as the car drives past them, and cars
+# that cross the frame. The simulated detector misses 10% of the objects, jitters the boxes by 3% of their size and
+# returns its detections `--latency` frames after the frame they were made on (YOLO on the Pi takes ~3 frames).
+# Reports the share of the true boxes covered per frame (IoU >= 0.5), their mean IoU, the identity switches of the
+# tracks, the YOLO runs per frame and the cost of the tracker.
+#
+# in terminal:    python3 benchmarks/benchObjectTracker.py
+#                 python3 benchmarks/benchObjectTracker.py --latency 2 --frames 2000
+# The camera code lives in the Brain tree, next to this one.
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../Brain"))
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from src.hardware.camera.objectTracker import DetectionSchedule, ObjectTracker, iouMatrix
+
+FPS = 16
+WIDTH, HEIGHT = 2048, 1080
+
+
+def syntheticScene(frames, seed=0):
+    """Returns, for every frame, the true boxes as {object id: (x1, y1, x2, y2, cls)}."""
+    rng = np.random.default_rng(seed)
+    objects = {}
+    nextId = 0
+    scene = []
+    for index in range(frames):
+        if rng.random() < 0.04 or not objects:
+            if rng.random() < 0.6:
+                # sign: starts small near the middle, moves outward and grows
+                side = rng.choice((-1, 1))
+                objects[nextId] = [WIDTH / 2 + side * rng.uniform(100, 300), rng.uniform(300, 500), 40.0, 40.0,
+                                   side * rng.uniform(80, 200), rng.uniform(-30, 10), 1.6, int(rng.integers(0, 5))]
+            else:
+                # car: crosses the frame
+                side = rng.choice((-1, 1))
+                objects[nextId] = [WIDTH / 2 - side * WIDTH / 2, rng.uniform(500, 800), 320.0, 180.0,
+                                   side * rng.uniform(200, 500), 0.0, 1.0, 5]
+            nextId += 1
+        boxes = {}
+        for objectId, obj in list(objects.items()):
+            obj[0] += obj[4] / FPS
+            obj[1] += obj[5] / FPS
+            obj[2] *= obj[6] ** (1 / FPS)
+            obj[3] *= obj[6] ** (1 / FPS)
+            if obj[0] < -obj[2] or obj[0] > WIDTH + obj[2] or obj[3] > HEIGHT / 2:
+                del objects[objectId]
+                continue
+            boxes[objectId] = (obj[0] - obj[2] / 2, obj[1] - obj[3] / 2, obj[0] + obj[2] / 2, obj[1] + obj[3] / 2, obj[7])
+        scene.append(boxes)
+    return scene
+
+
+def detect(boxes, rng):
+    """The simulated YOLO: misses, jitter, confidence."""
+    detections = []
+    for x1, y1, x2, y2, cls in boxes.values():
+        if rng.random() < 0.1:
+            continue
+        jitter = rng.normal(0, 0.03, 4) * [x2 - x1, y2 - y1, x2 - x1, y2 - y1]
+        detections.append((x1 + jitter[0], y1 + jitter[1], x2 + jitter[2], y2 + jitter[3], rng.uniform(0.5, 0.95), cls))
+    return detections
+
+
+def runScheme(scene, interval, adaptive, tracked, latency, seed=1):
+    """Returns (covered, mean IoU, identity switches, YOLO runs per frame, tracker ms per frame)."""
+    rng = np.random.default_rng(seed)
+    tracker = ObjectTracker()
+    schedule = DetectionSchedule(interval, adaptive)
+    pending = None
+    held = []
+    covered = total = 0
+    ious = []
+    identities = {}
+    switches = 0
+    runs = 0
+    cost = []
+    for index, boxes in enumerate(scene):
+        timestamp = index / FPS
+        start = time.perf_counter()
+        if pending and pending[0] <= index:
+            frameIndex, detections = pending[1:]
+            pending = None
+            if tracked:
+                tracker.update(detections, frameIndex / FPS)
+                schedule.record(frameIndex, tracker)
+            else:
+                held = [(None,) + detection for detection in detections]
+                schedule.lastFrame = frameIndex
+        shown = tracker.tracks(timestamp) if tracked else held
+        cost.append((time.perf_counter() - start) * 1000)
+        # YOLO is busy while its last frame is in flight, as with the "latest" stage
+        if not pending and schedule.due(index):
+            pending = (index + latency, index, detect(boxes, rng))
+            runs += 1
+
+        total += len(boxes)
+        if not boxes or not shown:
+            continue
+        truth = np.array([box[:4] for box in boxes.values()])
+        matrix = iouMatrix(truth, np.array([box[1:5] for box in shown]))
+        for row, objectId in enumerate(boxes):
+            column = int(matrix[row].argmax())
+            if matrix[row, column] >= 0.5:
+                covered += 1
+                ious.append(matrix[row, column])
+                trackId = shown[column][0]
+                if tracked:
+                    if objectId in identities and identities[objectId] != trackId:
+                        switches += 1
+                    identities[objectId] = trackId
+    return covered / max(total, 1), statistics.mean(ious) if ious else 0.0, switches, runs / len(scene), statistics.mean(cost)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-frame boxes: held detections against the ObjectTracker.")
+    parser.add_argument("--frames", type=int, default=1600, help="frames of the synthetic scene (16 fps)")
+    parser.add_argument("--latency", type=int, default=3, help="frames between a YOLO frame and its detections")
+    args = parser.parse_args()
+
+    scene = syntheticScene(args.frames)
+    print(f"{args.frames} frames, {sum(len(boxes) for boxes in scene)} true boxes, detections {args.latency} frames late")
+    schemes = [("held, every 1", 1, False, False), ("held, every 3", 3, False, False)]
+    schemes += [(f"tracker, every {n}", n, False, True) for n in (1, 3, 4, 6)]
+    schemes += [("tracker, adaptive 1..4", 4, True, True), ("tracker, adaptive 1..6", 6, True, True)]
+    for name, interval, adaptive, tracked in schemes:
+        covered, iou, switches, runs, cost = runScheme(scene, interval, adaptive, tracked, args.latency)
+        print(
+            f"{name:24} covered {100 * covered:5.1f}%  IoU {iou:5.3f}  id switches {switches if tracked else '-':>3}"
+            f"  YOLO {runs:4.2f}/frame  tracker {cost:6.3f} ms/frame"
+        )
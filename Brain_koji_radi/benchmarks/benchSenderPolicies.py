@@ -0,0 +1,99 @@
+# Brake commands lost during a camera burst, with the old global drop-if-not-empty sender and with the
+# per-topic policies of allMessages (serialCamera is conflated, Brake is always delivered).
+# One process floods serialCamera with 200 kB frames, another sends Brake at 100 Hz.
+#
+# in terminal:    python3 benchmarks/benchSenderPolicies.py
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import logging
+import time
+from multiprocessing import Event, Process, Queue
+
+from src.gateway.processGateway import processGateway
+from src.utils.messages.allMessages import Brake, serialCamera
+from src.utils.messages.messageHandlerSender import messageHandlerSender
+from src.utils.messages.messageHandlerSubscriber import messageHandlerSubscriber
+
+
+class legacySender(messageHandlerSender):
+    """The sender before the policies: every message is dropped while the queue is not empty."""
+
+    def send(self, value):
+        queue = self.queuesList[self.message.Queue.value]
+        if not queue.empty():
+            self.dropped += 1
+            return
+        queue.put(self.encode(value))
+        self.numbered()
+
+
+def flood(queueList, senderClass, stop, results):
+    """Target of the camera process."""
+    sender = senderClass(queueList, serialCamera)
+    frame = "x" * 200000
+    while not stop.is_set():
+        sender.send(frame)
+    results.put(("serialCamera", sender.counters()))
+
+
+def brake(queueList, senderClass, commands, results):
+    """Target of the dashboard process."""
+    sender = senderClass(queueList, Brake)
+    for _ in range(commands):
+        sender.send(0.0)
+        time.sleep(0.01)
+    results.put(("Brake", sender.counters()))
+
+
+class consumer:
+    def __init__(self, queueList):
+        self.brakeSubscriber = messageHandlerSubscriber(queueList, Brake, "fifo", True)
+        self.cameraSubscriber = messageHandlerSubscriber(queueList, serialCamera, "lastOnly", True)
+
+    def count(self, duration):
+        received = 0
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            if self.brakeSubscriber.receive() is not None:
+                received += 1
+            self.cameraSubscriber.receive()
+        return received
+
+
+def runCase(senderClass, commands):
+    queueList = {
+        "Critical": Queue(),
+        "Warning": Queue(),
+        "General": Queue(),
+        "Config": Queue(),
+    }
+    gateway = processGateway(queueList, logging.getLogger())
+    gateway.start()
+    reader = consumer(queueList)
+    time.sleep(0.5)
+
+    stop, results = Event(), Queue()
+    camera = Process(target=flood, args=(queueList, senderClass, stop, results))
+    dashboard = Process(target=brake, args=(queueList, senderClass, commands, results))
+    camera.start()
+    dashboard.start()
+    received = reader.count(commands * 0.01 + 1.0)
+    dashboard.join()
+    stop.set()
+    counters = dict(results.get() for _ in range(2))
+    camera.join()
+
+    gateway._blocker.set()
+    gateway.join(1)
+    return received, counters
+
+
+if __name__ == "__main__":
+    commands = 300
+    for name, senderClass in [("legacy", legacySender), ("policies", messageHandlerSender)]:
+        received, counters = runCase(senderClass, commands)
+        print(f"{name:>9}: Brake received {received}/{commands}   Brake {counters['Brake']}   serialCamera {counters['serialCamera']}")
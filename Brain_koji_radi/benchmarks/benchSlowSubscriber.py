@@ -0,0 +1,142 @@
+# Control latency while a slow subscriber (a dashboard stalled in eventlet) stops reading its pipes,
+# with the gateway writing on the pipes unconditionally and with the credit windows (subscriberWindow).
+# One process floods Location (conflate) and Record (deliver), which the slow subscriber reads once every
+# 50 ms, and Control is sent at 100 Hz to a subscriber that reads it at once (threadWrite).
+#
+# in terminal:    python3 benchmarks/benchSlowSubscriber.py
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import logging
+import os
+import time
+from multiprocessing import Event, Pipe, Process, Queue
+
+from src.gateway.processGateway import processGateway
+from src.gateway.subscriberWindow import subscriberWindow
+import src.gateway.threads.threadGateway as threadGateway
+from src.utils.messages.allMessages import BusMetrics, Control, Location, Record
+import src.utils.messages.messageCodec as messageCodec
+
+
+class blockingWindow(subscriberWindow):
+    """The gateway before the windows: every frame is written, the write blocks when the pipe is full."""
+
+    def __init__(self, pipe, name, window=None, maxBacklog=256):
+        super(blockingWindow, self).__init__(pipe, name, window, maxBacklog)
+        os.set_blocking(self.fd, True)
+
+    def send(self, frame, policy="deliver"):
+        self.pipe.send_bytes(frame)
+        self.sent += 1
+        return False
+
+    def sendBatch(self, frames):
+        self.pipe.send_bytes(messageCodec.encodeBatch(frames))
+        self.sent += len(frames)
+        return False
+
+
+def flood(queueList, stop):
+    """Target of the flooding process."""
+    location = {"x": 1.0, "y": 2.0, "trace": "x" * 2000}
+    seq = 0
+    while not stop.is_set():
+        seq += 1
+        queueList["General"].put(messageCodec.encode(Location, location, seq, time.monotonic_ns()))
+        queueList["General"].put(messageCodec.encode(Record, "x" * 500, seq, time.monotonic_ns()))
+        time.sleep(0.001)
+
+
+def slowReader(pipes, stop):
+    """Target of the slow subscriber."""
+    while not stop.is_set():
+        for pipe in pipes:
+            if pipe.poll():
+                pipe.recv_bytes()
+        time.sleep(0.05)
+
+
+def subscribe(queueList, message, name, pipe):
+    queueList["Config"].put(
+        {
+            "Subscribe/Unsubscribe": "subscribe",
+            "Owner": message.Owner.value,
+            "msgID": message.msgID.value,
+            "To": {"receiver": name, "pipe": pipe},
+        }
+    )
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def runCase(windowClass, commands):
+    threadGateway.subscriberWindow = windowClass
+    queueList = {
+        "Critical": Queue(),
+        "Warning": Queue(),
+        "General": Queue(),
+        "Config": Queue(),
+    }
+    gateway = processGateway(queueList, logging.getLogger())
+    gateway.start()
+    controlRecv, controlSend = Pipe(duplex=False)
+    metricsRecv, metricsSend = Pipe(duplex=False)
+    slowPipes = []
+    for message in [Location, Record]:
+        slowRecv, slowSend = Pipe(duplex=False)
+        subscribe(queueList, message, "processDashboard", slowSend)
+        slowPipes.append(slowRecv)
+    subscribe(queueList, Control, "threadWrite", controlSend)
+    subscribe(queueList, BusMetrics, "benchmark", metricsSend)
+    time.sleep(0.5)
+
+    stop = Event()
+    processes = [Process(target=flood, args=(queueList, stop)), Process(target=slowReader, args=(slowPipes, stop))]
+    for process in processes:
+        process.start()
+    time.sleep(0.5)
+
+    latencies = []
+    for seq in range(1, commands + 1):
+        queueList["General"].put(messageCodec.encode(Control, {"action": "speed"}, seq, time.monotonic_ns()))
+        end = time.monotonic() + 0.01
+        while controlRecv.poll(max(0.0, end - time.monotonic())):
+            frame = controlRecv.recv_bytes()
+            latencies.append(time.monotonic_ns() - messageCodec.stamp(frame)[1])
+        time.sleep(max(0.0, end - time.monotonic()))
+    pipes = {}
+    while metricsRecv.poll():
+        snapshot = messageCodec.decode(metricsRecv.recv_bytes())["value"]
+        pipes = snapshot.get("pipes", pipes)
+
+    stop.set()
+    for process in processes:
+        process.join(1)
+        if process.is_alive():
+            process.terminate()
+    gateway.terminate()
+    return sorted(latencies), pipes
+
+
+if __name__ == "__main__":
+    commands = 300
+    for name, windowClass in [("blocking", blockingWindow), ("windows", subscriberWindow)]:
+        latencies, pipes = runCase(windowClass, commands)
+        if latencies:
+            print(
+                f"{name:>9}: Control {len(latencies)}/{commands}"
+                f"   p50 {percentile(latencies, 50) / 1e3:8.0f} us"
+                f"   p99 {percentile(latencies, 99) / 1e3:8.0f} us"
+                f"   max {latencies[-1] / 1e3:8.0f} us"
+            )
+        else:
+            print(f"{name:>9}: Control 0/{commands}")
+        for pipe, counters in sorted(pipes.items()):
+            if pipe.startswith("processDashboard"):
+                print(f"           {pipe}: {counters}")
@@ -0,0 +1,116 @@
+# Startup-to-ready time of a process with the subscriptions of the dashboard (every topic of allMessages it does
+# not own), with one subscriber and one Config message per topic, and with a SubscriptionManifest (one bulk message).
+# Ready means the gateway routes all the topics: the process sends a probe on every topic that did not reach it
+# yet, every millisecond, until all of them arrived.
+#
+# in terminal:    python3 benchmarks/benchStartup.py
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import inspect
+import logging
+import statistics
+import time
+from enum import Enum
+from multiprocessing import Process, Queue
+
+from src.gateway.processGateway import processGateway
+import src.utils.messages.allMessages as allMessages
+import src.utils.messages.messageCodec as messageCodec
+from src.utils.messages.messageHandlerSubscriber import messageHandlerSubscriber
+from src.utils.messages.subscriptionManifest import SubscriptionManifest
+
+
+def dashboardTopics():
+    topics = []
+    for name, cls in inspect.getmembers(allMessages, inspect.isclass):
+        if name != "Enum" and issubclass(cls, Enum) and cls.Owner.value != "Dashboard":
+            topics.append(cls)
+    return topics
+
+
+class startup:
+    """The process under test."""
+
+    def __init__(self, queueList, bulk):
+        start = time.perf_counter()
+        self.manifest = None
+        if bulk:
+            self.manifest = SubscriptionManifest(queueList, "startup", {cls.__name__: (cls, "fifo") for cls in dashboardTopics()})
+            self.manifest.subscribe()
+            self.subscribers = list(self.manifest)
+        else:
+            # a loop, not a list comprehension: messageHandlerSubscriber reads "self" in the frame of its caller
+            self.subscribers = []
+            for cls in dashboardTopics():
+                self.subscribers.append(messageHandlerSubscriber(queueList, cls, "fifo", True))
+        self.subscribed = time.perf_counter() - start
+        waiting = {subscriber: subscriber._message for subscriber in self.subscribers}
+        while waiting:
+            for subscriber, message in list(waiting.items()):
+                if subscriber.isDataInPipe():
+                    del waiting[subscriber]
+                else:
+                    queueList[message.Queue.value].put(messageCodec.encode(message, None))
+            time.sleep(0.001)
+        self.ready = time.perf_counter() - start
+
+    def unsubscribe(self):
+        """The next process subscribes with the same receiver name."""
+        if self.manifest is not None:
+            self.manifest.unsubscribe()
+        else:
+            for subscriber in self.subscribers:
+                subscriber.unsubscribe()
+        # the probes still queued are sent to our pipes until the gateway applies the unsubscription
+        quiet = time.perf_counter()
+        while time.perf_counter() - quiet < 0.2:
+            for subscriber in self.subscribers:
+                if subscriber.isDataInPipe():
+                    subscriber.empty()
+                    quiet = time.perf_counter()
+            time.sleep(0.001)
+
+
+def run(queueList, bulk, results):
+    process = startup(queueList, bulk)
+    process.unsubscribe()
+    results.put((process.subscribed, process.ready))
+
+
+def runCase(bulk, repeats):
+    queueList = {
+        "Critical": Queue(),
+        "Warning": Queue(),
+        "General": Queue(),
+        "Config": Queue(),
+    }
+    gateway = processGateway(queueList, logging.getLogger())
+    gateway.start()
+    time.sleep(0.5)
+    subscribed, ready = [], []
+    results = Queue()
+    for _ in range(repeats):
+        process = Process(target=run, args=(queueList, bulk, results))
+        process.start()
+        result = results.get()
+        process.join()
+        subscribed.append(result[0])
+        ready.append(result[1])
+    gateway._blocker.set()
+    gateway.join(1)
+    return subscribed, ready
+
+
+if __name__ == "__main__":
+    repeats = 20
+    print(f"{len(dashboardTopics())} topics, {repeats} process starts")
+    for name, bulk in [("per topic", False), ("manifest", True)]:
+        subscribed, ready = runCase(bulk, repeats)
+        print(
+            f"{name:>9}: subscribe calls {statistics.median(subscribed) * 1e3:6.2f} ms"
+            f"   ready {statistics.median(ready) * 1e3:6.2f} ms (median)   {max(ready) * 1e3:6.2f} ms (max)"
+        )
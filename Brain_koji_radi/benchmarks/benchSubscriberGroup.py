@@ -0,0 +1,101 @@
+# Command latency of a threadWrite-like consumer: nine LastOnly subscribers, of which only
+# SpeedMotor receives messages. The old loop calls receive() on every subscriber in turn
+# (each one can block 1 ms in select); the new one waits on all of them with SubscriberGroup.
+#
+# in terminal:    python3 benchmarks/benchSubscriberGroup.py
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import logging
+import statistics
+import time
+from multiprocessing import Process, Queue
+
+from src.gateway.processGateway import processGateway
+from src.utils.messages.allMessages import (
+    Klem,
+    Control,
+    SteerMotor,
+    SpeedMotor,
+    Brake,
+    ToggleBatteryLvl,
+    ToggleImuData,
+    ToggleInstant,
+    ToggleResourceMonitor
+)
+from src.utils.messages.messageHandlerSender import messageHandlerSender
+from src.utils.messages.messageHandlerSubscriber import messageHandlerSubscriber
+from src.utils.messages.subscriberGroup import SubscriberGroup
+
+
+def publish(queueList, samples):
+    """Target of the publisher process: sends the send time as the speed command, every 5 ms."""
+    speedMotorSender = messageHandlerSender(queueList, SpeedMotor)
+    for _ in range(samples):
+        speedMotorSender.send(repr(time.perf_counter()))
+        time.sleep(0.005)
+
+
+class writeBench:
+    def __init__(self, queueList):
+        self.subscribers = []
+        for message in [Klem, Control, SteerMotor, SpeedMotor, Brake, ToggleInstant, ToggleBatteryLvl, ToggleResourceMonitor, ToggleImuData]:
+            self.subscribers.append(messageHandlerSubscriber(queueList, message, "lastOnly", True))
+        self.group = SubscriberGroup(self.subscribers)
+
+    def sequential(self, duration):
+        """The threadWrite loop before SubscriberGroup."""
+        latencies = []
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            for subscriber in self.subscribers:
+                value = subscriber.receive()
+                if value is not None:
+                    latencies.append(time.perf_counter() - float(value))
+        return latencies
+
+    def grouped(self, duration):
+        """The threadWrite loop with SubscriberGroup."""
+        latencies = []
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            for subscriber in self.group.wait(0.1):
+                value = subscriber.receiveWithBlock()
+                latencies.append(time.perf_counter() - float(value))
+        return latencies
+
+
+def runCase(mode, samples):
+    """Returns the latencies of the speed commands, in seconds."""
+    queueList = {
+        "Critical": Queue(),
+        "Warning": Queue(),
+        "General": Queue(),
+        "Config": Queue(),
+    }
+    gateway = processGateway(queueList, logging.getLogger())
+    gateway.start()
+    bench = writeBench(queueList)
+    time.sleep(0.5)
+
+    publisher = Process(target=publish, args=(queueList, samples))
+    publisher.start()
+    latencies = getattr(bench, mode)(samples * 0.005 + 1.0)
+    publisher.join()
+
+    gateway._blocker.set()
+    gateway.join(1)
+    return sorted(latencies)
+
+
+if __name__ == "__main__":
+    samples = 400
+    for mode in ["sequential", "grouped"]:
+        latencies = runCase(mode, samples)
+        print(
+            f"{mode:>10}: median {statistics.median(latencies) * 1e3:6.3f} ms   "
+            f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1e3:6.3f} ms   max {latencies[-1] * 1e3:6.3f} ms"
+        )
@@ -81,6 +81,7 @@ from src.dashboard.processDashboard import processDashboard
 from src.hardware.camera.processCamera import processCamera
 from src.hardware.serialhandler.processSerialHandler import processSerialHandler
 from src.data.Semaphores.Semaphores import processSemaphores
+from src.utils.recorder.processRecorder import processRecorder
 from src.data.TrafficCommunication.processTrafficCommunication import processTrafficCommunication
 from src.utils.ipManager.IpReplacement import IPManager
 
@@ -90,6 +91,16 @@ ENABLE_CAMERA = True
 ENABLE_SEMAPHORES = False
 ENABLE_TRAFFIC_COMMUNICATION = False
 ENABLE_SERIAL_HANDLER = True
+ENABLE_RECORDER = False  # snima sav saobracaj gateway-a u recordings/, reprodukuje se sa src/utils/recorder/replay.py
+# Podela gateway-a na procese (shard-ove) po Owner-u ili (Owner, msgID); sve ostalo (komande, Critical) ostaje u glavnom
+GATEWAY_SHARDS = {
+    "vision": ["threadCamera", "threadCarsAndSemaphores"],
+    "telemetry": ["threadRead", "threadTrafficCommunication", "threadGateway"],
+}
+# GIL switch interval gateway procesa (sekunde): koliko najduze emergency lane (Brake, Klem) ceka GIL dok je gateway
+# nit zauzeta (Python podrazumeva 5 ms). Cena je vise prebacivanja niti u celom procesu, pa malo manji protok gateway-a;
+# None ostavlja podrazumevani
+GATEWAY_SWITCH_INTERVAL = 0.0005
 
 # ===================================== HELPER FUNKCIJE ==================================
 def set_process_priority():
@@ -148,7 +159,7 @@ def initialize_processes(queueList, logger):
     processes = []
 
     # Inicijalizacija gateway procesa – pokreće se odmah
-    gateway = processGateway(queueList, logger)
+    gateway = processGateway(queueList, logger, shards=GATEWAY_SHARDS, switchInterval=GATEWAY_SWITCH_INTERVAL)
     gateway.start()
     logger.info("Gateway process started.")
 
@@ -179,6 +190,10 @@ def initialize_processes(queueList, logger):
         serial_proc = processSerialHandler(queueList, logger, debugging=False)
         processes.append(serial_proc)
 
+    if ENABLE_RECORDER:
+        recorder_proc = processRecorder(queueList, logger, debugging=False)
+        processes.append(recorder_proc)
+
     return processes, gateway
 
 def stop_processes(processes, gateway):
@@ -30,22 +30,72 @@ if __name__ == "__main__":
     import sys
     sys.path.insert(0, "../..")
 
+import sys
+
 from src.templates.workerprocess import WorkerProcess
 from src.gateway.threads.threadGateway import threadGateway
+from src.gateway.threads.threadEmergency import threadEmergency
+from src.gateway.threads.threadDeadlineWatchdog import threadDeadlineWatchdog
+from src.utils.messages.shards import createShards
 
 
 class processGateway(WorkerProcess):
     """This process handle all the data distribution\n
+    The traffic can be split between several dispatcher processes (shards), each one with its own queues, so the
+    routing is not limited to one core. A topic belongs to exactly one shard, so the order of its messages is kept.
+    The topics not given to a shard are dispatched by this process, on the queues of queueList.
     Args:
         queueList (dictionar of multiprocessing.queues.Queue): Dictionar of queues where the ID is the type of messages.
         logger (logging object): Made for debugging.
         debugging (bool, optional): A flag for debugging. Defaults to False.
+        batching (bool, optional): Deliver the messages in batches, see threadGateway. Defaults to False.
+        emergencyLane (bool, optional): Dispatch the Critical queue on its own thread, see threadEmergency. Defaults to True.
+        shards (dict, optional): {name: list of Owner or (Owner, msgID)} of the shards, see shards.createShards.
+            queueList gets the queues of the shards, so the gateway must be created before the other processes. Defaults to None.
+        shardName (string, optional): The name of the shard dispatched by this process. Defaults to None (the main one).
+        switchInterval (float, optional): The GIL switch interval (sys.setswitchinterval) of the gateway process, in seconds.
+            With the emergency lane, it bounds how long the lane waits for the GIL while the gateway thread is busy
+            (5 ms by default in Python). A shorter one costs more thread switches in the whole process, so a bit of the
+            throughput of the gateway thread. Defaults to None (the interval of Python is kept).
     """
 
-    def __init__(self, queueList, logger, debugging=False):
+    def __init__(self, queueList, logger, debugging=False, batching=False, emergencyLane=True, shards=None, shardName=None,
+                 switchInterval=None):
         self.logger = logger
         self.debugging = debugging
+        self.batching = batching
+        self.emergencyLane = emergencyLane
+        self.switchInterval = switchInterval
+        self.shardProcesses = []
+        if shards:
+            createShards(queueList, shards)
+            for name in shards:
+                self.shardProcesses.append(
+                    processGateway(queueList["Shards"][name], logger, debugging, batching, emergencyLane, shardName=name,
+                                   switchInterval=switchInterval)
+                )
         super(processGateway, self).__init__(queueList)
+        if shardName is not None:
+            self.name = "processGateway-" + shardName
+
+    # ===================================== START ===========================================
+    def start(self):
+        """Starts the shards, then the main gateway."""
+
+        for shard in self.shardProcesses:
+            shard.daemon = self.daemon
+            shard.start()
+        super(processGateway, self).start()
+
+    # ===================================== STOP ============================================
+    def stop(self):
+        """Stops the shards and the main gateway."""
+
+        for shard in self.shardProcesses:
+            shard._blocker.set()
+        super(processGateway, self).stop()
+        for shard in self.shardProcesses:
+            shard.join(1)
 
     # ===================================== RUN ===========================================
     def run(self):
@@ -55,10 +105,18 @@ class processGateway(WorkerProcess):
 
     # ===================================== INIT TH ==========================================
     def _init_threads(self):
-        """Initializes the gateway thread."""
+        """Initializes the gateway thread, and the emergency lane with its watchdog."""
         
-        gatewayThread = threadGateway(self.queuesList, self.logger, self.debugging)
+        gatewayThread = threadGateway(
+            self.queuesList, self.logger, self.debugging, self.batching, emergencyLane=self.emergencyLane
+        )
         self.threads.append(gatewayThread)
+        if self.switchInterval is not None:
+            sys.setswitchinterval(self.switchInterval)
+        if self.emergencyLane:
+            emergencyTh = threadEmergency(gatewayThread, self.logger)
+            self.threads.append(emergencyTh)
+            self.threads.append(threadDeadlineWatchdog(emergencyTh, self.logger))
 
 
 # =================================== EXAMPLE =========================================
@@ -69,6 +127,7 @@ if __name__ == "__main__":
     from multiprocessing import Pipe, Queue, Event
     import time
     import logging
+    import src.utils.messages.messageCodec as messageCodec
 
     allProcesses = list()
     # We have a list of multiprocessing.Queue() which individualy represent a priority for processes.
@@ -146,9 +205,9 @@ if __name__ == "__main__":
 
     # Code to verify that the function send Owner threadGateway.py is working properly.
 
-    print(pipeReceive3.recv())
-    print(pipeReceive1.recv())
-    print(pipeReceive2.recv())
+    print(messageCodec.decode(pipeReceive3.recv_bytes()))
+    print(messageCodec.decode(pipeReceive1.recv_bytes()))
+    print(messageCodec.decode(pipeReceive2.recv_bytes()))
 
     # ===================================== STAYING ALIVE ====================================
 
@@ -0,0 +1,189 @@
+import os
+import select
+import struct
+import threading
+from collections import deque
+
+import src.utils.messages.messageCodec as messageCodec
+from src.utils.messages.pipes import pipeCapacity, pipeDepth
+
+
+class subscriberWindow:
+    """Credit-based flow control of the gateway towards one subscriber pipe.\n
+    The subscriber advertises a window, in bytes (the pipe buffer by default). The gateway writes a frame only
+    if it fits in the window next to the bytes the subscriber did not read yet: the credit comes back as the
+    subscriber reads. The write end is non-blocking, so a full pipe (it holds at most 16 writes, whatever
+    their size) never stops the gateway either, and a frame written only in part is finished before the next one.
+    A frame without credit is kept for the subscriber according to the policy of its topic (see allMessages):
+        "deliver"   - buffered, up to maxBacklog frames, then the oldest ones are dropped,
+        "conflate"  - only the newest frame of the topic is kept,
+        "rateLimit" - dropped.
+    The gateway calls flush() until the backlog is empty. The gateway thread and the emergency lane share the
+    windows, so every call holds the lock of the window.\n
+    The publishers of a direct topic write on the same pipe as the gateway (see messageHandlerSender.sendDirect).
+    Its window is atomic: every frame goes in one write of at most PIPE_BUF bytes, which the pipe never splits or
+    mixes with the writes of the publishers. Batches are not used, and a larger frame is dropped.
+
+    Args:
+        pipe (multiprocessing.connection.Connection): The sending end of the subscriber pipe.
+        name (string): The name of the subscriber and its topic, for the metrics.
+        window (int, optional): The window, in bytes. Defaults to the capacity of the pipe.
+        maxBacklog (int, optional): The most frames kept for the subscriber. Defaults to 256.
+        atomic (bool, optional): True for the pipe of a direct topic. Defaults to False.
+    """
+
+    # the length prefix of Connection.send_bytes, which the subscriber reads with recv_bytes
+    LENGTH = struct.Struct("!i")
+    # The largest write a pipe takes in one piece
+    ATOMIC_MAX = getattr(select, "PIPE_BUF", 4096)
+
+    def __init__(self, pipe, name, window=None, maxBacklog=256, atomic=False):
+        self.pipe = pipe
+        self.fd = pipe.fileno()
+        os.set_blocking(self.fd, False)
+        self.name = name
+        self.window = window or pipeCapacity(pipe)
+        # the bytes the subscriber can still take, refreshed from the pipe depth only when they run out
+        self.credit = self.window
+        self.maxBacklog = maxBacklog
+        self.atomic = atomic
+        self.backlog = deque()
+        # the rest of a frame the pipe took only in part
+        self.partial = None
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.buffered = 0
+        self.conflated = 0
+        self.dropped = 0
+        self.maxDepth = 0
+
+    def fits(self, frame):
+        """Checks if the subscriber has the credit for a frame. A frame larger than the window goes to an empty pipe."""
+        size = len(frame) + self.LENGTH.size
+        if size <= self.credit:
+            return True
+        depth = pipeDepth(self.pipe)
+        if depth > self.maxDepth:
+            self.maxDepth = depth
+        self.credit = self.window - depth
+        return depth == 0 or size <= self.credit
+
+    def write(self, frame):
+        """Writes a frame without blocking.
+        Returns:
+            bool: False if the pipe is full and nothing was written.
+        """
+        if self.partial is not None and not self.finishPartial():
+            return False
+        data = self.LENGTH.pack(len(frame)) + frame
+        try:
+            written = os.write(self.fd, data)
+        except BlockingIOError:
+            return False
+        if written < len(data):
+            self.partial = memoryview(data)[written:]
+        self.credit -= len(data)
+        self.sent += 1
+        return True
+
+    def finishPartial(self):
+        """Writes what the pipe can take of the frame written in part.
+        Returns:
+            bool: True if the frame is complete.
+        """
+        try:
+            written = os.write(self.fd, self.partial)
+        except BlockingIOError:
+            return False
+        self.partial = self.partial[written:] if written < len(self.partial) else None
+        return self.partial is None
+
+    def send(self, frame, policy="deliver"):
+        """Writes a frame on the pipe if the subscriber has the credit for it, otherwise keeps it according to the policy.
+        Args:
+            frame (bytes): The encoded frame.
+            policy (string, optional): The policy of the topic of the frame. Defaults to "deliver".
+        Returns:
+            bool: True if frames are left in the backlog.
+        """
+        with self.lock:
+            self.sendLocked(frame, policy)
+            return self.pendingLocked()
+
+    def sendBatch(self, frames):
+        """Writes several frames as one batch (see messageCodec.encodeBatch) if the subscriber has the credit for it,
+        otherwise they are sent one by one, with the policies of their topics.
+        Args:
+            frames (list of bytes): The encoded frames, in order.
+        Returns:
+            bool: True if frames are left in the backlog.
+        """
+        batch = None if self.atomic else messageCodec.encodeBatch(frames)
+        with self.lock:
+            if batch is not None and not self.backlog and self.fits(batch) and self.write(batch):
+                self.sent += len(frames) - 1
+                return self.partial is not None
+            for frame in frames:
+                self.sendLocked(frame, messageCodec.policyOf(frame))
+            return self.pendingLocked()
+
+    def sendLocked(self, frame, policy):
+        if self.atomic and len(frame) + self.LENGTH.size > self.ATOMIC_MAX:
+            self.dropped += 1
+            return
+        if not self.backlog and self.fits(frame) and self.write(frame):
+            return
+        if policy == "rateLimit":
+            self.dropped += 1
+        elif policy == "conflate":
+            self.keepNewest(frame)
+        else:
+            if len(self.backlog) >= self.maxBacklog:
+                self.backlog.popleft()
+                self.dropped += 1
+            self.backlog.append((policy, frame))
+            self.buffered += 1
+
+    def keepNewest(self, frame):
+        """Replaces the frame of the same topic waiting in the backlog, if any."""
+        # the first two bytes of the header are the index of the topic
+        topic = frame[:2]
+        for index, (policy, waiting) in enumerate(self.backlog):
+            if policy == "conflate" and waiting[:2] == topic:
+                del self.backlog[index]
+                self.conflated += 1
+                break
+        self.backlog.append(("conflate", frame))
+
+    def flush(self):
+        """Writes the frames of the backlog the subscriber has the credit for, in order.
+        Returns:
+            bool: True if frames are left in the backlog.
+        """
+        with self.lock:
+            while self.backlog and self.fits(self.backlog[0][1]) and self.write(self.backlog[0][1]):
+                self.backlog.popleft()
+            return self.pendingLocked()
+
+    def pendingLocked(self):
+        if self.partial is not None:
+            self.finishPartial()
+        return bool(self.backlog) or self.partial is not None
+
+    def counters(self):
+        """Returns the state of the window for the metrics.
+        Returns:
+            dict: {"depth", "maxDepth", "window", "backlog", "sent", "buffered", "conflated", "dropped"}.
+        """
+        depth = pipeDepth(self.pipe)
+        self.maxDepth = max(self.maxDepth, depth)
+        return {
+            "depth": depth,
+            "maxDepth": self.maxDepth,
+            "window": self.window,
+            "backlog": len(self.backlog),
+            "sent": self.sent,
+            "buffered": self.buffered,
+            "conflated": self.conflated,
+            "dropped": self.dropped,
+        }
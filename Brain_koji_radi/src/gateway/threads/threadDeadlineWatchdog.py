@@ -0,0 +1,46 @@
+import time
+
+from src.templates.threadwithstop import ThreadWithStop
+import src.utils.messages.busMetrics as busMetrics
+
+
+class threadDeadlineWatchdog(ThreadWithStop):
+    """Watches the emergency lane from outside: a threadEmergency stuck on a message (a blocked pipe, a
+    subscriber which does not read) cannot report its own deadline miss.\n
+    Every period it checks that the dispatcher is alive and has not been busy on the same message for longer
+    than the deadline. Every stall is counted once in busMetrics, under the "emergencyLane" topic, and logged.
+
+    Args:
+        dispatcher (threadEmergency): The dispatcher of the emergency lane.
+        logger (logging object): Made for debugging.
+        deadline (float, optional): The deadline, in seconds, of a dispatch. Defaults to 0.002.
+        period (float, optional): The time, in seconds, between two checks. Defaults to 0.01.
+    """
+
+    # ====================================== INIT ==========================================
+    def __init__(self, dispatcher, logger, deadline=0.002, period=0.01):
+        super(threadDeadlineWatchdog, self).__init__()
+        self.dispatcher = dispatcher
+        self.logger = logger
+        self.deadline = int(deadline * 1e9)
+        self.period = period
+        self.reported = 0
+        self.dead = False
+
+    # ======================================= RUN ==========================================
+    def run(self):
+        while self._running:
+            time.sleep(self.period)
+            if not self.dispatcher.is_alive():
+                if self.dispatcher._running and not self.dead:
+                    self.dead = True
+                    busMetrics.registry.countViolation("emergencyLane", 0)
+                    self.logger.error("Emergency lane: the dispatcher is not running!")
+                continue
+            busySince = self.dispatcher.busySince
+            if busySince and busySince != self.reported:
+                stalled = time.monotonic_ns() - busySince
+                if stalled > self.deadline:
+                    self.reported = busySince
+                    busMetrics.registry.countViolation("emergencyLane", stalled)
+                    self.logger.error(f"Emergency lane: dispatch stalled for {stalled / 1e6:.2f} ms")
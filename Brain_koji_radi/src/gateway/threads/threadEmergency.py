@@ -0,0 +1,71 @@
+import queue
+import time
+
+from src.templates.threadwithstop import ThreadWithStop
+import src.utils.messages.busMetrics as busMetrics
+import src.utils.messages.messageCodec as messageCodec
+
+
+class threadEmergency(ThreadWithStop):
+    """Dispatcher of the emergency lane: the messages of the Critical queue (Brake, Klem, ...).\n
+    It blocks on the Critical queue only and sends every message as soon as it is taken, with the routing table
+    of the gateway thread, so a Brake never waits behind the camera frames of the General queue. The time from
+    the send to the end of the dispatch is checked against the deadline of the message (see allMessages), every
+    miss is counted in busMetrics and logged.
+
+    Args:
+        gateway (threadGateway): The gateway thread, which owns the subscriptions.
+        logger (logging object): Made for debugging.
+        deadline (float, optional): The deadline, in seconds, of the Critical messages which do not declare one. Defaults to 0.002.
+    """
+
+    # ====================================== INIT ==========================================
+    def __init__(self, gateway, logger, deadline=0.002):
+        super(threadEmergency, self).__init__()
+        self.gateway = gateway
+        self.logger = logger
+        self.queue = gateway.queuesList["Critical"]
+        self.deadline = int(deadline * 1e9)
+        self.deadlines = {
+            codec.message.__name__: int(codec.message.deadline.value * 1e9)
+            for codec in messageCodec.codecsByIndex
+            if "deadline" in codec.message.__members__
+        }
+        # The time the message being dispatched was taken, 0 when idle (watched by threadDeadlineWatchdog)
+        self.busySince = 0
+        self.idleTimeout = 0.05
+
+    # ======================================= RUN ==========================================
+    def run(self):
+        while self._running:
+            try:
+                message = self.queue.get(timeout=self.idleTimeout)
+            except queue.Empty:
+                continue
+            self.busySince = time.monotonic_ns()
+            try:
+                # Under the lock of the gateway, which may be changing the subscriptions of the message meanwhile
+                with self.gateway.lock:
+                    self.gateway.send(message)
+                self.check(message)
+            except Exception as e:
+                self.logger.error(f"Emergency lane: {e}")
+            finally:
+                self.busySince = 0
+
+    def check(self, message):
+        """Counts the message as a deadline violation if it was not dispatched within its deadline.
+        Args:
+            message(bytes or dictionary): The message taken from the Critical queue.
+        """
+
+        if isinstance(message, dict):
+            return
+        timestamp = messageCodec.stamp(message)[1]
+        if not timestamp:
+            return
+        topic = messageCodec.topicName(message)
+        latency = time.monotonic_ns() - timestamp
+        if latency > self.deadlines.get(topic, self.deadline):
+            busMetrics.registry.countViolation(topic, latency)
+            self.logger.warning(f"Emergency lane: {topic} dispatched after {latency / 1e6:.2f} ms")
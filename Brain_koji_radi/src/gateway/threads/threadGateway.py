@@ -26,7 +26,15 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
 
+import os
+import threading
+import time
+from multiprocessing.connection import wait
+
 from src.templates.threadwithstop import ThreadWithStop
+from src.gateway.subscriberWindow import subscriberWindow
+import src.utils.messages.busMetrics as busMetrics
+import src.utils.messages.messageCodec as messageCodec
 
 class threadGateway(ThreadWithStop):
     """Thread which will handle processGateway functionalities.\n
@@ -34,17 +42,51 @@ class threadGateway(ThreadWithStop):
         queuesList (dictionary of multiprocessing.queues.Queue): Dictionary of queues where the ID is the type of messages.
         logger (logging object): Made for debugging.
         debugger (bool): A flag for debugging.
+        batching (bool, optional): Drain several messages per wakeup and send them as one batch per pipe. Defaults to False.
+        maxBatch (int, optional): The maximum number of messages drained per wakeup in batching mode. Defaults to 64.
+        maxBatchTime (float, optional): The maximum time, in seconds, spent draining per wakeup in batching mode. Defaults to 0.0005.
+        emergencyLane (bool, optional): The Critical queue is dispatched by a threadEmergency, not by this thread. Defaults to False.
     """
 
     # ===================================== INIT =========================================
 
-    def __init__(self, queueList, logger, debugging):
+    def __init__(self, queueList, logger, debugging, batching=False, maxBatch=64, maxBatchTime=0.0005, emergencyLane=False):
         super(threadGateway, self).__init__()
         self.logger = logger
         self.debugging = debugging
+        self.batching = batching
+        self.maxBatch = maxBatch
+        self.maxBatchTime = maxBatchTime
+        self.emergencyLane = emergencyLane
         self.sendingList = {}
         self.queuesList = queueList
-        self.messageApproved = []
+        self.messageApproved = set()
+        # Precomputed fan-out: (Owner, msgID) -> tuple of the subscribed pipes. Rebuilt on subscribe/unsubscribe.
+        self.routingTable = {}
+        # Publishers of direct topics: (Owner, msgID) -> {publisher: control pipe}, see publish().
+        self.publishers = {}
+        # Recorders which get a copy of the whole traffic: name -> (window of the pipe, pipe for the direct publishers), see tap().
+        self.taps = {}
+        self.tapWindows = ()
+        # Flow control of every subscriber pipe, and the ones with frames waiting for credit.
+        self.windows = {}
+        self.backlogged = set()
+        self.flushInterval = 0.001
+        # The routing state (the tables above, the windows and the taps) is changed only by this thread, but the
+        # emergency lane sends with it at the same time: both take this lock around everything that changes the state
+        # or reads it from the other thread (see threadEmergency). Reentrant, send() of the lane also sends the taps.
+        self.lock = threading.RLock()
+        # The reading ends of the queues, used to sleep until any of them receives data.
+        self.queueReaders = [
+            self.queuesList[name]._reader
+            for name in ["Critical", "Warning", "General", "Config"]
+            if not (emergencyLane and name == "Critical")
+        ]
+        # Upper bound of one idle wait, so that stop() is noticed in time.
+        self.idleTimeout = 0.1
+        # Queue-wait and dispatch latencies of every topic, published on the BusMetrics dashboard channel.
+        self.metrics = busMetrics.registry
+        self.metricsPublisher = busMetrics.metricsPublisher(self.queuesList)
 
     # =================================== SUBSCRIBE ======================================
 
@@ -65,11 +107,29 @@ class threadGateway(ThreadWithStop):
             self.sendingList[Owner][Id] = {}
         if not To in self.sendingList[Owner][Id].keys():
             self.sendingList[Owner][Id][To] = Pipe
-        self.messageApproved.append((Owner, Id))
+            codec = messageCodec.codecsByKey.get((Owner, Id))
+            topic = codec.message.__name__ if codec is not None else f"{Owner}/{Id}"
+            # The publishers of a direct topic write on the same pipe, the gateway must not split its frames there
+            direct = codec is not None and "delivery" in codec.message.__members__ and codec.message.delivery.value == "direct"
+            self.windows[Pipe] = subscriberWindow(Pipe, f"{To}/{topic}", message["To"].get("window"), atomic=direct)
+            self.metrics.trackWindow(self.windows[Pipe])
+        self.messageApproved.add((Owner, Id))
+        self.compileRoute(Owner, Id)
         # Debugging( you can comment this):
         if self.debugging:
             self.printList()
 
+    def subscribeBulk(self, message):
+        """This function applies all the subscriptions of a SubscriptionManifest, before the next message is dispatched.
+        Args:
+            message(dictionary): Dictionary received from the multiprocessing queues ( the config one).
+        """
+
+        # The pipes come in one PipeBundle, in the order of the subscriptions
+        for subscription, pipe in zip(message["Subscriptions"], message["Pipes"]):
+            subscription["To"]["pipe"] = pipe
+            self.subscribe(subscription)
+
     # ================================== UNSUBSCRIBE =====================================
 
     def unsubscribe(self, message):
@@ -83,31 +143,291 @@ class threadGateway(ThreadWithStop):
         To = message["To"]["receiver"]
 
         # We delete the value from Dictionary
-        del self.sendingList[Owner][Id][To]
-        self.messageApproved.remove((Owner, Id))
+        window = self.windows.pop(self.sendingList[Owner][Id].pop(To), None)
+        self.backlogged.discard(window)
+        self.compileRoute(Owner, Id)
         if self.debugging:
             self.printList()
 
-    # =================================== SENDING ========================================
+    def unsubscribeBulk(self, message):
+        """This function removes all the subscriptions of a SubscriptionManifest at once.
+        Args:
+            message(dictionary): Dictionary received from the multiprocessing queues ( the config one).
+        """
 
-    def send(self, message):
-        """This functin will send the message on all the pipes that are in the sending list of the message ID.
+        for subscription in message["Subscriptions"]:
+            self.unsubscribe(subscription)
+
+    # =================================== CONFIG =========================================
+
+    def configure(self, message2):
+        """This function applies a message of the Config queue, under the lock of the routing state.
+        Args:
+            message2(dictionary): Dictionary received from the multiprocessing queues ( the config one).
+        """
+
+        with self.lock:
+            if str.lower(message2["Subscribe/Unsubscribe"]) == "subscribe":
+                self.subscribe(message2)
+            elif str.lower(message2["Subscribe/Unsubscribe"]) == "subscribebulk":
+                self.subscribeBulk(message2)
+            elif str.lower(message2["Subscribe/Unsubscribe"]) == "unsubscribebulk":
+                self.unsubscribeBulk(message2)
+            elif str.lower(message2["Subscribe/Unsubscribe"]) == "publish":
+                self.publish(message2)
+            elif str.lower(message2["Subscribe/Unsubscribe"]) == "tap":
+                self.tap(message2)
+            elif str.lower(message2["Subscribe/Unsubscribe"]) == "untap":
+                self.untap(message2)
+            else:
+                self.unsubscribe(message2)
+
+    # ================================== ROUTING =========================================
+
+    def compileRoute(self, Owner, Id):
+        """This function rebuilds the entry of the routing table for one message, from the sending list.
+        A message without subscribers is removed from the table and from the approved messages.
+        Args:
+            Owner (string): The owner of the message.
+            Id (int): The ID of the message.
+        """
+
+        pipes = tuple(self.sendingList.get(Owner, {}).get(Id, {}).values())
+        if pipes:
+            self.routingTable[(Owner, Id)] = pipes
+        else:
+            self.routingTable.pop((Owner, Id), None)
+            self.messageApproved.discard((Owner, Id))
+        for publisher in list(self.publishers.get((Owner, Id), {})):
+            self.sendRoute(Owner, Id, publisher)
+
+    # ================================ DIRECT CHANNELS ===================================
+
+    def publish(self, message):
+        """This function registers the publisher of a direct topic (delivery = "direct" in allMessages).
+        The publisher gets the pipes of the subscribers now and after every subscribe/unsubscribe, and writes its
+        messages on them itself: they do not go through the queues and the gateway anymore.
         Args:
             message(dictionary): Dictionary received from the multiprocessing queues ( the config one).
         """
 
         Owner = message["Owner"]
         Id = message["msgID"]
-        Type = message["msgType"]
-        Value = message["msgValue"]
-        if (Owner, Id) in self.messageApproved:
-            for element in self.sendingList[Owner][Id]:
-                # We send a dictionary that contain the type of the message and message
-                self.sendingList[Owner][Id][element].send(
-                    {"Type": Type, "value": Value, "id": Id, "Owner": Owner}
-                )
-                if self.debugging:
-                    self.logger.warning(message)
+        if not (Owner, Id) in self.publishers:
+            self.publishers[(Owner, Id)] = {}
+        self.publishers[(Owner, Id)][message["To"]["receiver"]] = message["To"]["pipe"]
+        self.sendRoute(Owner, Id, message["To"]["receiver"])
+
+    def sendRoute(self, Owner, Id, publisher):
+        """This function sends the pipes subscribed to a message to one of its publishers. A publisher that is gone is forgotten.
+        Args:
+            Owner (string): The owner of the message.
+            Id (int): The ID of the message.
+            publisher (string): The name of the publisher.
+        """
+
+        pipes = list(self.routingTable.get((Owner, Id), ())) + [directPipe for _, directPipe in self.taps.values()]
+        try:
+            self.publishers[(Owner, Id)][publisher].send({"pipes": pipes})
+        except OSError:
+            del self.publishers[(Owner, Id)][publisher]
+
+    # ===================================== TAPS =========================================
+
+    def tap(self, message):
+        """This function registers a recorder, which gets a copy of every message taken from the queues.
+        The publishers of direct topics write on a second pipe of the recorder, so that their writes never mix with the
+        ones of the gateway. Both are non-blocking, as the ones of the subscribers: the gateway writes its pipe through a
+        subscriberWindow, and a slow recorder loses the frames of the direct pipe, counted as dropped by the publishers,
+        instead of blocking the gateway or the publishers.
+        Args:
+            message(dictionary): Dictionary received from the multiprocessing queues ( the config one).
+        """
+
+        receiver = message["To"]["receiver"]
+        window = subscriberWindow(message["To"]["pipe"], f"{receiver}/tap")
+        self.metrics.trackWindow(window)
+        directPipe = message["To"]["directPipe"]
+        os.set_blocking(directPipe.fileno(), False)
+        self.taps[receiver] = (window, directPipe)
+        self.compileTaps()
+
+    def untap(self, message):
+        """This function removes a recorder.
+        Args:
+            message(dictionary): Dictionary received from the multiprocessing queues ( the config one).
+        """
+
+        window, _ = self.taps.pop(message["To"]["receiver"], (None, None))
+        self.backlogged.discard(window)
+        self.compileTaps()
+
+    def compileTaps(self):
+        """This function rebuilds the tuple of the tap windows and sends the new pipes to the publishers of direct topics."""
+
+        self.tapWindows = tuple(window for window, _ in self.taps.values())
+        for Owner, Id in list(self.publishers):
+            for publisher in list(self.publishers[(Owner, Id)]):
+                self.sendRoute(Owner, Id, publisher)
+
+    def sendTaps(self, frames):
+        """This function sends a copy of the frames to the recorders. A recorder that is gone is removed.
+        Args:
+            frames(list): The encoded frames, in the order they were taken.
+        """
+
+        frame = frames[0] if len(frames) == 1 else messageCodec.encodeBatch(frames)
+        with self.lock:
+            for name, (window, _) in list(self.taps.items()):
+                try:
+                    if window.send(frame):
+                        self.backlogged.add(window)
+                except OSError:
+                    del self.taps[name]
+                    self.backlogged.discard(window)
+                    self.compileTaps()
+
+    # =================================== SENDING ========================================
+
+    def route(self, message):
+        """This function finds the pipes subscribed to a message taken from the queues.\n
+        The senders put binary frames encoded by messageCodec, which are forwarded as they are. A dictionary
+        {"Owner", "msgID", "msgType", "msgValue"} put directly in a queue is encoded here.
+        Args:
+            message(bytes or dictionary): The message received from the multiprocessing queues.
+        Returns:
+            tuple: The pipes and the encoded frame. The pipes are None if nobody is subscribed to the message
+            (and the frame is None too, unless a recorder taps the gateway).
+        """
+
+        if isinstance(message, dict):
+            pipes = self.routingTable.get((message["Owner"], message["msgID"]))
+            if pipes is None and not self.tapWindows:
+                return None, None
+            frame = messageCodec.encodeEnvelope(message["Owner"], message["msgID"], message["msgType"], message["msgValue"])
+            return pipes, frame
+        return self.routingTable.get(messageCodec.topicKey(message)), message
+
+    def send(self, message):
+        """This functin will send the message on all the pipes that are in the sending list of the message ID.
+        Args:
+            message(bytes or dictionary): The message received from the multiprocessing queues.
+        """
+
+        taken = time.monotonic_ns()
+        pipes, frame = self.route(message)
+        if self.tapWindows:
+            self.sendTaps([frame])
+        if pipes is None:
+            return
+        # We send the encoded frame, messageHandlerSubscriber decodes it
+        policy = messageCodec.policyOf(frame)
+        for pipe in pipes:
+            window = self.windows[pipe]
+            if window.send(frame, policy):
+                self.backlogged.add(window)
+            if self.debugging:
+                self.logger.warning(messageCodec.decode(frame))
+        self.measure(frame, taken)
+
+    def measure(self, frame, taken):
+        """This function records the queue-wait and dispatch latencies of a frame sent on its pipes.
+        Args:
+            frame(bytes): The encoded frame.
+            taken(int): The time the frame was taken from its queue, from time.monotonic_ns().
+        """
+
+        topic = messageCodec.topicName(frame)
+        timestamp = messageCodec.stamp(frame)[1]
+        self.metrics.count(topic)
+        if timestamp:
+            self.metrics.record(topic, "queueWait", taken - timestamp)
+        self.metrics.record(topic, "dispatch", time.monotonic_ns() - taken)
+
+    def sendBatch(self, messages):
+        """This function groups the messages per destination pipe and sends each pipe all its messages at once.
+        The order of the messages is kept inside every batch. A pipe with a single message gets a normal frame.
+        Args:
+            messages(list): The messages received from the multiprocessing queues, in the order they were taken.
+        """
+
+        taken = time.monotonic_ns()
+        batches = {}
+        routed = []
+        tapped = []
+        for message in messages:
+            pipes, frame = self.route(message)
+            if self.tapWindows:
+                tapped.append(frame)
+            if pipes is None:
+                continue
+            routed.append(frame)
+            for pipe in pipes:
+                if pipe in batches:
+                    batches[pipe].append(frame)
+                else:
+                    batches[pipe] = [frame]
+        for pipe, frames in batches.items():
+            window = self.windows[pipe]
+            if len(frames) == 1:
+                backlog = window.send(frames[0], messageCodec.policyOf(frames[0]))
+            else:
+                # messageHandlerSubscriber unpacks the batches transparently
+                backlog = window.sendBatch(frames)
+            if backlog:
+                self.backlogged.add(window)
+        if tapped:
+            self.sendTaps(tapped)
+        for frame in routed:
+            self.measure(frame, taken)
+        if self.debugging:
+            self.logger.warning(len(messages))
+
+    def flushWindows(self):
+        """This function writes the frames kept for the slow subscribers, as far as their windows allow."""
+
+        with self.lock:
+            for window in list(self.backlogged):
+                try:
+                    if not window.flush():
+                        self.backlogged.discard(window)
+                except OSError:
+                    # The reader is gone (a recorder stopped without untap)
+                    self.backlogged.discard(window)
+
+    # ================================== RECEIVING =======================================
+
+    def nextMessage(self):
+        """This function takes one message from the queues, in the priority order Critical > Warning > General.
+        The Critical queue is skipped when it has its own emergency lane.
+        Returns:
+            dictionary: The message, or None if the queues are empty.
+        """
+
+        if not self.emergencyLane and not self.queuesList["Critical"].empty():
+            return self.queuesList["Critical"].get()
+        elif not self.queuesList["Warning"].empty():
+            return self.queuesList["Warning"].get()
+        elif not self.queuesList["General"].empty():
+            return self.queuesList["General"].get()
+        return None
+
+    def drain(self):
+        """This function takes up to maxBatch messages, or as many as it can take in maxBatchTime, in priority order.
+        Returns:
+            list: The messages, possibly empty.
+        """
+
+        messages = []
+        deadline = time.perf_counter() + self.maxBatchTime
+        while len(messages) < self.maxBatch:
+            message = self.nextMessage()
+            if message is None:
+                break
+            messages.append(message)
+            if time.perf_counter() >= deadline:
+                break
+        return messages
 
     # ====================================================================================
 
@@ -121,27 +441,35 @@ class threadGateway(ThreadWithStop):
 
     def run(self):
         """This function will take the messages in priority order form the queues.\n
-        the prioirty is: Critical > Warning > General
+        the prioirty is: Critical > Warning > General\n
+        When all the queues are empty the thread blocks until one of them receives data, instead of polling them.
+        In batching mode every wakeup drains several messages and sends them as one batch per pipe.
         """
         
         while self._running:
             message = None
-            # We are using "elif" because we are processing one message at a time.
+            message2 = None
             # We work with the queues in the priority order( We start from the high priority to low priority)
-            if not self.queuesList["Critical"].empty():
-                message = self.queuesList["Critical"].get()
-            elif not self.queuesList["Warning"].empty():
-                message = self.queuesList["Warning"].get()
-            elif not self.queuesList["General"].empty():
-                message = self.queuesList["General"].get()
-            if message is not None:
-                self.send(message)
+            if self.batching:
+                messages = self.drain()
+                if messages:
+                    message = messages
+                    self.sendBatch(messages)
+            else:
+                # We are processing one message at a time.
+                message = self.nextMessage()
+                if message is not None:
+                    self.send(message)
             if not self.queuesList["Config"].empty():
                 message2 = self.queuesList["Config"].get()
-                if str.lower(message2["Subscribe/Unsubscribe"]) == "subscribe":
-                    self.subscribe(message2)
-                else:
-                    self.unsubscribe(message2)
+                self.configure(message2)
+            if self.backlogged:
+                self.flushWindows()
+            self.metricsPublisher.publishIfDue()
+            if message is None and message2 is None:
+                # Nothing to do, so we sleep until one of the queues becomes readable,
+                # or until the slow subscribers may have read their pipes.
+                wait(self.queueReaders, self.flushInterval if self.backlogged else self.idleTimeout)
 
 
 # =====================================================================================
\ No newline at end of file
@@ -19,7 +19,7 @@ from src.utils.messages.allMessages import (
     Contrast,
 )
 from src.utils.messages.messageHandlerSender import messageHandlerSender
-from src.utils.messages.messageHandlerSubscriber import messageHandlerSubscriber
+from src.utils.messages.subscriptionManifest import SubscriptionManifest
 from src.templates.threadwithstop import ThreadWithStop
 
 class FrameBuffer:
@@ -90,9 +90,16 @@ class threadCamera(ThreadWithStop):
 
     def subscribe(self):
         """Pretplate na poruke (record, brightness, contrast)."""
-        self.recordSubscriber = messageHandlerSubscriber(self.queuesList, Record, "lastOnly", True)
-        self.brightnessSubscriber = messageHandlerSubscriber(self.queuesList, Brightness, "lastOnly", True)
-        self.contrastSubscriber = messageHandlerSubscriber(self.queuesList, Contrast, "lastOnly", True)
+        # jedna poruka gateway-u za sve pretplate
+        self.subscriptions = SubscriptionManifest(self.queuesList, "threadCamera", {
+            "record": (Record, "lastOnly"),
+            "brightness": (Brightness, "lastOnly"),
+            "contrast": (Contrast, "lastOnly"),
+        })
+        self.subscriptions.subscribe()
+        self.recordSubscriber = self.subscriptions["record"]
+        self.brightnessSubscriber = self.subscriptions["brightness"]
+        self.contrastSubscriber = self.subscriptions["contrast"]
 
     def Queue_Sending(self):
         """Periodično slanje statusa snimanja."""
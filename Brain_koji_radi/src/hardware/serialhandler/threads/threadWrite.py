@@ -43,8 +43,10 @@ from src.utils.messages.allMessages import (
     ToggleInstant,
     ToggleResourceMonitor
 )
-from src.utils.messages.messageHandlerSubscriber import messageHandlerSubscriber
+from src.utils.messages.subscriptionManifest import SubscriptionManifest
 from src.utils.messages.messageHandlerSender import messageHandlerSender
+from src.utils.messages.subscriberGroup import SubscriberGroup
+from src.utils.messages.busMetrics import metricsPublisher
 
 
 class threadWrite(ThreadWithStop):
@@ -73,6 +75,8 @@ class threadWrite(ThreadWithStop):
         self.steerMotorSender = messageHandlerSender(self.queuesList, SteerMotor)
         self.speedMotorSender = messageHandlerSender(self.queuesList, SpeedMotor)
         self.configPath = "src/utils/table_state.json"
+        # Delivery latencies of the commands received here, published on the BusMetrics dashboard channel.
+        self.metricsPublisher = metricsPublisher(self.queuesList)
 
         self.loadConfig("init")
         self.subscribe()
@@ -86,15 +90,62 @@ class threadWrite(ThreadWithStop):
     def subscribe(self):
         """Subscribe function. In this function we make all the required subscribe to process gateway"""
 
-        self.klSubscriber = messageHandlerSubscriber(self.queuesList, Klem, "lastOnly", True)
-        self.controlSubscriber = messageHandlerSubscriber(self.queuesList, Control, "lastOnly", True)
-        self.steerMotorSubscriber = messageHandlerSubscriber(self.queuesList, SteerMotor, "lastOnly", True)
-        self.speedMotorSubscriber = messageHandlerSubscriber(self.queuesList, SpeedMotor, "lastOnly", True)
-        self.brakeSubscriber = messageHandlerSubscriber(self.queuesList, Brake, "lastOnly", True)
-        self.instantSubscriber = messageHandlerSubscriber(self.queuesList, ToggleInstant, "lastOnly", True)
-        self.batterySubscriber = messageHandlerSubscriber(self.queuesList, ToggleBatteryLvl, "lastOnly", True)
-        self.resourceMonitorSubscriber = messageHandlerSubscriber(self.queuesList, ToggleResourceMonitor, "lastOnly", True)
-        self.imuSubscriber = messageHandlerSubscriber(self.queuesList, ToggleImuData, "lastOnly", True)
+        # All the subscriptions are sent to the gateway in one message, see SubscriptionManifest.
+        self.subscriptions = SubscriptionManifest(self.queuesList, "threadWrite")
+        self.klSubscriber = self.subscriptions.add("Klem", Klem, "lastOnly")
+        self.controlSubscriber = self.subscriptions.add("Control", Control, "lastOnly")
+        self.steerMotorSubscriber = self.subscriptions.add("SteerMotor", SteerMotor, "lastOnly")
+        self.speedMotorSubscriber = self.subscriptions.add("SpeedMotor", SpeedMotor, "lastOnly")
+        self.brakeSubscriber = self.subscriptions.add("Brake", Brake, "lastOnly")
+        self.instantSubscriber = self.subscriptions.add("ToggleInstant", ToggleInstant, "lastOnly")
+        self.batterySubscriber = self.subscriptions.add("ToggleBatteryLvl", ToggleBatteryLvl, "lastOnly")
+        self.resourceMonitorSubscriber = self.subscriptions.add("ToggleResourceMonitor", ToggleResourceMonitor, "lastOnly")
+        self.imuSubscriber = self.subscriptions.add("ToggleImuData", ToggleImuData, "lastOnly")
+        self.subscriptions.subscribe()
+
+        # The subscribers waited on in each state, so a message that cannot be handled yet does not wake the thread.
+        sensorSubscribers = [self.instantSubscriber, self.batterySubscriber, self.resourceMonitorSubscriber, self.imuSubscriber]
+        engineSubscribers = [self.brakeSubscriber, self.speedMotorSubscriber, self.steerMotorSubscriber, self.controlSubscriber]
+        self.stoppedGroup = SubscriberGroup([self.klSubscriber])
+        self.runningGroup = SubscriberGroup([self.klSubscriber] + sensorSubscribers)
+        self.engineGroup = SubscriberGroup([self.klSubscriber] + engineSubscribers + sensorSubscribers)
+        # The actuators set by every motion command, and the send time of the newest command applied to each of them.
+        # Brake and Klem come through the emergency lane of the gateway, SpeedMotor and SteerMotor on direct pipes, so a
+        # command can arrive after a newer one: the motion commands are applied in the order they were sent, and a
+        # command older than the last one applied to its actuators is dropped, as if both took one ordered path.
+        self.motionActuators = {
+            self.brakeSubscriber: ("speed", "steer"),
+            self.speedMotorSubscriber: ("speed",),
+            self.steerMotorSubscriber: ("steer",),
+            self.controlSubscriber: ("speed", "steer"),
+        }
+        self.motionApplied = {"speed": 0, "steer": 0}
+
+    def receiveIfReady(self, subscriber, ready):
+        """Returns the message of a subscriber if it is in the list returned by SubscriberGroup.wait, otherwise None."""
+        if subscriber in ready:
+            return subscriber.receiveWithBlock()
+        return None
+
+    def receiveMotion(self, ready):
+        """Returns the motion commands among the ready subscribers as (send time, subscriber, value), oldest first."""
+        commands = []
+        for subscriber in self.motionActuators:
+            value = self.receiveIfReady(subscriber, ready)
+            if value is not None:
+                commands.append((subscriber.sentAt, subscriber, value))
+        commands.sort(key=lambda command: command[0])
+        return commands
+
+    def isSuperseded(self, subscriber, sentAt):
+        """Checks if a newer motion command was already applied to one of the actuators of the command, and if not
+        records the command as the newest one of its actuators. A command without a send time is never superseded."""
+        actuators = self.motionActuators[subscriber]
+        if sentAt and any(sentAt < self.motionApplied[actuator] for actuator in actuators):
+            return True
+        for actuator in actuators:
+            self.motionApplied[actuator] = max(self.motionApplied[actuator], sentAt)
+        return False
 
     # ==================================== SENDING =======================================
 
@@ -135,7 +186,16 @@ class threadWrite(ThreadWithStop):
 
         while self._running:
             try:
-                klRecv = self.klSubscriber.receive()
+                # We sleep until one of the subscribers has a message, instead of polling them one by one.
+                if not self.running:
+                    ready = self.stoppedGroup.wait(0.1)
+                elif self.engineEnabled:
+                    ready = self.engineGroup.wait(0.1)
+                else:
+                    ready = self.runningGroup.wait(0.1)
+                self.metricsPublisher.publishIfDue()
+
+                klRecv = self.receiveIfReady(self.klSubscriber, ready)
                 if klRecv is not None:
                     if self.debugger:
                         self.logger.info(klRecv)
@@ -159,61 +219,51 @@ class threadWrite(ThreadWithStop):
 
                 if self.running:
                     if self.engineEnabled:
-                        brakeRecv = self.brakeSubscriber.receive()
-                        if brakeRecv is not None:
-                            if self.debugger:
-                                self.logger.info(brakeRecv)
-                            command = {"action": "brake", "steerAngle": int(brakeRecv)}
-                            self.sendToSerial(command)
-
-                        speedRecv = self.speedMotorSubscriber.receive()
-                        if speedRecv is not None: 
-                            if self.debugger:
-                                self.logger.info(speedRecv)
-                            command = {"action": "speed", "speed": int(speedRecv)}
-                            self.sendToSerial(command)
-
-                        steerRecv = self.steerMotorSubscriber.receive()
-                        if steerRecv is not None:
-                            if self.debugger:
-                                self.logger.info(steerRecv) 
-                            command = {"action": "steer", "steerAngle": int(steerRecv)}
-                            self.sendToSerial(command)
-
-                        controlRecv = self.controlSubscriber.receive()
-                        if controlRecv is not None:
+                        # The motion commands are applied in the order they were sent, see motionActuators.
+                        for sentAt, subscriber, value in self.receiveMotion(ready):
+                            if self.isSuperseded(subscriber, sentAt):
+                                if self.debugger:
+                                    self.logger.info(f"superseded {value}")
+                                continue
                             if self.debugger:
-                                self.logger.info(controlRecv) 
-                            command = {
-                                "action": "vcd",
-                                "time": int(controlRecv["Time"]),
-                                "speed": int(controlRecv["Speed"]),
-                                "steer": int(controlRecv["Steer"]),
-                            }
+                                self.logger.info(value)
+                            if subscriber is self.brakeSubscriber:
+                                command = {"action": "brake", "steerAngle": int(value)}
+                            elif subscriber is self.speedMotorSubscriber:
+                                command = {"action": "speed", "speed": int(value)}
+                            elif subscriber is self.steerMotorSubscriber:
+                                command = {"action": "steer", "steerAngle": int(value)}
+                            else:
+                                command = {
+                                    "action": "vcd",
+                                    "time": int(value["Time"]),
+                                    "speed": int(value["Speed"]),
+                                    "steer": int(value["Steer"]),
+                                }
                             self.sendToSerial(command)
 
-                    instantRecv = self.instantSubscriber.receive()
+                    instantRecv = self.receiveIfReady(self.instantSubscriber, ready)
                     if instantRecv is not None: 
                         if self.debugger:
                             self.logger.info(instantRecv) 
                         command = {"action": "instant", "activate": int(instantRecv)}
                         self.sendToSerial(command)
 
-                    batteryRecv = self.batterySubscriber.receive()
+                    batteryRecv = self.receiveIfReady(self.batterySubscriber, ready)
                     if batteryRecv is not None: 
                         if self.debugger:
                             self.logger.info(batteryRecv)
                         command = {"action": "battery", "activate": int(batteryRecv)}
                         self.sendToSerial(command)
 
-                    resourceMonitorRecv = self.resourceMonitorSubscriber.receive()
+                    resourceMonitorRecv = self.receiveIfReady(self.resourceMonitorSubscriber, ready)
                     if resourceMonitorRecv is not None: 
                         if self.debugger:
                             self.logger.info(resourceMonitorRecv)
                         command = {"action": "resourceMonitor", "activate": int(resourceMonitorRecv)}
                         self.sendToSerial(command)
 
-                    imuRecv = self.imuSubscriber.receive()
+                    imuRecv = self.receiveIfReady(self.imuSubscriber, ready)
                     if imuRecv is not None: 
                         if self.debugger:
                             self.logger.info(imuRecv)
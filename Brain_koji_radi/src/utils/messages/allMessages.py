@@ -28,36 +28,93 @@
 
 from enum import Enum
 
+# Optional members of a message:
+#   wireSchema - how the value is encoded on the bus (see messageCodec).
+#   delivery   - "mailbox" to keep the newest value in shared memory for the lastOnly subscribers (see mailbox.py),
+#                "direct" to write the values straight on the subscriber pipes, without the gateway (small values only,
+#                at most DIRECT_MAX_FRAME bytes encoded, see messageHandlerSender).
+#   policy     - what the sender does when the queue is busy (see messageHandlerSender):
+#                "deliver" (default) always sends, "conflate" keeps only the newest value until the queue is free
+#                (at most CONFLATE_MAX_WAIT seconds),
+#                "rateLimit" sends at most maxRate messages per second and drops the rest.
+#   deadline   - the worst-case latency, in seconds, from the send to the subscriber, watched by the gateway and the
+#                subscribers (see threadEmergency). Used by the messages of the "Critical" queue.
+
 ####################################### processCamera #######################################
 class mainCamera(Enum):
     Queue = "General"
     Owner = "threadCamera"
     msgID = 1
     msgType = "str"
+    wireSchema = "utf8"
+    policy = "conflate"
 
 class serialCamera(Enum):
     Queue = "General"
     Owner = "threadCamera"
     msgID = 2
     msgType = "str"
+    wireSchema = "utf8"
+    policy = "conflate"
 
 class Recording(Enum):
     Queue = "General"
     Owner = "threadCamera"
     msgID = 3
     msgType = "bool"
+    wireSchema = "bool8"
 
 class Signal(Enum):
     Queue = "General"
     Owner = "threadCamera"
     msgID = 4
     msgType = "str"
+    wireSchema = "utf8"
 
 class LaneKeeping(Enum):
     Queue = "General"
-    Owner = "threadCamera" # here you will send an offset of the car position between the lanes of the road + - from 0 point to dashboard
+    Owner = "threadCamera" # offset of the car from the center of the lane, in mm, + when the car is right of the center
     msgID = 5
     msgType = "int"
+    wireSchema = "int64"
+    policy = "conflate"
+    delivery = "mailbox" # lastOnly subscribers read the newest value from shared memory (see mailbox.py)
+
+class LaneHeading(Enum):
+    Queue = "General"
+    Owner = "threadCamera" # angle of the lane center in the image, in degrees, + when the lane turns right
+    msgID = 8
+    msgType = "float"
+    wireSchema = "float64"
+    policy = "conflate"
+    delivery = "mailbox"
+
+class Detections(Enum):
+    Queue = "General"
+    Owner = "threadCamera" # tracked objects of every camera frame: DetectionFrame (frame seq, capture time, class, conf, box, track id)
+    msgID = 9
+    msgType = "DetectionFrame"
+    wireSchema = "detections"
+    policy = "conflate"
+    delivery = "mailbox"
+
+class HoughFrame(Enum):
+    Queue = "General"
+    Owner = "threadCamera" # descriptor of the lane detection frame, the image itself is in the "hough" FrameBus
+    msgID = 6
+    msgType = "dict"
+    wireSchema = "pickle"
+    policy = "conflate"
+    delivery = "direct" # the camera draws the frame only while someone is subscribed (see messageHandlerSender.hasSubscribers)
+
+class YoloFrame(Enum):
+    Queue = "General"
+    Owner = "threadCamera" # descriptor of the object detection frame, the image itself is in the "yolo" FrameBus
+    msgID = 7
+    msgType = "dict"
+    wireSchema = "pickle"
+    policy = "conflate"
+    delivery = "direct" # the camera draws the frame only while someone is subscribed (see messageHandlerSender.hasSubscribers)
 
 ################################# processCarsAndSemaphores ##################################
 class Cars(Enum):
@@ -65,115 +122,143 @@ class Cars(Enum):
     Owner = "threadCarsAndSemaphores"
     msgID = 1
     msgType = "dict"
+    wireSchema = "pickle"
+    policy = "conflate"
 
 class Semaphores(Enum):
     Queue = "General"
     Owner = "threadCarsAndSemaphores"
     msgID = 2
     msgType = "dict"
+    wireSchema = "pickle"
 
 ################################# From Dashboard ##################################
+# Ordering of the motion commands: SpeedMotor and SteerMotor are written on direct pipes, Brake and Klem go through
+# the emergency lane, so they reach threadWrite on different paths. threadWrite applies SpeedMotor, SteerMotor, Brake
+# and Control in the order they were sent (the send time of the frames) and drops a command older than the last one
+# applied to the same actuator (Brake and Control set both the speed and the steering). Klem is applied as it comes.
 class SpeedMotor(Enum):
     Queue = "General"
     Owner = "Dashboard"
     msgID = 1
     msgType = "str"
+    wireSchema = "utf8"
+    delivery = "direct"
 
 class SteerMotor(Enum):
     Queue = "General"
     Owner = "Dashboard"
     msgID = 2
     msgType = "str"
+    wireSchema = "utf8"
+    delivery = "direct"
 
 class Control(Enum):
     Queue = "General"
     Owner = "Dashboard"
     msgID = 3
     msgType = "dict"
+    wireSchema = "pickle"
 
 class Brake(Enum):
-    Queue = "General"
+    Queue = "Critical" # emergency lane, dispatched by its own thread in the gateway
     Owner = "Dashboard"
     msgID = 4
     msgType = "float"
+    wireSchema = "float64"
+    deadline = 0.002
 
 class Record(Enum):
     Queue = "General"
     Owner = "Dashboard"
     msgID = 5
     msgType = "str"
+    wireSchema = "utf8"
 
 class Config(Enum):
     Queue = "General"
     Owner = "Dashboard"
     msgID = 6
     msgType = "dict"
+    wireSchema = "pickle"
 
 class Klem(Enum):
-    Queue = "General"
+    Queue = "Critical" # emergency lane, Klem "0" stops the car
     Owner = "Dashboard"
     msgID = 7
     msgType = "str"
+    wireSchema = "utf8"
+    deadline = 0.002
 
 class DrivingMode(Enum):
     Queue = "General"
     Owner = "Dashboard"
     msgID = 8
     msgType = "str"
+    wireSchema = "utf8"
 
 class ToggleInstant(Enum):
     Queue = "General"
     Owner = "Dashboard"
     msgID = 9
     msgType = "str"
+    wireSchema = "utf8"
 
 class ToggleBatteryLvl(Enum):
     Queue = "General"
     Owner = "Dashboard"
     msgID = 10
     msgType = "str"
+    wireSchema = "utf8"
 
 class ToggleImuData(Enum):
     Queue = "General"
     Owner = "Dashboard"
     msgID = 11
     msgType = "str"
+    wireSchema = "utf8"
 
 class ToggleResourceMonitor(Enum):
     Queue = "General"
     Owner = "Dashboard"
     msgID = 12
     msgType = "str"
+    wireSchema = "utf8"
 
 class State(Enum):
     Queue = "General"
     Owner = "Dashboard"
     msgID = 13
     msgType = "str"
+    wireSchema = "utf8"
 
 class Brightness(Enum):
     Queue = "General"
     Owner = "Dashboard"
     msgID = 14
     msgType = "str"
+    wireSchema = "utf8"
 
 class Contrast(Enum):
     Queue = "General"
     Owner = "Dashboard"
     msgID = 15
     msgType = "str"
+    wireSchema = "utf8"
 
 class DropdownChannelExample(Enum):
     Queue = "General"
     Owner = "Dashboard"
     msgID = 16
     msgType = "str"
+    wireSchema = "utf8"
 
 class SliderChannelExample(Enum):
     Queue = "General"
     Owner = "Dashboard"
     msgID = 17
     msgType = "str"
+    wireSchema = "utf8"
 
 ################################# From Nucleo ##################################
 class BatteryLvl(Enum):
@@ -181,48 +266,65 @@ class BatteryLvl(Enum):
     Owner = "threadRead"
     msgID = 1
     msgType = "int"
+    wireSchema = "int64"
+    policy = "conflate"
 
 class ImuData(Enum):
     Queue = "General"
     Owner = "threadRead"
     msgID = 2
     msgType = "str"
+    wireSchema = "utf8"
+    policy = "rateLimit"
+    maxRate = 20
+    delivery = "mailbox"
 
 class InstantConsumption(Enum):
     Queue = "General"
     Owner = "threadRead"
     msgID = 3
     msgType = "float"
+    wireSchema = "float64"
+    policy = "conflate"
 
 class ResourceMonitor(Enum):
     Queue = "General"
     Owner = "threadRead"
     msgID = 4
     msgType = "dict"
+    wireSchema = "pickle"
+    policy = "conflate"
 
 class CurrentSpeed(Enum):
     Queue = "General"
     Owner = "threadRead"
     msgID = 5
     msgType = "float"
+    wireSchema = "float64"
+    policy = "conflate"
+    delivery = "mailbox"
 
 class CurrentSteer(Enum):
     Queue = "General"
     Owner = "threadRead"
     msgID = 6
     msgType = "float"
+    wireSchema = "float64"
+    policy = "conflate"
 
 class ImuAck(Enum):
     Queue = "General"
     Owner = "threadRead"
     msgID = 7
     msgType = "str"
+    wireSchema = "utf8"
     
 class WarningSignal(Enum):
     Queue = "General"
     Owner = "threadRead"
     msgID = 7
     msgType = "str"
+    wireSchema = "utf8"
 
 ################################# From Locsys ##################################
 class Location(Enum):
@@ -230,6 +332,8 @@ class Location(Enum):
     Owner = "threadTrafficCommunication"
     msgID = 1
     msgType = "dict"
+    wireSchema = "pickle"
+    policy = "conflate"
 
 ######################    From processSerialHandler  ###########################
 class EnableButton(Enum):
@@ -237,11 +341,23 @@ class EnableButton(Enum):
     Owner = "threadWrite"
     msgID = 1
     msgType = "bool"
+    wireSchema = "bool8"
 
 class WarningSignal(Enum):
     Queue = "General"
     Owner = "brain"
     msgID = 3
     msgType = "str"
+    wireSchema = "utf8"
 
 ### It will have this format: {"WarningName":"name1", "WarningID": 1}
+
+
+######################    From processGateway  ###########################
+class BusMetrics(Enum):
+    Queue = "General"
+    Owner = "threadGateway" # snapshot of busMetrics (per-topic latency histograms, msgs/s, drops) published once per second
+    msgID = 1
+    msgType = "dict"
+    wireSchema = "pickle"
+    policy = "conflate"
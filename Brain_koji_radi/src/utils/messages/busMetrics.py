@@ -0,0 +1,233 @@
+import time
+import weakref
+from multiprocessing import current_process
+
+
+class latencyHistogram:
+    """HDR-style histogram of latencies, with a fixed relative precision.\n
+    The values (in microseconds) are counted in log-linear buckets: every power of two is split into
+    SUB_BUCKETS buckets, so a percentile is known within 1 / SUB_BUCKETS (about 6%) of its value, from
+    1 us up to hours, in a few hundred counters. Recording a value is a couple of integer operations.
+    """
+
+    SUB_BUCKETS = 16
+    SUB_BITS = 4
+
+    def __init__(self):
+        self.counts = [0] * (self.SUB_BUCKETS * 40)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def bucketOf(self, value):
+        """Returns the index of the bucket of a value, in microseconds."""
+        if value < self.SUB_BUCKETS:
+            return value
+        exponent = value.bit_length() - self.SUB_BITS - 1
+        return self.SUB_BUCKETS * (exponent + 1) + (value >> exponent) - self.SUB_BUCKETS
+
+    def valueOf(self, bucket):
+        """Returns the highest value, in microseconds, counted in a bucket."""
+        if bucket < self.SUB_BUCKETS:
+            return bucket
+        exponent = bucket // self.SUB_BUCKETS - 1
+        return ((bucket % self.SUB_BUCKETS + self.SUB_BUCKETS + 1) << exponent) - 1
+
+    def record(self, latency):
+        """Counts a latency.
+        Args:
+            latency (int): The latency, in nanoseconds.
+        """
+        value = max(latency // 1000, 0)
+        bucket = self.bucketOf(value)
+        if bucket >= len(self.counts):
+            bucket = len(self.counts) - 1
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Adds the latencies counted by another histogram (for example the one of another process)."""
+        for bucket, count in enumerate(other.counts):
+            self.counts[bucket] += count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent):
+        """Returns the value under which a percentage of the latencies are, in microseconds (0 if nothing was recorded)."""
+        if self.count == 0:
+            return 0
+        rank = max(int(self.count * percent / 100.0 + 0.5), 1)
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.valueOf(bucket), self.max)
+        return self.max
+
+    def snapshot(self):
+        """Returns the summary of the histogram, in microseconds.
+        Returns:
+            dict: {"count", "min", "mean", "p50", "p90", "p99", "p999", "max"}
+        """
+        return {
+            "count": self.count,
+            "min": self.min or 0,
+            "mean": self.total / self.count if self.count else 0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9),
+            "max": self.max,
+        }
+
+
+class busMetrics:
+    """Per-topic statistics of the message bus collected in one process.\n
+    The stages are measured from the timestamp stamped by messageHandlerSender on every frame:\n
+    "queueWait": from the send to the moment the gateway takes the frame from its queue.\n
+    "dispatch": from the moment the gateway takes the frame to the moment it was written on every pipe.\n
+    "delivery": from the send to the moment a subscriber decodes the frame.\n
+    Besides the histograms every topic counts its messages (msgs/s over the snapshot interval), the messages
+    lost between a sender and a FIFO subscriber (gaps in the sequence numbers of each sender) and the counters of the
+    senders created in the process (see messageHandlerSender.counters). The two are separate: a sender numbers only the
+    frames it sends, so "lost" never includes the values it "dropped" or "conflated" itself. The gateway adds the depth and the backlog of
+    every subscriber pipe (see subscriberWindow.counters).
+
+    Args:
+        source (string, optional): The name shown in the snapshots. Defaults to the name of the process.
+    """
+
+    def __init__(self, source=None):
+        self.source = source
+        self.stages = {}
+        self.messages = {}
+        self.lost = {}
+        self.violations = {}
+        self.senders = weakref.WeakSet()
+        self.windows = weakref.WeakSet()
+        self.since = time.monotonic()
+
+    def record(self, topic, stage, latency):
+        """Counts the latency of a stage of a topic.
+        Args:
+            topic (string): The name of the message.
+            stage (string): "queueWait", "dispatch" or "delivery".
+            latency (int): The latency, in nanoseconds.
+        """
+        stages = self.stages.get(topic)
+        if stages is None:
+            stages = self.stages[topic] = {}
+        histogram = stages.get(stage)
+        if histogram is None:
+            histogram = stages[stage] = latencyHistogram()
+        histogram.record(latency)
+
+    def count(self, topic, messages=1):
+        """Counts the messages of a topic handled in this process."""
+        self.messages[topic] = self.messages.get(topic, 0) + messages
+
+    def countLost(self, topic, messages):
+        """Counts the messages of a topic that never arrived."""
+        self.lost[topic] = self.lost.get(topic, 0) + messages
+
+    def countViolation(self, topic, latency):
+        """Counts a message of a topic that missed its deadline.
+        Args:
+            topic (string): The name of the message.
+            latency (int): The latency of the message, in nanoseconds.
+        """
+        count, worst = self.violations.get(topic, (0, 0))
+        self.violations[topic] = (count + 1, max(worst, latency // 1000))
+
+    def trackSender(self, sender):
+        """Adds the counters of a messageHandlerSender to the snapshots."""
+        self.senders.add(sender)
+
+    def trackWindow(self, window):
+        """Adds the state of a subscriberWindow of the gateway to the snapshots."""
+        self.windows.add(window)
+
+    def snapshot(self, reset=False):
+        """Returns the statistics collected since the previous reset.
+        Args:
+            reset (bool, optional): Start a new interval after the snapshot. Defaults to False.
+        Returns:
+            dict: {"source", "interval", "topics": {name: {"msgs", "msgsPerSecond", "lost", stage: histogram, ...}}}.
+            The topics that missed their deadline also have "deadlineViolations" and "worstViolationUs".
+            In the gateway the snapshot also has "pipes": {subscriber/topic: {"depth", "backlog", ...}}.
+        """
+        now = time.monotonic()
+        interval = now - self.since
+        topics = {}
+        for topic in set(self.stages) | set(self.messages) | set(self.lost) | set(self.violations):
+            messages = self.messages.get(topic, 0)
+            entry = {
+                "msgs": messages,
+                "msgsPerSecond": messages / interval if interval > 0 else 0.0,
+                "lost": self.lost.get(topic, 0),
+            }
+            for stage, histogram in self.stages.get(topic, {}).items():
+                entry[stage] = histogram.snapshot()
+            if topic in self.violations:
+                entry["deadlineViolations"], entry["worstViolationUs"] = self.violations[topic]
+            topics[topic] = entry
+        for sender in list(self.senders):
+            entry = topics.setdefault(sender.message.__name__, {})
+            for name, value in sender.counters().items():
+                entry[name] = entry.get(name, 0) + value
+
+        if reset:
+            self.stages = {}
+            self.messages = {}
+            self.lost = {}
+            self.violations = {}
+            self.since = now
+        result = {"source": self.source or current_process().name, "interval": interval, "topics": topics}
+        windows = list(self.windows)
+        if windows:
+            result["pipes"] = {window.name: window.counters() for window in windows}
+        return result
+
+
+# The statistics of the current process, filled by the gateway, the senders and the subscribers.
+registry = busMetrics()
+
+
+def snapshot(reset=False):
+    """Returns the statistics of the message bus collected in the current process (see busMetrics.snapshot)."""
+    return registry.snapshot(reset)
+
+
+class metricsPublisher:
+    """Publishes the snapshot of the current process on the BusMetrics message (a dashboard channel) at a fixed interval.
+
+    Args:
+        queuesList (dictionary of multiprocessing.queues.Queue): Dictionary of queues where the key is the type of messages.
+        interval (float, optional): The time between two snapshots, in seconds. Defaults to 1.0.
+    """
+
+    def __init__(self, queuesList, interval=1.0):
+        # Imported here because messageHandlerSender itself reports to this module.
+        from src.utils.messages.allMessages import BusMetrics
+        from src.utils.messages.messageHandlerSender import messageHandlerSender
+
+        self.sender = messageHandlerSender(queuesList, BusMetrics)
+        self.interval = interval
+        self.nextTime = time.monotonic() + interval
+
+    def publishIfDue(self):
+        """Publishes a snapshot, and starts a new interval, if the interval has elapsed."""
+        now = time.monotonic()
+        if now < self.nextTime:
+            return
+        self.nextTime = now + self.interval
+        self.sender.send(registry.snapshot(reset=True))
@@ -0,0 +1,61 @@
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+# One detection on the wire: track id (stable between frames, see objectTracker), class, confidence and the box in
+# the pixels of the full camera frame. Decoding is a numpy view on the received frame, without a loop or a copy.
+DETECTION_DTYPE = np.dtype([
+    ("track", "<i4"),
+    ("cls", "<u2"),
+    ("conf", "<f4"),
+    ("x1", "<f4"),
+    ("y1", "<f4"),
+    ("x2", "<f4"),
+    ("y2", "<f4"),
+])
+
+# frame sequence number of the camera, capture time (time.time() of the camera), number of detections
+FRAME_HEADER = struct.Struct("<IdH")
+
+
+class DetectionFrame(namedtuple("DetectionFrame", ("frame", "timestamp", "detections"))):
+    """The detections of one camera frame, the value of the Detections message (wireSchema "detections").
+
+    Args:
+        frame (int): The sequence number of the camera frame.
+        timestamp (float): The capture time of the frame, time.time() of the camera.
+        detections (numpy.ndarray): The detections, with DETECTION_DTYPE (read-only after decoding).
+    """
+    __slots__ = ()
+
+    @classmethod
+    def fromTracks(cls, frame, timestamp, tracks):
+        """Builds the value from the tracks of objectTracker: (id, x1, y1, x2, y2, conf, cls)."""
+        detections = np.empty(len(tracks), dtype=DETECTION_DTYPE)
+        for row, (track, x1, y1, x2, y2, conf, category) in enumerate(tracks):
+            detections[row] = (track, category, conf, x1, y1, x2, y2)
+        return cls(frame, timestamp, detections)
+
+    def toDict(self):
+        """The value as plain python types (e.g. for JSON)."""
+        return {
+            "frame": self.frame,
+            "timestamp": self.timestamp,
+            "detections": [dict(zip(DETECTION_DTYPE.names, row)) for row in self.detections.tolist()],
+        }
+
+
+def packDetections(value):
+    """Returns the bytes of a DetectionFrame. Raises ValueError if the detections do not have DETECTION_DTYPE."""
+    detections = value.detections
+    if not isinstance(detections, np.ndarray) or detections.dtype != DETECTION_DTYPE:
+        raise ValueError("detections must be a numpy array with DETECTION_DTYPE")
+    return FRAME_HEADER.pack(value.frame & 0xFFFFFFFF, value.timestamp, len(detections)) + detections.tobytes()
+
+
+def unpackDetections(frame, offset=0):
+    """Returns the DetectionFrame packed at offset of frame; the detections are a view on frame."""
+    sequence, timestamp, count = FRAME_HEADER.unpack_from(frame, offset)
+    detections = np.frombuffer(frame, DETECTION_DTYPE, count, offset + FRAME_HEADER.size)
+    return DetectionFrame(sequence, timestamp, detections)
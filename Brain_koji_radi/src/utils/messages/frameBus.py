@@ -0,0 +1,152 @@
+import os
+import struct
+import time
+
+import numpy as np
+
+from src.utils.messages.sharedMemory import attachSharedMemory, createSharedMemory
+
+
+class FrameBus:
+    """Ring of preallocated frame slots in shared memory.\n
+    The producer copies every frame once into the next slot and publishes only a small descriptor
+    (slot, seq, shape, timestamp) through messageHandlerSender. The consumers map the slot as a numpy array,
+    without copying, JPEG encoding or base64.\n
+    The ring starts with the layout of the bus (slots, slot size), so the consumers only need its name.
+    Every slot starts with a header holding the sequence number of the frame it contains. A descriptor is
+    valid as long as the header still holds its sequence number, that is until the producer wraps around
+    the ring (slots / fps seconds).
+
+    Args:
+        name (string): The name of the bus, shared by the producer and the consumers.
+        maxShape (tuple, optional): The largest frame (height, width, channels) that fits in a slot. Needed only by the producer.
+        slots (int, optional): The number of slots in the ring. Needed only by the producer. Defaults to 4.
+        create (bool, optional): True for the producer, which allocates the ring. Defaults to False.
+    """
+
+    # slots, slot size, pid of the producer (padded to 32 bytes)
+    LAYOUT = struct.Struct("<IIi20x")
+    OWNER_OFFSET = 8
+    # seq, timestamp, height, width, channels (padded to 32 bytes)
+    HEADER = struct.Struct("<QdIII4x")
+
+    def __init__(self, name, maxShape=None, slots=4, create=False):
+        self.name = name
+        self.created = create
+        self.seq = 0
+        self.lastDescriptor = None
+        self.slots = 0
+        self.slotSize = 0
+        self._shm = None
+
+        if create:
+            self.slots = slots
+            self.slotSize = self.HEADER.size + int(np.prod(maxShape))
+            self._shm = createSharedMemory(self.blockName(name), self.LAYOUT.size + self.slotSize * slots, self.OWNER_OFFSET)
+            self.LAYOUT.pack_into(self._shm.buf, 0, self.slots, self.slotSize, os.getpid())
+            for slot in range(slots):
+                self.HEADER.pack_into(self._shm.buf, self.slotOffset(slot), 0, 0.0, 0, 0, 0)
+        else:
+            self.isAttached()
+
+    @staticmethod
+    def blockName(name):
+        """Returns the name of the shared memory block used by a bus."""
+        return "frameBus_" + name
+
+    def isAttached(self):
+        """Checks if the shared memory of the bus exists. A consumer can be created before the producer."""
+        if self._shm is None:
+            self._shm = attachSharedMemory(self.blockName(self.name))
+            if self._shm is not None:
+                self.slots, self.slotSize, _ = self.LAYOUT.unpack_from(self._shm.buf, 0)
+        return self._shm is not None
+
+    def slotOffset(self, slot):
+        """Returns the offset of a slot (its header) in the shared memory."""
+        return self.LAYOUT.size + slot * self.slotSize
+
+    # ==================================== PRODUCER ======================================
+
+    def write(self, frame, timestamp=None):
+        """Copies a frame into the next slot of the ring.
+        Args:
+            frame (numpy.ndarray): uint8 frame of at most maxShape.
+            timestamp (float, optional): The capture time of the frame. Defaults to now.
+        Returns:
+            dict: The descriptor of the frame, to be sent through messageHandlerSender.
+        """
+        if frame.ndim == 2:
+            height, width = frame.shape
+            channels = 1
+        else:
+            height, width, channels = frame.shape
+        if height * width * channels > self.slotSize - self.HEADER.size:
+            raise ValueError(f"Frame {frame.shape} does not fit in the slots of the {self.name} frame bus")
+        if timestamp is None:
+            timestamp = time.time()
+
+        self.seq += 1
+        slot = self.seq % self.slots
+        offset = self.slotOffset(slot)
+        # The slot is marked invalid while it is being overwritten.
+        self.HEADER.pack_into(self._shm.buf, offset, 0, 0.0, 0, 0, 0)
+        view = np.ndarray((height, width, channels), dtype=np.uint8, buffer=self._shm.buf, offset=offset + self.HEADER.size)
+        view[...] = frame.reshape((height, width, channels))
+        del view
+        self.HEADER.pack_into(self._shm.buf, offset, self.seq, timestamp, height, width, channels)
+
+        self.lastDescriptor = {
+            "bus": self.name,
+            "slot": slot,
+            "seq": self.seq,
+            "shape": [height, width, channels],
+            "timestamp": timestamp,
+        }
+        return self.lastDescriptor
+
+    # ==================================== CONSUMER ======================================
+
+    def read(self, descriptor):
+        """Maps the frame of a descriptor, without copying it.\n
+        The returned array is a view on the shared memory: it is overwritten when the producer wraps around
+        the ring. Call isValid() after using it, or copy it, if the frame has to be kept.
+        Args:
+            descriptor (dict): The descriptor received from the producer.
+        Returns:
+            numpy.ndarray: The frame, or None if the slot was already overwritten.
+        """
+        if not self.isValid(descriptor):
+            return None
+        height, width, channels = descriptor["shape"]
+        frame = np.ndarray(
+            (height, width, channels),
+            dtype=np.uint8,
+            buffer=self._shm.buf,
+            offset=self.slotOffset(descriptor["slot"]) + self.HEADER.size,
+        )
+        if channels == 1:
+            frame = frame.reshape((height, width))
+        return frame
+
+    def isValid(self, descriptor):
+        """Checks that the slot of a descriptor still holds the same frame."""
+        if not self.isAttached():
+            return False
+        seq = self.HEADER.unpack_from(self._shm.buf, self.slotOffset(descriptor["slot"]))[0]
+        return seq == descriptor["seq"]
+
+    # ===================================== CLOSE ========================================
+
+    def close(self):
+        """Releases the shared memory. The producer also removes it from the system."""
+        if self._shm is None:
+            return
+        try:
+            self._shm.close()
+        except BufferError:
+            # An array returned by read() is still alive, the mapping is released with it.
+            pass
+        if self.created:
+            self._shm.unlink()
+        self._shm = None
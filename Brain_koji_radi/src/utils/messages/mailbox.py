@@ -0,0 +1,146 @@
+import os
+import struct
+import time
+
+from src.utils.messages.sharedMemory import OWNER, attachSharedMemory, createSharedMemory, isRunning
+
+
+class Mailbox:
+    """Last-value mailbox of one topic in shared memory, guarded by a sequence counter (seqlock).\n
+    The publisher overwrites the encoded frame of the newest value in place, the lastOnly subscribers read it
+    without a pipe, a syscall or a backlog to drain. There must be a single publisher per topic: a second one fails
+    to create the mailbox while the first one is running (see createSharedMemory). A subscriber lets go of a mailbox
+    whose publisher stopped and attaches to the one created by the next publisher (generation counts the attachments).\n
+    The sequence is odd while the frame is being written. A reader copies the frame and checks that the
+    sequence did not change meanwhile, otherwise it reads again.
+
+    Args:
+        name (string): The name of the mailbox, shared by the publisher and the subscribers.
+        create (bool, optional): True for the publisher, which allocates the mailbox. Defaults to False.
+        capacity (int, optional): The largest frame that fits in the mailbox, in bytes. Needed only by the publisher. Defaults to 4096.
+    """
+
+    # seq, frame length, capacity, pid of the publisher (padded to 32 bytes)
+    HEADER = struct.Struct("<QIIi12x")
+    OWNER_OFFSET = 16
+    SEQ = struct.Struct("<Q")
+    LENGTH = struct.Struct("<I")
+    # Seconds between two checks that the publisher of an attached mailbox is still running.
+    OWNER_CHECK = 0.5
+
+    def __init__(self, name, create=False, capacity=4096):
+        self.name = name
+        self.created = create
+        self.seq = 0
+        self.capacity = 0
+        self.generation = 0
+        self.ownerChecked = 0.0
+        self._shm = None
+
+        if create:
+            self.capacity = capacity
+            self._shm = createSharedMemory(self.blockName(name), self.HEADER.size + capacity, self.OWNER_OFFSET)
+            self.HEADER.pack_into(self._shm.buf, 0, 0, 0, capacity, os.getpid())
+        else:
+            self.isAttached()
+
+    @staticmethod
+    def blockName(name):
+        """Returns the name of the shared memory block used by a mailbox."""
+        return "mailbox_" + name
+
+    @staticmethod
+    def topicName(message):
+        """Returns the name of the mailbox of a message enum."""
+        return f"{message.Owner.value}_{message.msgID.value}"
+
+    def isAttached(self):
+        """Checks if the shared memory of the mailbox exists. A subscriber can be created before the publisher.
+        A block whose publisher is not running anymore (see ownerStopped) is released, the next call attaches to
+        the block of a new publisher."""
+        if self._shm is not None and not self.created and self.ownerStopped():
+            print(f"WARNING: The publisher of the {self.name} mailbox stopped, waiting for a new one")
+            self._shm.close()
+            self._shm = None
+            return False
+        if self._shm is None:
+            self._shm = attachSharedMemory(self.blockName(self.name))
+            if self._shm is not None:
+                _, _, self.capacity, owner = self.HEADER.unpack_from(self._shm.buf, 0)
+                if not isRunning(owner):
+                    # Left behind by a publisher that crashed, the next publisher replaces it.
+                    self._shm.close()
+                    self._shm = None
+                    return False
+                self.generation += 1
+                self.ownerChecked = time.monotonic()
+        return self._shm is not None
+
+    def ownerStopped(self):
+        """Checks, at most every OWNER_CHECK seconds, if the publisher of the mailbox closed it or is not running anymore."""
+        now = time.monotonic()
+        if now - self.ownerChecked < self.OWNER_CHECK:
+            return False
+        self.ownerChecked = now
+        return not isRunning(self.HEADER.unpack_from(self._shm.buf, 0)[3])
+
+    # ==================================== PUBLISHER =====================================
+
+    def write(self, frame):
+        """Overwrites the mailbox with a new frame.
+        Args:
+            frame (bytes): The encoded frame (see messageCodec).
+        """
+        length = len(frame)
+        if length > self.capacity:
+            raise ValueError(f"Frame of {length} bytes does not fit in the {self.name} mailbox")
+        buf = self._shm.buf
+        self.SEQ.pack_into(buf, 0, self.seq + 1)
+        buf[self.HEADER.size:self.HEADER.size + length] = frame
+        self.LENGTH.pack_into(buf, self.SEQ.size, length)
+        self.seq += 2
+        self.SEQ.pack_into(buf, 0, self.seq)
+
+    # ==================================== SUBSCRIBER ====================================
+
+    def sequence(self):
+        """Returns the sequence of the newest frame, 0 if nothing was written yet (or the mailbox does not exist)."""
+        if not self.isAttached():
+            return 0
+        return self.SEQ.unpack_from(self._shm.buf, 0)[0] & ~1
+
+    def read(self, retries=100):
+        """Copies the newest frame.
+        Args:
+            retries (int, optional): How many times a read torn by the publisher is repeated. Defaults to 100.
+        Returns:
+            tuple: (seq, frame), or None if nothing was written yet.
+        """
+        if not self.isAttached():
+            return None
+        buf = self._shm.buf
+        for _ in range(retries):
+            seq = self.SEQ.unpack_from(buf, 0)[0]
+            if seq & 1:
+                continue
+            if seq == 0:
+                return None
+            length = min(self.LENGTH.unpack_from(buf, self.SEQ.size)[0], self.capacity)
+            frame = bytes(buf[self.HEADER.size:self.HEADER.size + length])
+            if self.SEQ.unpack_from(buf, 0)[0] == seq:
+                return seq, frame
+        return None
+
+    # ===================================== CLOSE ========================================
+
+    def close(self):
+        """Releases the shared memory. The publisher also removes it from the system, and clears its pid in the
+        header so that the subscribers still attached to the block let go of it."""
+        if self._shm is None:
+            return
+        if self.created:
+            OWNER.pack_into(self._shm.buf, self.OWNER_OFFSET, 0)
+        self._shm.close()
+        if self.created:
+            self._shm.unlink()
+        self._shm = None
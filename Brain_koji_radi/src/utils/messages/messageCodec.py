@@ -0,0 +1,225 @@
+import inspect
+import pickle
+import struct
+from enum import Enum
+
+import src.utils.messages.allMessages as allMessages
+from src.utils.messages.detections import DetectionFrame, packDetections, unpackDetections
+
+# Every frame starts with the index of its topic, the encoding of its value, the id of its sender, the sequence number
+# given by that sender and the time it was sent (time.monotonic_ns(), the same clock in every process). The last three
+# are 0 when unknown. Several senders of one topic number their frames independently, the id tells them apart.
+HEADER = struct.Struct("<HBIIq")
+
+# Encodings of the value.
+SCHEMA = 0
+PICKLE = 1
+
+# Reserved topic indexes.
+GENERIC = 0xFFFF  # topic not declared in allMessages: (Owner, msgID, msgType, value) is pickled
+BATCH = 0xFFFE  # several frames, each one prefixed by its length
+
+BATCH_LENGTH = struct.Struct("<I")
+
+# Fixed layouts of the scalar wire schemas, with the python type they carry.
+SCALAR_SCHEMAS = {
+    "float64": (struct.Struct("<d"), float),
+    "int64": (struct.Struct("<q"), int),
+    "bool8": (struct.Struct("<?"), bool),
+}
+
+
+class topicCodec:
+    """Encoder and decoder of the values of one topic, built from the wireSchema declared in allMessages.\n
+    A value that does not match the schema (for example an int sent on a float64 topic) falls back to pickle,
+    so the subscribers always receive exactly what was sent.
+
+    Args:
+        index (int): The index of the topic, the same in every process.
+        message (enum): The message of the topic.
+    """
+
+    def __init__(self, index, message):
+        self.index = index
+        self.message = message
+        self.Owner = message.Owner.value
+        self.msgID = message.msgID.value
+        self.msgType = message.msgType.value
+        self.schema = message.wireSchema.value if "wireSchema" in message.__members__ else "pickle"
+        self.policy = message.policy.value if "policy" in message.__members__ else "deliver"
+        self.layout, self.pythonType = SCALAR_SCHEMAS.get(self.schema, (None, None))
+
+    def encode(self, value, seq=0, timestamp=0, sender=0):
+        """Returns the frame of a value.
+        Args:
+            value (any type): The value.
+            seq (int, optional): The sequence number of the message. Defaults to 0.
+            timestamp (int, optional): The time the message was sent, from time.monotonic_ns(). Defaults to 0.
+            sender (int, optional): The id of the sender which numbered the message (32 bits). Defaults to 0.
+        """
+        seq &= 0xFFFFFFFF
+        if self.layout is not None:
+            if type(value) is self.pythonType:
+                try:
+                    return HEADER.pack(self.index, SCHEMA, sender, seq, timestamp) + self.layout.pack(value)
+                except struct.error:
+                    pass
+        elif self.schema == "utf8":
+            if type(value) is str:
+                return HEADER.pack(self.index, SCHEMA, sender, seq, timestamp) + value.encode("utf-8")
+        elif self.schema == "detections":
+            if type(value) is DetectionFrame:
+                try:
+                    return HEADER.pack(self.index, SCHEMA, sender, seq, timestamp) + packDetections(value)
+                except (struct.error, ValueError):
+                    pass
+        return HEADER.pack(self.index, PICKLE, sender, seq, timestamp) + pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def decodeValue(self, frame, encoding):
+        """Returns the value of a frame of this topic."""
+        if encoding == PICKLE:
+            return pickle.loads(memoryview(frame)[HEADER.size:])
+        if self.layout is not None:
+            return self.layout.unpack_from(frame, HEADER.size)[0]
+        if self.schema == "detections":
+            return unpackDetections(frame, HEADER.size)
+        return str(memoryview(frame)[HEADER.size:], "utf-8")
+
+
+def _buildRegistry():
+    """Collects the topics of allMessages, ordered by (Owner, msgID) so that every process assigns the same indexes."""
+    messages = {}
+    for name, cls in inspect.getmembers(allMessages, inspect.isclass):
+        if name != "Enum" and issubclass(cls, Enum):
+            messages[(cls.Owner.value, cls.msgID.value)] = cls
+    codecs = []
+    for index, key in enumerate(sorted(messages, key=lambda key: (key[0], key[1]))):
+        codecs.append(topicCodec(index, messages[key]))
+    return codecs
+
+
+codecsByIndex = _buildRegistry()
+codecsByKey = {(codec.Owner, codec.msgID): codec for codec in codecsByIndex}
+
+
+def register(message):
+    """Registers a message that is not declared in allMessages (for example the synthetic topics of a benchmark).
+    The indexes must be the same in every process: register the messages before the processes are started,
+    or in the same order in every process.
+    Returns:
+        topicCodec: The codec of the message.
+    """
+    key = (message.Owner.value, message.msgID.value)
+    if key not in codecsByKey:
+        codecsByIndex.append(topicCodec(len(codecsByIndex), message))
+        codecsByKey[key] = codecsByIndex[-1]
+    return codecsByKey[key]
+
+
+def codecFor(message):
+    """Returns the codec of a message enum, or None if the message is not declared in allMessages."""
+    return codecsByKey.get((message.Owner.value, message.msgID.value))
+
+
+def encodeEnvelope(Owner, msgID, msgType, value, seq=0, timestamp=0, sender=0):
+    """Returns the frame of a message given by its fields."""
+    codec = codecsByKey.get((Owner, msgID))
+    if codec is not None:
+        return codec.encode(value, seq, timestamp, sender)
+    header = HEADER.pack(GENERIC, PICKLE, sender, seq & 0xFFFFFFFF, timestamp)
+    return header + pickle.dumps((Owner, msgID, msgType, value), pickle.HIGHEST_PROTOCOL)
+
+
+def encode(message, value, seq=0, timestamp=0, sender=0):
+    """Returns the frame of a value of a message enum."""
+    return encodeEnvelope(message.Owner.value, message.msgID.value, message.msgType.value, value, seq, timestamp, sender)
+
+
+def stamp(frame):
+    """Returns the (seq, timestamp) of a frame, without decoding its value."""
+    return HEADER.unpack_from(frame)[3:]
+
+
+def origin(frame):
+    """Returns the (sender, seq) of a frame: the sequence numbers of different senders are not comparable."""
+    return HEADER.unpack_from(frame)[2:4]
+
+
+def topicName(frame):
+    """Returns the name of the message of a frame (the "Owner/msgID" of the messages not declared in allMessages)."""
+    index = HEADER.unpack_from(frame)[0]
+    if index == GENERIC:
+        return "%s/%s" % topicKey(frame)
+    return codecsByIndex[index].message.__name__
+
+
+def restamp(frame, timestamp):
+    """Returns a copy of a frame with another send time, keeping its sender and sequence number (used to replay recorded frames)."""
+    index, encoding, sender, seq, _ = HEADER.unpack_from(frame)
+    return HEADER.pack(index, encoding, sender, seq, timestamp) + bytes(memoryview(frame)[HEADER.size:])
+
+
+def queueOf(frame):
+    """Returns the name of the queue ("Critical", "Warning", "General") a frame is sent on."""
+    index = HEADER.unpack_from(frame)[0]
+    if index == GENERIC:
+        return "General"
+    return codecsByIndex[index].message.Queue.value
+
+
+def policyOf(frame):
+    """Returns the policy of the message of a frame ("deliver", "conflate" or "rateLimit", see allMessages)."""
+    index = HEADER.unpack_from(frame)[0]
+    if index == GENERIC:
+        return "deliver"
+    return codecsByIndex[index].policy
+
+
+def topicKey(frame):
+    """Returns the (Owner, msgID) of a frame, without decoding its value."""
+    index = HEADER.unpack_from(frame)[0]
+    if index == GENERIC:
+        Owner, msgID, _, _ = pickle.loads(memoryview(frame)[HEADER.size:])
+        return (Owner, msgID)
+    codec = codecsByIndex[index]
+    return (codec.Owner, codec.msgID)
+
+
+def decode(frame):
+    """Returns the envelope of a frame, as the dictionary the gateway used to send:
+    {"Type": msgType, "value": value, "id": msgID, "Owner": Owner}."""
+    index, encoding = HEADER.unpack_from(frame)[:2]
+    if index == GENERIC:
+        Owner, msgID, msgType, value = pickle.loads(memoryview(frame)[HEADER.size:])
+        return {"Type": msgType, "value": value, "id": msgID, "Owner": Owner}
+    codec = codecsByIndex[index]
+    return {"Type": codec.msgType, "value": codec.decodeValue(frame, encoding), "id": codec.msgID, "Owner": codec.Owner}
+
+
+# ===================================== BATCHES ==========================================
+
+def encodeBatch(frames):
+    """Returns one frame holding several frames."""
+    parts = [HEADER.pack(BATCH, SCHEMA, 0, 0, 0)]
+    for frame in frames:
+        parts.append(BATCH_LENGTH.pack(len(frame)))
+        parts.append(frame)
+    return b"".join(parts)
+
+
+def isBatch(frame):
+    """Checks if a frame holds a batch."""
+    return HEADER.unpack_from(frame)[0] == BATCH
+
+
+def splitBatch(frame):
+    """Returns the frames held by a batch, in order, as memoryviews on the batch."""
+    view = memoryview(frame)
+    frames = []
+    offset = HEADER.size
+    while offset < len(view):
+        length = BATCH_LENGTH.unpack_from(view, offset)[0]
+        offset += BATCH_LENGTH.size
+        frames.append(view[offset:offset + length])
+        offset += length
+    return frames
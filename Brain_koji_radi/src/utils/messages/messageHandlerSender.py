@@ -26,6 +26,74 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE
 
+import os
+import select
+import threading
+import time
+from multiprocessing import Pipe
+
+import src.utils.messages.busMetrics as busMetrics
+import src.utils.messages.messageCodec as messageCodec
+from src.utils.messages.mailbox import Mailbox
+from src.utils.messages.shards import messageQueues
+
+# The largest frame written in one piece on a pipe (header included), so that the writes of several
+# processes on the same subscriber pipe cannot interleave. A direct topic never carries larger frames: the gateway
+# writes them in pieces, which the writes of the publishers could split (see subscriberWindow).
+DIRECT_MAX_FRAME = getattr(select, "PIPE_BUF", 4096) - 4
+
+# The longest a value of a conflated topic waits for its queue to be free, in seconds. After that it is put into
+# the busy queue anyway, so the last value of a burst is not held back by the traffic of the other topics.
+CONFLATE_MAX_WAIT = 0.05
+
+
+class pendingFlusher(threading.Thread):
+    """Sends the values of the conflated topics of the process that still wait for their queue (see
+    messageHandlerSender.flush), so that a value goes out even if its topic sends nothing after it.
+
+    Args:
+        interval (float, optional): The time between two flushes, in seconds. Defaults to 0.005.
+    """
+
+    def __init__(self, interval=0.005):
+        super().__init__(name="pendingFlusher", daemon=True)
+        self.interval = interval
+        self.senders = set()
+        self.condition = threading.Condition()
+
+    def add(self, sender):
+        """Flushes a sender until its value is sent."""
+        with self.condition:
+            self.senders.add(sender)
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.senders:
+                    self.condition.wait()
+                senders = list(self.senders)
+            time.sleep(self.interval)
+            for sender in senders:
+                sender.flush()
+                with self.condition:
+                    # a sender that got a new value meanwhile was added again, it stays
+                    if sender.pending is None:
+                        self.senders.discard(sender)
+
+
+_flusher = None
+
+
+def flushLater(sender):
+    """Hands a sender with a waiting value to the pendingFlusher of the process, starting it if needed
+    (a thread does not survive a fork, so a child process starts its own)."""
+    global _flusher
+    if _flusher is None or not _flusher.is_alive():
+        _flusher = pendingFlusher()
+        _flusher.start()
+    _flusher.add(sender)
+
 class messageHandlerSender:
     """Class which will handle sender functionalities.
     
@@ -35,29 +103,210 @@ class messageHandlerSender:
     """
         
     def __init__(self, queuesList, message):
-        self.queuesList = queuesList
+        # The queues of the gateway shard of the message (see shards.createShards).
+        self.queuesList = messageQueues(queuesList, message)
         self.message = message
+        # Encoder of the wireSchema declared in allMessages (None for the messages that are not declared there).
+        self.codec = messageCodec.codecFor(message)
+        # Topics declared with delivery = "mailbox" also keep their newest value in shared memory, for the lastOnly subscribers.
+        self.mailbox = None
+        if "delivery" in message.__members__ and message.delivery.value == "mailbox":
+            self.mailbox = Mailbox(Mailbox.topicName(message), create=True)
+        # Delivery policy declared in allMessages: "deliver" (default), "conflate" or "rateLimit" (maxRate per second).
+        self.policy = message.policy.value if "policy" in message.__members__ else "deliver"
+        self.minInterval = 1.0 / message.maxRate.value if self.policy == "rateLimit" else 0.0
+        self.lastSent = float("-inf")
+        # Newest frame of a conflated topic, waiting for the queue to be free, and since when a value waits.
+        self.pending = None
+        self.pendingSince = 0.0
+        # The pendingFlusher sends the waiting frame from its own thread.
+        self.lock = threading.Lock()
+
+        self.sent = 0
+        self.dropped = 0
+        self.conflated = 0
+        # Every frame is stamped with the send time and the id of the sender, and the frames that are put into the queue
+        # or written on the pipes are numbered, for the latency and loss statistics (see busMetrics). The frames
+        # dropped or conflated by the policy do not use up a number, so the subscribers do not count them as lost.
+        self.senderId = int.from_bytes(os.urandom(4), "little") or 1
+        self.seq = 0
+        busMetrics.registry.trackSender(self)
+
+        # Topics declared with delivery = "direct" are written straight on the pipes of the subscribers, once the
+        # gateway has handed them over (see threadGateway.publish). Until then they go through the queue.
+        self.directPipes = None
+        self._control = None
+        if "delivery" in message.__members__ and message.delivery.value == "direct":
+            self._control, self._controlSend = Pipe(duplex=False)
+            self.queuesList["Config"].put(
+                {
+                    "Subscribe/Unsubscribe": "publish",
+                    "Owner": self.message.Owner.value,
+                    "msgID": self.message.msgID.value,
+                    "To": {"receiver": "%d/%d" % (os.getpid(), id(self)), "pipe": self._controlSend},
+                }
+            )
 
     def send(self, value):
         """
-        Puts a value into the queuesList if the queue is empty.
-        This prevents sending a new frame if the previous one is still waiting.
+        Puts a value into the queue of the message, according to the policy of the message:\n
+        "deliver": the value is always sent.\n
+        "conflate": the value is sent only if the queue is empty. Otherwise it replaces the value waiting from a
+        previous call, which is not sent anymore. The pendingFlusher of the process sends it once the queue is
+        free, or after CONFLATE_MAX_WAIT seconds even if the queue is still busy.\n
+        "rateLimit": the value is dropped if the previous one was sent less than 1 / maxRate seconds ago.\n
+        The mailbox of the topic, if it has one, is always overwritten. A direct topic is written on the pipes
+        of the subscribers, without the queue, once the gateway handed them over.
         
         Args:
             value (any type): The value to be put into the queue. This can be of any type.
         """
         try:
-            queue = self.queuesList[self.message.Queue.value]
-            # Ako red nije prazan, ne šaljemo novu poruku
-            if not queue.empty():
-                # Možete dodati i log poruku ovde ako želite
-                # print("Queue is not empty. Dropping frame.")
-                return
-            queue.put({
-                "Owner": self.message.Owner.value,
-                "msgID": self.message.msgID.value,
-                "msgType": self.message.msgType.value,
-                "msgValue": value
-            })
+            with self.lock:
+                frame = self.encode(value)
+                self.deliver(frame)
         except Exception as e:
+            self.dropped += 1
             print(f"WARNING: Failed to send message ({self.message}): {e}")
+            return
+        # Written after the delivery, so that a frame the mailbox cannot take still reaches the FIFO subscribers.
+        if self.mailbox is not None:
+            try:
+                self.mailbox.write(frame)
+            except ValueError as e:
+                print(f"WARNING: Failed to update the mailbox ({self.message}): {e}")
+
+    def deliver(self, frame):
+        """Puts an encoded frame into the queue, or on the direct pipes, according to the policy of the message.
+        Called with the lock held."""
+        queue = self.queuesList[self.message.Queue.value]
+
+        if self._control is not None:
+            if len(frame) > DIRECT_MAX_FRAME:
+                raise ValueError(f"Frame of {len(frame)} bytes is too large for a direct topic ({DIRECT_MAX_FRAME} bytes)")
+            self.updateRoute()
+            if self.directPipes is not None:
+                if self.policy == "rateLimit" and not self.rateAllows():
+                    return
+                if self.pending is not None:
+                    # Written before the direct pipes were handed over, this value is older than the new one
+                    self.pending = None
+                    self.conflated += 1
+                self.sendDirect(frame)
+                return
+
+        if self.policy == "conflate":
+            if self.pending is not None:
+                self.conflated += 1
+            else:
+                self.pendingSince = time.monotonic()
+            self.pending = frame
+            if not self.flushLocked():
+                flushLater(self)
+            return
+
+        if self.policy == "rateLimit" and not self.rateAllows():
+            return
+
+        queue.put(frame)
+        self.numbered()
+
+    def rateAllows(self):
+        """Checks the rate limit of the topic, counting the value as dropped if it is exceeded."""
+        now = time.monotonic()
+        if now - self.lastSent < self.minInterval:
+            self.dropped += 1
+            return False
+        self.lastSent = now
+        return True
+
+    def updateRoute(self):
+        """Takes the newest list of subscriber pipes sent by the gateway, if there is one."""
+        while self._control.poll():
+            route = self._control.recv()
+            if self.directPipes is not None:
+                for pipe in self.directPipes:
+                    pipe.close()
+            self.directPipes = tuple(route["pipes"])
+
+    def hasSubscribers(self):
+        """Checks if anyone reads the topic, so that a publisher can skip work nobody uses (e.g. drawing a frame).
+        Only a direct topic knows it, from the pipes handed over by the gateway (a recorder tap counts as a subscriber).
+        Returns:
+            bool: False only for a direct topic without subscribers.
+        """
+        if self._control is None:
+            return True
+        self.updateRoute()
+        return self.directPipes is None or len(self.directPipes) > 0
+
+    def sendDirect(self, frame):
+        """Writes a frame on the pipes of the subscribers, without the gateway. A closed pipe is forgotten.
+        The gateway made the pipes non-blocking (see subscriberWindow, and threadGateway.tap for the pipe of a recorder):
+        the frame is dropped for a subscriber whose pipe is full, and counted in dropped.
+        """
+        closed = []
+        for pipe in self.directPipes:
+            try:
+                pipe.send_bytes(frame)
+            except BlockingIOError:
+                self.dropped += 1
+            except OSError:
+                closed.append(pipe)
+        if closed:
+            self.directPipes = tuple(pipe for pipe in self.directPipes if pipe not in closed)
+        self.numbered()
+
+    def flush(self):
+        """Sends the value of a conflated topic that is still waiting, if the queue is free now or the value has
+        waited CONFLATE_MAX_WAIT seconds.
+        Returns:
+            bool: True if nothing is waiting anymore.
+        """
+        with self.lock:
+            return self.flushLocked()
+
+    def flushLocked(self):
+        if self.pending is None:
+            return True
+        if self._control is not None:
+            self.updateRoute()
+            if self.directPipes is not None:
+                # The pipes were handed over meanwhile: the value goes the way the next ones will, not behind them.
+                frame, self.pending = self.pending, None
+                self.sendDirect(frame)
+                return True
+        queue = self.queuesList[self.message.Queue.value]
+        if not queue.empty() and time.monotonic() - self.pendingSince < CONFLATE_MAX_WAIT:
+            return False
+        queue.put(self.pending)
+        self.pending = None
+        self.numbered()
+        return True
+
+    def counters(self):
+        """Returns the counters of the sender.
+        Returns:
+            dict: {"sent", "dropped", "conflated"}: the values put into the queue, dropped by the rate limit or by an
+            error, and replaced by a newer value before they could be sent.
+        """
+        return {"sent": self.sent, "dropped": self.dropped, "conflated": self.conflated}
+
+    def encode(self, value):
+        """Encodes a value into the binary frame carried by the queues and the pipes (see messageCodec),
+        stamped with the current time and the sequence number it gets if it is sent (see numbered)."""
+        seq = self.seq + 1
+        if self.codec is not None:
+            return self.codec.encode(value, seq, time.monotonic_ns(), self.senderId)
+        return messageCodec.encode(self.message, value, seq, time.monotonic_ns(), self.senderId)
+
+    def numbered(self):
+        """Counts a frame as sent, so the next frame encoded gets the next sequence number.
+        The frame waiting in pending (conflate) has the next number too: it is replaced, not sent, by a newer value."""
+        self.seq += 1
+        self.sent += 1
+
+    def __del__(self):
+        """Cleans up by removing the mailbox of the topic."""
+        if getattr(self, "mailbox", None) is not None:
+            self.mailbox.close()
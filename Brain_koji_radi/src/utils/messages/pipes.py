@@ -0,0 +1,40 @@
+import array
+import fcntl
+import termios
+
+F_SETPIPE_SZ = 1031
+F_GETPIPE_SZ = 1032
+
+
+def pipeDepth(pipe):
+    """Returns the number of bytes written on a pipe and not read yet (either end of the pipe can be asked).
+    Args:
+        pipe (multiprocessing.connection.Connection): One end of the pipe.
+    Returns:
+        int: The bytes in the pipe, 0 if the system cannot tell.
+    """
+    depth = array.array("i", [0])
+    try:
+        fcntl.ioctl(pipe.fileno(), termios.FIONREAD, depth, True)
+    except OSError:
+        return 0
+    return depth[0]
+
+
+def pipeCapacity(pipe):
+    """Returns the size of the buffer of a pipe, in bytes (64 kB by default on Linux)."""
+    try:
+        return fcntl.fcntl(pipe.fileno(), F_GETPIPE_SZ)
+    except OSError:
+        return 65536
+
+
+def setPipeCapacity(pipe, size):
+    """Resizes the buffer of a pipe (up to /proc/sys/fs/pipe-max-size, 1 MB by default, for a normal user).
+    Returns:
+        int: The new size of the buffer, which the system rounds up to whole pages.
+    """
+    try:
+        return fcntl.fcntl(pipe.fileno(), F_SETPIPE_SZ, size)
+    except OSError:
+        return pipeCapacity(pipe)
@@ -0,0 +1,50 @@
+from multiprocessing import Queue
+
+
+def createShards(queuesList, shards):
+    """Adds the queues of the gateway shards to the dictionary of queues, before the processes are created.\n
+    Every shard gets its own Critical, Warning, General and Config queues, under queuesList["Shards"][name].
+    The topics of a shard are given by their Owner (all the messages of the owner) or by (Owner, msgID).
+    The topics not given to any shard stay on the queues of queuesList itself, the main shard. The queues of a
+    shard know the other shards too, so the senders of a shard process (BusMetrics) reach the right queues.
+
+    Args:
+        queuesList (dictionary of multiprocessing.queues.Queue): Dictionary of queues where the key is the type of messages.
+        shards (dict): {name: list of Owner or (Owner, msgID)}.
+    """
+    queuesList["Shards"] = {}
+    queuesList["ShardOf"] = {}
+    for name, topics in shards.items():
+        queuesList["Shards"][name] = {
+            "Critical": Queue(),
+            "Warning": Queue(),
+            "General": Queue(),
+            "Config": Queue(),
+            "Shards": queuesList["Shards"],
+            "ShardOf": queuesList["ShardOf"],
+            "Main": queuesList,
+        }
+        for topic in topics:
+            queuesList["ShardOf"][topic] = name
+
+
+def shardQueues(queuesList, Owner, msgID):
+    """Returns the queues of the shard which dispatches a topic (queuesList itself for the main shard)."""
+    shardOf = queuesList.get("ShardOf")
+    if not shardOf:
+        return queuesList
+    name = shardOf.get((Owner, msgID), shardOf.get(Owner))
+    if name is None:
+        return queuesList.get("Main", queuesList)
+    return queuesList["Shards"][name]
+
+
+def messageQueues(queuesList, message):
+    """Returns the queues of the shard which dispatches a message enum."""
+    return shardQueues(queuesList, message.Owner.value, message.msgID.value)
+
+
+def allShards(queuesList):
+    """Returns the queues of every shard, the main one first (to tap or configure the whole bus)."""
+    main = queuesList.get("Main", queuesList)
+    return [main] + list(main.get("Shards", {}).values())
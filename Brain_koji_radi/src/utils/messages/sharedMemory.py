@@ -0,0 +1,75 @@
+import os
+import struct
+from multiprocessing import resource_tracker, shared_memory
+
+# The pid of the process that created a block, kept in its header (see Mailbox.HEADER and FrameBus.LAYOUT).
+OWNER = struct.Struct("<i")
+
+
+def createSharedMemory(name, size, ownerOffset):
+    """Creates a named shared memory block and writes the pid of this process at ownerOffset.\n
+    A block left behind by a crashed run is replaced. A block whose creator is still running belongs to another
+    publisher: it is not taken over, so that the two publishers do not silently overwrite each other.
+    Args:
+        name (string): The name of the block.
+        size (int): The size of the block, in bytes.
+        ownerOffset (int): The offset of the pid of the creator in the block.
+    Returns:
+        multiprocessing.shared_memory.SharedMemory: The new block. The creator is the one that has to unlink it.
+    Raises:
+        FileExistsError: If the block exists and its creator is still running.
+    """
+    try:
+        block = shared_memory.SharedMemory(name=name, create=True, size=size)
+    except FileExistsError:
+        stale = shared_memory.SharedMemory(name=name, create=False)
+        owner = OWNER.unpack_from(stale.buf, ownerOffset)[0] if stale.size >= ownerOffset + OWNER.size else 0
+        stale.close()
+        if isRunning(owner):
+            raise FileExistsError(f"Shared memory {name} is already used by the process {owner}") from None
+        stale.unlink()
+        block = shared_memory.SharedMemory(name=name, create=True, size=size)
+    OWNER.pack_into(block.buf, ownerOffset, os.getpid())
+    return block
+
+
+def isRunning(pid):
+    """Checks if a process is running. Without a pid (0) the block is from a crashed run that had not written it yet."""
+    if pid <= 0:
+        return False
+    if os.name == "nt":
+        # On Windows a block lives only as long as a process keeps it open, and os.kill would terminate the process.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def attachSharedMemory(name):
+    """Attaches to a named shared memory block created by another process.
+    Args:
+        name (string): The name of the block.
+    Returns:
+        multiprocessing.shared_memory.SharedMemory: The block, or None if it does not exist (yet).
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, create=False, track=False)
+    except TypeError:
+        # Python < 3.13 has no "track" argument.
+        pass
+    except FileNotFoundError:
+        return None
+    # The resource tracker would unlink the block when this process exits, even if it did not create it,
+    # so the block is opened without registering it.
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name, create=False)
+    except FileNotFoundError:
+        return None
+    finally:
+        resource_tracker.register = register
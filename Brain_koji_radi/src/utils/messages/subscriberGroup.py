@@ -0,0 +1,58 @@
+import time
+from multiprocessing.connection import wait
+
+
+class SubscriberGroup:
+    """Waits on several messageHandlerSubscriber objects at once, with a single select call.\n
+    Instead of polling every subscriber in turn (each receive() can block up to 1 ms), the thread sleeps until
+    any of the pipes becomes readable and then reads only the subscribers that have data.\n
+    Mailbox subscribers (see Mailbox) have no pipe to wait on: while the group holds one, the wait is split
+    into slices of mailboxPoll seconds and the mailboxes are checked after each slice (a polling cost, see
+    messageHandlerSubscriber.receiveWithBlock).
+
+    Args:
+        subscribers (list of messageHandlerSubscriber): The members of the group, in priority order.
+    """
+
+    # Longest sleep between two checks of the mailboxes, in seconds.
+    mailboxPoll = 0.001
+
+    def __init__(self, subscribers):
+        self.subscribers = list(subscribers)
+
+    def add(self, subscriber):
+        """Adds a subscriber at the end of the group (lowest priority)."""
+        self.subscribers.append(subscriber)
+
+    def remove(self, subscriber):
+        """Removes a subscriber from the group."""
+        self.subscribers.remove(subscriber)
+
+    def wait(self, timeout=None):
+        """Waits until at least one subscriber has data.
+        Args:
+            timeout (float, optional): The maximum wait in seconds, None to wait forever and 0 to only check. Defaults to None.
+        Returns:
+            list: The subscribers that have data, in the order of the group. Empty if the timeout expired.
+        """
+        if not any(subscriber.usesMailbox() for subscriber in self.subscribers):
+            return self._wait(timeout)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = self.mailboxPoll if deadline is None else min(self.mailboxPoll, deadline - time.monotonic())
+            ready = self._wait(max(remaining, 0))
+            if ready or (deadline is not None and time.monotonic() >= deadline):
+                return ready
+
+    def _wait(self, timeout):
+        """Waits on the pipes once and returns the subscribers that have data."""
+        if any(subscriber.hasPending() for subscriber in self.subscribers):
+            timeout = 0
+        readable = wait(self.subscribers, timeout)
+        if not readable:
+            return [subscriber for subscriber in self.subscribers if subscriber.hasPending()]
+        readable = set(readable)
+        return [
+            subscriber for subscriber in self.subscribers if subscriber in readable or subscriber.hasPending()
+        ]
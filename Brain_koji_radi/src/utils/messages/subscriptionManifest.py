@@ -0,0 +1,113 @@
+import os
+import socket
+from multiprocessing import reduction, resource_sharer
+from multiprocessing.connection import Connection
+
+from src.utils.messages.messageHandlerSubscriber import messageHandlerSubscriber
+from src.utils.messages.shards import messageQueues
+
+
+def _rebuildPipes(ident, count):
+    """Receives the file descriptors of a PipeBundle, in the process which unpickles it."""
+    with resource_sharer._resource_sharer.get_connection(ident) as conn:
+        with socket.fromfd(conn.fileno(), socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            fds = reduction.recvfds(sock, count)
+    return [Connection(fd, readable=False) for fd in fds]
+
+
+class PipeBundle:
+    """The sending ends of several pipes, pickled as one object.\n
+    A pipe put on a multiprocessing queue is passed by the resource sharer of the process, with one connection
+    and one authentication per pipe. A bundle passes all its pipes on a single connection, and is unpickled
+    as the list of the pipes.
+
+    Args:
+        pipes (list of multiprocessing.connection.Connection): The sending ends.
+    """
+
+    def __init__(self, pipes):
+        self.pipes = list(pipes)
+
+    def __reduce__(self):
+        fds = [os.dup(pipe.fileno()) for pipe in self.pipes]
+
+        def send(conn, pid):
+            with socket.fromfd(conn.fileno(), socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                reduction.sendfds(sock, fds)
+
+        def close():
+            for fd in fds:
+                os.close(fd)
+
+        return _rebuildPipes, (resource_sharer._resource_sharer.register(send, close), len(fds))
+
+
+class SubscriptionManifest:
+    """Declares all the subscriptions of a process (or thread) at once, and subscribes them with a single Config message.\n
+    The gateway applies the whole manifest before it dispatches the next message, so the process never sees a
+    state where only some of its topics are routed (with a sharded gateway, one message per shard). The pipes of the subscribers travel in one PipeBundle, and
+    the subscribers are named by the manifest, without the frame inspection of messageHandlerSubscriber.
+
+    Args:
+        queuesList (dict): Dictionary of queues where the key is the message type.
+        receiver (string): The name of the subscribers in the gateway.
+        subscriptions (dict, optional): {name: (message, deliveryMode)} of the subscribers to create. Defaults to None.
+
+    Example:
+        manifest = SubscriptionManifest(queuesList, "threadCamera", {
+            "record": (Record, "lastOnly"),
+            "brightness": (Brightness, "lastOnly"),
+        })
+        manifest.subscribe()
+        manifest["record"].receive()
+    """
+
+    def __init__(self, queuesList, receiver, subscriptions=None):
+        self.queuesList = queuesList
+        self.receiver = receiver
+        self.subscribers = {}
+        # The Config queue of the gateway shard of every subscriber
+        self.shards = {}
+        for name, (message, deliveryMode) in (subscriptions or {}).items():
+            self.add(name, message, deliveryMode)
+
+    def add(self, name, message, deliveryMode="fifo", window=None):
+        """Creates the subscriber of a message, subscribed with the others by subscribe().
+        Args:
+            window (int, optional): The window of the subscriber, see messageHandlerSubscriber. Defaults to None.
+        Returns:
+            messageHandlerSubscriber: The subscriber.
+        """
+        subscriber = messageHandlerSubscriber(self.queuesList, message, deliveryMode, receiver=self.receiver, window=window)
+        self.subscribers[name] = subscriber
+        self.shards[name] = messageQueues(self.queuesList, message)["Config"]
+        return subscriber
+
+    def __getitem__(self, name):
+        return self.subscribers[name]
+
+    def __iter__(self):
+        return iter(self.subscribers.values())
+
+    def bulks(self, action):
+        """Collects the subscriptions (action "subscribe") or unsubscriptions of the manifest, per gateway shard.
+        Returns:
+            list: (Config queue, list of subscriptions) of every shard with subscriptions.
+        """
+        bulks = {}
+        for name, subscriber in self.subscribers.items():
+            config = self.shards[name]
+            bulk = bulks.setdefault(id(config), (config, []))[1]
+            getattr(subscriber, action)(bulk)
+        return [(config, bulk) for config, bulk in bulks.values() if bulk]
+
+    def subscribe(self):
+        """Subscribes all the subscribers of the manifest with one bulk message."""
+        for config, bulk in self.bulks("subscribe"):
+            pipes = PipeBundle(subscription["To"].pop("pipe") for subscription in bulk)
+            config.put({"Subscribe/Unsubscribe": "subscribeBulk", "Subscriptions": bulk, "Pipes": pipes})
+
+    def unsubscribe(self):
+        """Unsubscribes all the subscribers of the manifest with one bulk message."""
+        for config, bulk in self.bulks("unsubscribe"):
+            config.put({"Subscribe/Unsubscribe": "unsubscribeBulk", "Subscriptions": bulk})
@@ -0,0 +1,93 @@
+if __name__ == "__main__":
+    import sys
+    sys.path.insert(0, "../../..")
+
+import os
+import time
+
+from src.templates.workerprocess import WorkerProcess
+from src.utils.recorder.threads.threadRecorder import threadRecorder
+
+
+class processRecorder(WorkerProcess):
+    """This process records the traffic of the gateway in a segmented binary log (see recordLog), to be replayed with replay.py.
+    Args:
+        queueList (dictionary of multiprocessing.queues.Queue): Dictionary of queues where the ID is the type of messages.
+        logging (logging object): Made for debugging.
+        directory (string, optional): The directory of the recordings, every run gets its own log inside it. Defaults to "recordings".
+        segmentSize (int, optional): The size of a segment of the log, in bytes. Defaults to 64 MB.
+        debugging (bool, optional): A flag for debugging. Defaults to False.
+    """
+
+    # ====================================== INIT ==========================================
+    def __init__(self, queueList, logging, directory="recordings", segmentSize=64 * 1024 * 1024, debugging=False):
+        self.queuesList = queueList
+        self.logging = logging
+        self.directory = os.path.join(directory, time.strftime("%Y%m%d-%H%M%S"))
+        self.segmentSize = segmentSize
+        self.debugging = debugging
+        super(processRecorder, self).__init__(self.queuesList)
+
+    # ===================================== STOP ==========================================
+    def stop(self):
+        """Function for stopping threads and the process."""
+
+        for thread in self.threads:
+            thread.stop()
+            thread.join()
+        super(processRecorder, self).stop()
+
+    # ===================================== RUN ==========================================
+    def run(self):
+        """Apply the initializing methods and start the threads."""
+
+        super(processRecorder, self).run()
+
+    # ===================================== INIT TH ======================================
+    def _init_threads(self):
+        """Create the thread and add to the list of threads."""
+
+        recorderTh = threadRecorder(self.queuesList, self.logging, self.directory, self.segmentSize, self.debugging)
+        self.threads.append(recorderTh)
+
+
+# =================================== EXAMPLE =========================================
+#             ++    THIS WILL RUN ONLY IF YOU RUN THE CODE Owner HERE  ++
+#                  in terminal:    python3 processRecorder.py
+
+if __name__ == "__main__":
+    from multiprocessing import Queue
+    import logging
+
+    from src.gateway.processGateway import processGateway
+    from src.utils.messages.allMessages import CurrentSpeed, SpeedMotor
+    from src.utils.messages.messageHandlerSender import messageHandlerSender
+    from src.utils.recorder.recordLog import RecordReader
+
+    queueList = {
+        "Critical": Queue(),
+        "Warning": Queue(),
+        "General": Queue(),
+        "Config": Queue(),
+    }
+    logger = logging.getLogger()
+
+    gateway = processGateway(queueList, logger)
+    gateway.start()
+    recorder = processRecorder(queueList, logger, directory="/tmp/recordings")
+    recorder.start()
+    time.sleep(1)
+
+    speedSender = messageHandlerSender(queueList, CurrentSpeed)
+    commandSender = messageHandlerSender(queueList, SpeedMotor)
+    for i in range(100):
+        speedSender.send(float(i))
+        commandSender.send(str(i))
+        time.sleep(0.01)
+    time.sleep(0.5)
+
+    recorder.stop()
+    gateway.stop()
+
+    frames = list(RecordReader(recorder.directory))
+    print(len(frames), "frames recorded in", recorder.directory)
@@ -0,0 +1,115 @@
+import glob
+import mmap
+import os
+import struct
+
+
+class RecordWriter:
+    """Appends frames to a segmented binary log.\n
+    A log is a directory of segments (segment_00000.bin, segment_00001.bin, ...). Every segment starts with
+    SEGMENT_HEADER and holds records: RECORD (the time the frame was recorded, from time.monotonic_ns(),
+    and its length) followed by the frame as encoded by messageCodec, so the value, the sequence number and
+    the send time are kept as they were on the bus. A new segment is started when the current one is full.
+
+    Args:
+        directory (string): The directory of the log, created if needed.
+        segmentSize (int, optional): The size of a segment, in bytes. Defaults to 64 MB.
+    """
+
+    MAGIC = b"BFMCLOG1"
+    # magic, segment number
+    SEGMENT_HEADER = struct.Struct("<8sI")
+    # recording time, frame length
+    RECORD = struct.Struct("<qI")
+
+    def __init__(self, directory, segmentSize=64 * 1024 * 1024):
+        self.directory = directory
+        self.segmentSize = segmentSize
+        self.segment = -1
+        self.written = 0
+        self.records = 0
+        self._file = None
+        os.makedirs(directory, exist_ok=True)
+        self.openSegment()
+
+    @staticmethod
+    def segmentPath(directory, segment):
+        """Returns the path of a segment of a log."""
+        return os.path.join(directory, "segment_%05d.bin" % segment)
+
+    def openSegment(self):
+        """Closes the current segment and starts the next one."""
+        if self._file is not None:
+            self._file.close()
+        self.segment += 1
+        self._file = open(self.segmentPath(self.directory, self.segment), "wb", buffering=1024 * 1024)
+        self._file.write(self.SEGMENT_HEADER.pack(self.MAGIC, self.segment))
+        self.written = self.SEGMENT_HEADER.size
+
+    def append(self, timestamp, frame):
+        """Appends a frame to the log.
+        Args:
+            timestamp (int): The time the frame was recorded, from time.monotonic_ns().
+            frame (bytes): The encoded frame.
+        """
+        size = self.RECORD.size + len(frame)
+        if self.written + size > self.segmentSize and self.written > self.SEGMENT_HEADER.size:
+            self.openSegment()
+        self._file.write(self.RECORD.pack(timestamp, len(frame)))
+        self._file.write(frame)
+        self.written += size
+        self.records += 1
+
+    def flush(self):
+        """Writes the buffered records to the disk."""
+        self._file.flush()
+
+    def close(self):
+        """Closes the log."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class RecordReader:
+    """Reads a log written by RecordWriter, segment by segment, through mmap.\n
+    Iterating gives (timestamp, frame) in recording order. The frames are memoryviews on the mapped segment,
+    valid until the iteration moves to the next segment: copy them (bytes(frame)) to keep them.
+    A record cut by a crash of the recorder at the end of a segment is skipped.
+
+    Args:
+        directory (string): The directory of the log.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.paths = sorted(glob.glob(os.path.join(directory, "segment_*.bin")))
+
+    def __iter__(self):
+        header = RecordWriter.SEGMENT_HEADER
+        record = RecordWriter.RECORD
+        for path in self.paths:
+            if os.path.getsize(path) <= header.size:
+                continue
+            with open(path, "rb") as file:
+                segment = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(segment)
+            try:
+                magic, _ = header.unpack_from(view, 0)
+                if magic != RecordWriter.MAGIC:
+                    raise ValueError(f"{path} is not a recorder segment")
+                offset = header.size
+                while offset + record.size <= len(view):
+                    timestamp, length = record.unpack_from(view, offset)
+                    offset += record.size
+                    if offset + length > len(view):
+                        break
+                    yield timestamp, view[offset:offset + length]
+                    offset += length
+            finally:
+                view.release()
+                try:
+                    segment.close()
+                except BufferError:
+                    # A frame given by the iteration is still alive, the mapping is released with it.
+                    pass
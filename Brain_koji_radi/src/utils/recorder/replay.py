@@ -0,0 +1,73 @@
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../.."))
+
+import time
+
+from src.utils.recorder.recordLog import RecordReader
+import src.utils.messages.messageCodec as messageCodec
+from src.utils.messages.shards import shardQueues
+
+
+def replay(directory, queuesList, speed=1.0, topics=None):
+    """Re-injects a log recorded by processRecorder into the queues of the gateway, as the senders would.\n
+    Every frame is put on the queue of its message with a new send time, so the latencies measured by the
+    subscribers (see busMetrics) are the ones of the replay, while the sequence numbers stay the recorded ones.
+    Args:
+        directory (string): The directory of the log.
+        queuesList (dictionary of multiprocessing.queues.Queue): Dictionary of queues where the key is the type of messages.
+        speed (float, optional): 1.0 replays in real time, 10.0 ten times faster, 0 as fast as possible. Defaults to 1.0.
+        topics (set, optional): The names of the messages to replay (see messageCodec.topicName), None for all. Defaults to None.
+    Returns:
+        dict: {"messages", "duration", "msgsPerSecond"} of the replay.
+    """
+    messages = 0
+    first = None
+    start = time.monotonic_ns()
+    for timestamp, frame in RecordReader(directory):
+        if topics is not None and messageCodec.topicName(frame) not in topics:
+            continue
+        if speed > 0:
+            if first is None:
+                first = timestamp
+            delay = start + (timestamp - first) / speed - time.monotonic_ns()
+            if delay > 0:
+                time.sleep(delay / 1e9)
+        queues = shardQueues(queuesList, *messageCodec.topicKey(frame))
+        queues[messageCodec.queueOf(frame)].put(messageCodec.restamp(frame, time.monotonic_ns()))
+        messages += 1
+    duration = (time.monotonic_ns() - start) / 1e9
+    return {
+        "messages": messages,
+        "duration": duration,
+        "msgsPerSecond": messages / duration if duration > 0 else 0.0,
+    }
+
+
+# =================================== EXAMPLE =========================================
+#             ++    THIS WILL RUN ONLY IF YOU RUN THE CODE Owner HERE  ++
+#                  in terminal:    python3 replay.py <log directory> [speed]
+#   speed: 1 (real time, default), 10 (ten times faster), 0 (as fast as possible)
+
+if __name__ == "__main__":
+    from multiprocessing import Queue
+    import logging
+
+    from src.gateway.processGateway import processGateway
+
+    queueList = {
+        "Critical": Queue(),
+        "Warning": Queue(),
+        "General": Queue(),
+        "Config": Queue(),
+    }
+    gateway = processGateway(queueList, logging.getLogger())
+    gateway.start()
+    time.sleep(0.5)
+
+    speed = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    result = replay(sys.argv[1], queueList, speed)
+    print(f"{result['messages']} messages in {result['duration']:.2f} s ({result['msgsPerSecond']:.0f} msgs/s)")
+
+    gateway.stop()
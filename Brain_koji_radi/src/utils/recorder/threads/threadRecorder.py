@@ -0,0 +1,87 @@
+import time
+from multiprocessing import Pipe
+from multiprocessing.connection import wait
+
+from src.templates.threadwithstop import ThreadWithStop
+from src.utils.recorder.recordLog import RecordWriter
+import src.utils.messages.messageCodec as messageCodec
+from src.utils.messages.shards import allShards
+
+
+class threadRecorder(ThreadWithStop):
+    """Thread which taps the gateway and appends every frame it forwards to a RecordWriter log.\n
+    The gateway writes a copy of every frame taken from its queues on the tap pipe, and the publishers of direct
+    topics write theirs on a second pipe (see threadGateway.tap), so the log holds the whole traffic of the bus.
+    The second pipe is non-blocking: if the recorder falls behind, the publishers drop their frames for it (counted
+    in their dropped counter) instead of waiting for it.
+    Every shard of the gateway (see shards.createShards) gets its own pair of pipes.
+
+    Args:
+        queueList (dictionary of multiprocessing.queues.Queue): Dictionary of queues where the ID is the type of messages.
+        logger (logging object): Made for debugging.
+        directory (string): The directory of the log.
+        segmentSize (int): The size of a segment of the log, in bytes.
+        debugging (bool, optional): A flag for debugging. Defaults to False.
+    """
+
+    # ====================================== INIT ==========================================
+    def __init__(self, queueList, logger, directory, segmentSize, debugging=False):
+        super(threadRecorder, self).__init__()
+        self.queueList = queueList
+        self.logger = logger
+        self.debugging = debugging
+        self.writer = RecordWriter(directory, segmentSize)
+        self.shards = allShards(queueList)
+        # (tap pipe, direct pipe) of every shard, the receiving and the sending ends
+        self.receivers = []
+        self.senders = []
+        for _ in self.shards:
+            tapRecv, tapSend = Pipe(duplex=False)
+            directRecv, directSend = Pipe(duplex=False)
+            self.receivers += [tapRecv, directRecv]
+            self.senders.append((tapSend, directSend))
+        self.tap()
+
+    def tap(self):
+        """Asks the gateway to copy the traffic on the pipes of the recorder."""
+        for queues, (tapSend, directSend) in zip(self.shards, self.senders):
+            queues["Config"].put(
+                {
+                    "Subscribe/Unsubscribe": "tap",
+                    "To": {"receiver": "threadRecorder", "pipe": tapSend, "directPipe": directSend},
+                }
+            )
+
+    def untap(self):
+        """Asks the gateway to stop copying the traffic."""
+        for queues in self.shards:
+            queues["Config"].put({"Subscribe/Unsubscribe": "untap", "To": {"receiver": "threadRecorder"}})
+
+    # ======================================= RUN ==========================================
+    def run(self):
+        """Writes the frames received on the tap pipes, with the time they were received."""
+        lastFlush = time.monotonic()
+        while self._running:
+            for pipe in wait(self.receivers, 0.1):
+                while pipe.poll():
+                    frame = pipe.recv_bytes()
+                    now = time.monotonic_ns()
+                    if messageCodec.isBatch(frame):
+                        for part in messageCodec.splitBatch(frame):
+                            self.writer.append(now, part)
+                    else:
+                        self.writer.append(now, frame)
+            if time.monotonic() - lastFlush >= 1.0:
+                self.writer.flush()
+                lastFlush = time.monotonic()
+                if self.debugging:
+                    self.logger.info(f"Recorded {self.writer.records} frames")
+        self.writer.close()
+
+    # ====================================== STOP ==========================================
+    def stop(self):
+        """Stops the recording and waits for run() to close the log."""
+        self.untap()
+        super(threadRecorder, self).stop()
+        if self.is_alive():
+            self.join(1)
@@ -0,0 +1,15 @@
+"""
+tests/brainPath.py
+
+Dodaje Brain_koji_radi i Brain (koji ga nadogradjuje, pa ima prednost) u sys.path,
+da bi testovi mogli da uvezu paket src kao sto ga uvozi main.py.
+"""
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+for folder in ("Brain_koji_radi", "Brain"):
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
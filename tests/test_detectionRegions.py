@@ -0,0 +1,91 @@
+import unittest
+
+import brainPath  # noqa: F401
+from src.hardware.camera.detectionRegions import DetectionRegions
+
+# Glavni kanal kamere
+SHAPE = (1080, 2048, 3)
+HEIGHT, WIDTH = SHAPE[:2]
+SIGNS = (0.66, 0.0, 1.0, 0.5)
+
+
+def track(x1, y1, x2, y2, trackId=1):
+    return (trackId, x1, y1, x2, y2, 0.9, 0)
+
+
+class TestDetectionRegions(unittest.TestCase):
+    def assertInFrame(self, regions):
+        for x1, y1, x2, y2 in regions:
+            self.assertTrue(0 <= x1 < x2 <= WIDTH and 0 <= y1 < y2 <= HEIGHT, (x1, y1, x2, y2))
+
+    def test_fixed_regions_are_scaled_to_the_frame(self):
+        regions = DetectionRegions([SIGNS], 4, fullEvery=0)
+        self.assertEqual(regions.plan(SHAPE), [(1352, 0, 2048, 540)])
+
+    def test_track_outside_of_the_fixed_regions_gets_its_own_region(self):
+        regions = DetectionRegions([SIGNS], 4, fullEvery=0)
+        plan = regions.plan(SHAPE, [track(200, 600, 300, 700)])
+        self.assertEqual(len(plan), 2)
+        self.assertInFrame(plan)
+        x1, y1, x2, y2 = plan[1]
+        self.assertTrue(x1 <= 200 and y1 <= 600 and 300 <= x2 and 700 <= y2)
+        self.assertGreaterEqual(x2 - x1, regions.minSize)
+        # Traka cela u fiksnom regionu ne dobija svoj region
+        self.assertEqual(len(regions.plan(SHAPE, [track(1500, 100, 1600, 200)])), 1)
+
+    def test_tracks_extrapolated_off_the_frame_are_clipped(self):
+        regions = DetectionRegions([SIGNS], 4, fullEvery=0)
+        tracks = [
+            track(-400, 500, -300, 600, 1),
+            track(2200, 700, 2300, 800, 2),
+            track(800, -500, 900, -400, 3),
+            track(800, 1200, 900, 1300, 4),
+            track(-300, -300, -200, -200, 5),
+        ]
+        plan = regions.plan(SHAPE, tracks)
+        self.assertEqual(len(plan), 4)
+        self.assertInFrame(plan)
+
+    def test_each_off_frame_track_keeps_a_region_at_the_edge(self):
+        regions = DetectionRegions([], 4, fullEvery=0)
+        plan = regions.plan(SHAPE, [track(-400, 500, -300, 600), track(2200, 700, 2300, 800)])
+        self.assertEqual(len(plan), 2)
+        self.assertInFrame(plan)
+        self.assertEqual(plan[0][0], 0)
+        self.assertEqual(plan[1][2], WIDTH)
+
+    def test_degenerate_fixed_region_is_dropped(self):
+        regions = DetectionRegions([SIGNS, (0.5, 0.2, 0.5, 0.4), (0.1, 0.3, 0.2, 0.3)], 4, fullEvery=0)
+        self.assertEqual(regions.plan(SHAPE), [(1352, 0, 2048, 540)])
+        # Prazni regioni ne zauzimaju ni mesta za trake
+        plan = regions.plan(SHAPE, [track(100, 600, 200, 700, 1), track(700, 600, 800, 700, 2),
+                                    track(1300, 900, 1400, 1000, 3)])
+        self.assertEqual(len(plan), 4)
+        self.assertInFrame(plan)
+
+    def test_more_tracks_than_free_slots_share_the_last_region(self):
+        regions = DetectionRegions([SIGNS], 3, fullEvery=0)
+        tracks = [track(100 + 300 * i, 700, 150 + 300 * i, 750, i) for i in range(4)]
+        plan = regions.plan(SHAPE, tracks)
+        self.assertEqual(len(plan), 3)
+        self.assertInFrame(plan)
+        x1, _, x2, _ = plan[2]
+        # Poslednji region pokriva trake 1, 2 i 3
+        self.assertTrue(x1 <= 400 and 1050 <= x2)
+
+    def test_every_full_plan_covers_the_whole_frame(self):
+        regions = DetectionRegions([SIGNS, (0.0, 0.0, 0.3, 0.5)], 2, fullEvery=3)
+        plans = [regions.plan(SHAPE, [track(800, 600, 900, 700)]) for _ in range(6)]
+        for index in (0, 3):
+            self.assertEqual(plans[index], [(1352, 0, 2048, 540), (0, 0, WIDTH, HEIGHT)])
+        for index in (1, 2, 4, 5):
+            self.assertNotIn((0, 0, WIDTH, HEIGHT), plans[index])
+            self.assertInFrame(plans[index])
+
+    def test_too_many_fixed_regions(self):
+        with self.assertRaises(ValueError):
+            DetectionRegions([SIGNS, SIGNS, SIGNS], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import logging
+import math
+import unittest
+
+import cv2
+import numpy as np
+
+import brainPath  # noqa: F401
+from src.hardware.camera.laneDetection import HoughTransformation, LaneModel, LORES_SIZE
+
+WIDTH, HEIGHT = LORES_SIZE
+CENTER_X = (WIDTH - 1) / 2.0
+# Vrh linija je malo ispod gornje ivice ROI-ja (2/3 visine)
+TOP_Y = 175
+
+
+def laneImage(shift=0, lean=0, sides=(-1, 1)):
+    """Y ravan sa belim linijama trake na tamnom putu.
+
+    shift pomera traku u pikselima (negativno: traka levo, vozilo desno od centra),
+    lean pomera vrh obe linije (pozitivno: traka skrece desno).
+    """
+    luma = np.full((HEIGHT, WIDTH), 40, np.uint8)
+    center = CENTER_X + shift
+    for side in sides:
+        bottom = (int(center + side * 150), HEIGHT - 1)
+        top = (int(center + side * 70 + lean), TOP_Y)
+        cv2.line(luma, bottom, top, 255, 5)
+    return luma
+
+
+class TestLaneModel(unittest.TestCase):
+    def setUp(self):
+        self.hough = HoughTransformation(logging.getLogger("test"))
+        self.model = LaneModel(LORES_SIZE)
+
+    def measure(self, luma):
+        lines, output = self.hough.process_frame(luma, annotate=False)
+        self.assertIsNone(output)
+        self.assertIsNotNone(lines)
+        return self.model.update(lines)
+
+    def expectedOffset(self, shift):
+        return -shift * self.model.lane_width_mm / self.model.lane_width_px
+
+    def test_centered_lane_has_no_offset_and_no_heading(self):
+        offset_mm, heading = self.measure(laneImage())
+        self.assertLessEqual(abs(offset_mm), 3)
+        self.assertLess(abs(heading), 2.0)
+        # Sirina trake na dnu je 300 px, procena se pomera ka njoj
+        self.assertAlmostEqual(self.model.lane_width_px, 0.8 * 0.6 * WIDTH + 0.2 * 300, delta=3)
+
+    def test_offset_is_positive_when_the_car_is_right_of_center(self):
+        offset_mm, heading = self.measure(laneImage(shift=-40))
+        self.assertGreater(offset_mm, 0)
+        self.assertAlmostEqual(offset_mm, self.expectedOffset(-40), delta=4)
+        self.assertLess(abs(heading), 2.0)
+
+    def test_offset_is_negative_when_the_car_is_left_of_center(self):
+        offset_mm, _ = self.measure(laneImage(shift=40))
+        self.assertLess(offset_mm, 0)
+        self.assertAlmostEqual(offset_mm, self.expectedOffset(40), delta=4)
+
+    def test_heading_follows_the_turn_of_the_lane(self):
+        expected = math.degrees(math.atan(30 / (HEIGHT - 1 - TOP_Y)))
+        _, right = self.measure(laneImage(lean=30))
+        _, left = self.measure(laneImage(lean=-30))
+        self.assertAlmostEqual(right, expected, delta=2.0)
+        self.assertAlmostEqual(left, -expected, delta=2.0)
+
+    def test_single_line_assumes_the_last_lane_width(self):
+        # Prvo obe linije, da bi sirina trake bila izmerena
+        self.measure(laneImage())
+        width_px = self.model.lane_width_px
+        offset_mm, _ = self.measure(laneImage(shift=-20, sides=(-1,)))
+        self.assertIsNone(self.model.right_fit)
+        self.assertEqual(self.model.lane_width_px, width_px)
+        self.assertAlmostEqual(offset_mm, self.expectedOffset(-20), delta=6)
+
+    def test_no_lane_lines(self):
+        self.assertIsNone(self.model.update(None))
+        # Horizontalna duz nije linija trake
+        self.assertIsNone(self.model.update(np.array([[100, 250, 400, 252]], np.int32)))
+        self.assertIsNone(self.model.center_fit)
+        lines, _ = self.hough.process_frame(np.full((HEIGHT, WIDTH), 40, np.uint8), annotate=False)
+        self.assertIsNone(lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
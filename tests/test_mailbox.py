@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+import unittest
+
+import brainPath  # noqa: F401
+from src.utils.messages.mailbox import Mailbox
+
+
+def frameOf(index):
+    # Ceo frame je isti bajt, a duzina zavisi od njega: pokidan frame se odmah vidi
+    value = index % 256
+    return bytes([value]) * (100 + value * 8)
+
+
+def writeFrames(name, count, ready):
+    mailbox = Mailbox(name, create=True)
+    ready.set()
+    for index in range(count):
+        mailbox.write(frameOf(index))
+    mailbox.close()
+
+
+def tryToPublish(name, result):
+    try:
+        Mailbox(name, create=True).close()
+        result.put("created")
+    except FileExistsError:
+        result.put("refused")
+
+
+class TestMailbox(unittest.TestCase):
+    def setUp(self):
+        self.name = f"test_{os.getpid()}_{self._testMethodName}"
+        self.mailboxes = []
+
+    def tearDown(self):
+        for mailbox in self.mailboxes:
+            mailbox.close()
+
+    def open(self, create=False):
+        mailbox = Mailbox(self.name, create=create)
+        self.mailboxes.append(mailbox)
+        return mailbox
+
+    def test_read_returns_newest(self):
+        publisher = self.open(create=True)
+        subscriber = self.open()
+        self.assertIsNone(subscriber.read())
+        publisher.write(b"first")
+        publisher.write(b"second")
+        sequence, frame = subscriber.read()
+        self.assertEqual(frame, b"second")
+        self.assertEqual(sequence, subscriber.sequence())
+
+    def test_frame_larger_than_capacity(self):
+        publisher = self.open(create=True)
+        with self.assertRaises(ValueError):
+            publisher.write(b"x" * (publisher.capacity + 1))
+
+    def test_read_during_concurrent_write(self):
+        ready = multiprocessing.Event()
+        writer = multiprocessing.Process(target=writeFrames, args=(self.name, 200000, ready))
+        writer.start()
+        self.assertTrue(ready.wait(10))
+        subscriber = self.open()
+        reads = 0
+        while writer.is_alive():
+            newest = subscriber.read()
+            if newest is None:
+                continue
+            sequence, frame = newest
+            reads += 1
+            self.assertEqual(sequence % 2, 0)
+            self.assertEqual(frame, frameOf(frame[0]))
+        writer.join()
+        self.assertGreater(reads, 0)
+
+    def test_second_publisher_is_refused(self):
+        self.open(create=True)
+        result = multiprocessing.Queue()
+        other = multiprocessing.Process(target=tryToPublish, args=(self.name, result))
+        other.start()
+        other.join()
+        self.assertEqual(result.get(timeout=5), "refused")
+
+    def test_block_of_a_dead_publisher_is_replaced(self):
+        dead = multiprocessing.Process(target=int)
+        dead.start()
+        dead.join()
+        # Publisher koji je pao: blok ostaje u sistemu sa pid-om procesa koji vise ne radi
+        crashed = Mailbox(self.name, create=True)
+        crashed.HEADER.pack_into(crashed._shm.buf, 0, 0, 0, crashed.capacity, dead.pid)
+        crashed._shm.close()
+        publisher = self.open(create=True)
+        publisher.write(b"value")
+        self.assertEqual(self.open().read()[1], b"value")
+
+    def test_subscriber_follows_restarted_publisher(self):
+        publisher = Mailbox(self.name, create=True)
+        subscriber = self.open()
+        subscriber.OWNER_CHECK = 0
+        publisher.write(b"old")
+        self.assertEqual(subscriber.read()[1], b"old")
+        self.assertEqual(subscriber.generation, 1)
+        publisher.close()
+        restarted = self.open(create=True)
+        restarted.write(b"new")
+        newest = subscriber.read() or subscriber.read()
+        self.assertEqual(newest[1], b"new")
+        self.assertEqual(subscriber.generation, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
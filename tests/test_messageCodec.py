@@ -0,0 +1,97 @@
+import unittest
+
+import numpy as np
+
+import brainPath  # noqa: F401
+import src.utils.messages.messageCodec as messageCodec
+from src.utils.messages.allMessages import BatteryLvl, Cars, Detections, InstantConsumption, Recording, SpeedMotor
+from src.utils.messages.detections import DetectionFrame
+
+
+class TestTopicFrames(unittest.TestCase):
+    def roundTrip(self, message, value):
+        frame = messageCodec.encode(message, value, seq=7, timestamp=123456789, sender=42)
+        decoded = messageCodec.decode(frame)
+        self.assertEqual(decoded["Owner"], message.Owner.value)
+        self.assertEqual(decoded["id"], message.msgID.value)
+        self.assertEqual(decoded["Type"], message.msgType.value)
+        return frame, decoded["value"]
+
+    def test_schemas(self):
+        for message, value in ((SpeedMotor, "12.5"), (InstantConsumption, 1.25), (BatteryLvl, -3), (Recording, True)):
+            frame, decoded = self.roundTrip(message, value)
+            self.assertEqual(decoded, value)
+            self.assertIs(type(decoded), type(value))
+            self.assertEqual(messageCodec.HEADER.unpack_from(frame)[1], messageCodec.SCHEMA)
+        # float64 je 8 bajtova iza zaglavlja, bez pickle-a
+        frame, _ = self.roundTrip(InstantConsumption, 1.25)
+        self.assertEqual(len(frame), messageCodec.HEADER.size + 8)
+
+    def test_value_outside_schema_falls_back_to_pickle(self):
+        frame, decoded = self.roundTrip(InstantConsumption, 3)
+        self.assertEqual(messageCodec.HEADER.unpack_from(frame)[1], messageCodec.PICKLE)
+        self.assertEqual(decoded, 3)
+        self.assertIs(type(decoded), int)
+
+    def test_pickle_schema(self):
+        _, decoded = self.roundTrip(Cars, {"car": 1, "position": (0.5, 2.0)})
+        self.assertEqual(decoded, {"car": 1, "position": (0.5, 2.0)})
+
+    def test_detections(self):
+        tracks = [(1, 10.0, 20.0, 110.0, 220.0, 0.9, 3), (2, 500.0, 40.0, 600.0, 90.0, 0.5, 7)]
+        value = DetectionFrame.fromTracks(1234, 1700000000.5, tracks)
+        _, decoded = self.roundTrip(Detections, value)
+        self.assertEqual((decoded.frame, decoded.timestamp), (1234, 1700000000.5))
+        self.assertTrue(np.array_equal(decoded.detections, value.detections))
+        self.assertEqual(decoded.detections["track"].tolist(), [1, 2])
+
+    def test_header_fields(self):
+        frame = messageCodec.encode(BatteryLvl, 80, seq=7, timestamp=123456789, sender=42)
+        self.assertEqual(messageCodec.stamp(frame), (7, 123456789))
+        self.assertEqual(messageCodec.origin(frame), (42, 7))
+        self.assertEqual(messageCodec.topicKey(frame), (BatteryLvl.Owner.value, BatteryLvl.msgID.value))
+        self.assertEqual(messageCodec.topicName(frame), "BatteryLvl")
+        self.assertEqual(messageCodec.queueOf(frame), BatteryLvl.Queue.value)
+        self.assertEqual(messageCodec.policyOf(frame), "conflate")
+
+    def test_sequence_wraps_at_32_bits(self):
+        frame = messageCodec.encode(BatteryLvl, 1, seq=2 ** 32 + 5)
+        self.assertEqual(messageCodec.stamp(frame)[0], 5)
+
+    def test_undeclared_message(self):
+        frame = messageCodec.encodeEnvelope("nobody", 99, "dict", {"a": 1}, seq=3, timestamp=5, sender=9)
+        self.assertEqual(messageCodec.HEADER.unpack_from(frame)[0], messageCodec.GENERIC)
+        self.assertEqual(messageCodec.decode(frame), {"Type": "dict", "value": {"a": 1}, "id": 99, "Owner": "nobody"})
+        self.assertEqual(messageCodec.topicKey(frame), ("nobody", 99))
+        self.assertEqual(messageCodec.topicName(frame), "nobody/99")
+        self.assertEqual(messageCodec.queueOf(frame), "General")
+        self.assertEqual(messageCodec.policyOf(frame), "deliver")
+        self.assertEqual(messageCodec.origin(frame), (9, 3))
+
+    def test_restamp_keeps_sender_sequence_and_value(self):
+        frame = messageCodec.encode(SpeedMotor, "20", seq=11, timestamp=100, sender=77)
+        replayed = messageCodec.restamp(frame, 999)
+        self.assertEqual(messageCodec.stamp(replayed), (11, 999))
+        self.assertEqual(messageCodec.origin(replayed), (77, 11))
+        self.assertEqual(messageCodec.decode(replayed)["value"], "20")
+
+
+class TestBatches(unittest.TestCase):
+    def test_split_returns_the_frames_in_order(self):
+        frames = [messageCodec.encode(BatteryLvl, value, seq=value) for value in range(1, 4)]
+        frames.append(messageCodec.encode(SpeedMotor, "x" * 1000))
+        batch = messageCodec.encodeBatch(frames)
+        self.assertTrue(messageCodec.isBatch(batch))
+        self.assertFalse(messageCodec.isBatch(frames[0]))
+        split = messageCodec.splitBatch(batch)
+        self.assertEqual([bytes(frame) for frame in split], frames)
+        self.assertEqual([messageCodec.decode(frame)["value"] for frame in split], [1, 2, 3, "x" * 1000])
+
+    def test_empty_batch(self):
+        batch = messageCodec.encodeBatch([])
+        self.assertTrue(messageCodec.isBatch(batch))
+        self.assertEqual(messageCodec.splitBatch(batch), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import queue
+import time
+import unittest
+
+import brainPath  # noqa: F401
+import src.utils.messages.messageCodec as messageCodec
+import src.utils.messages.messageHandlerSender as messageHandlerSenderModule
+from src.utils.messages.allMessages import BatteryLvl, Cars
+from src.utils.messages.messageHandlerSender import messageHandlerSender
+
+
+class TestConflatePolicy(unittest.TestCase):
+    def setUp(self):
+        self.queuesList = {name: queue.Queue() for name in ("Critical", "Warning", "General", "Config")}
+        self.general = self.queuesList["General"]
+
+    def values(self, message):
+        # Vrednosti jedne poruke koje su stigle u red, redom
+        frames = []
+        while not self.general.empty():
+            frames.append(self.general.get())
+        index = messageCodec.codecFor(message).index
+        return [messageCodec.decode(frame)["value"] for frame in frames if messageCodec.HEADER.unpack_from(frame)[0] == index]
+
+    def test_free_queue_sends_at_once(self):
+        sender = messageHandlerSender(self.queuesList, BatteryLvl)
+        sender.send(1)
+        self.assertIsNone(sender.pending)
+        self.assertEqual(self.values(BatteryLvl), [1])
+
+    def test_last_value_arrives_while_queue_is_busy(self):
+        battery = messageHandlerSender(self.queuesList, BatteryLvl)
+        other = messageHandlerSender(self.queuesList, Cars)
+        # Druga poruka drzi red zauzetim: niko ga ne prazni
+        other.send({"car": 1})
+        for value in range(1, 101):
+            battery.send(value)
+        self.assertIsNotNone(battery.pending)
+
+        start = time.monotonic()
+        while battery.pending is not None and time.monotonic() - start < 2:
+            time.sleep(0.01)
+        self.assertIsNone(battery.pending)
+        self.assertEqual(self.values(BatteryLvl), [100])
+        self.assertEqual(battery.counters()["conflated"], 99)
+
+    def test_value_waits_at_most_the_bound(self):
+        battery = messageHandlerSender(self.queuesList, BatteryLvl)
+        self.general.put(b"busy")
+        battery.send(7)
+        start = time.monotonic()
+        while battery.pending is not None and time.monotonic() - start < 2:
+            time.sleep(0.001)
+        waited = time.monotonic() - start
+        self.assertGreaterEqual(waited, messageHandlerSenderModule.CONFLATE_MAX_WAIT * 0.5)
+        self.assertLess(waited, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
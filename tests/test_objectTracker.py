@@ -0,0 +1,132 @@
+import unittest
+
+import brainPath  # noqa: F401
+from src.hardware.camera.objectTracker import DetectionSchedule, ObjectTracker
+
+# 16 fps kamere
+FRAME = 1 / 16
+
+
+def box(cx, cy, size=40, conf=0.9, cls=0):
+    return (cx - size / 2, cy - size / 2, cx + size / 2, cy + size / 2, conf, cls)
+
+
+def center(track):
+    _, x1, y1, x2, y2, _, _ = track
+    return (x1 + x2) / 2, (y1 + y2) / 2
+
+
+class TestObjectTracker(unittest.TestCase):
+    def setUp(self):
+        self.tracker = ObjectTracker()
+
+    def follow(self, velocity, frames):
+        """Objekat koji se krece konstantnom brzinom (px/s) udesno, sa detekcijom na svakom frejmu."""
+        for frame in range(frames):
+            timestamp = frame * FRAME
+            self.tracker.update([box(100 + velocity * timestamp, 200)], timestamp)
+        return (frames - 1) * FRAME
+
+    def test_moving_object_keeps_its_id(self):
+        ids = set()
+        for frame in range(10):
+            tracks = self.tracker.update([box(100 + 5 * frame, 200)], frame * FRAME)
+            self.assertEqual(len(tracks), 1)
+            ids.add(tracks[0][0])
+        self.assertEqual(ids, {1})
+        self.assertEqual((self.tracker.matched, self.tracker.created, self.tracker.lost), (1, 0, 0))
+
+    def test_objects_are_matched_by_class_and_overlap(self):
+        first = self.tracker.update([box(100, 200, cls=0), box(400, 200, cls=1)], 0.0)
+        self.assertEqual(sorted(track[0] for track in first), [1, 2])
+        # Ista pozicija, druga klasa: nova traka, a stara klase 0 se ne uparuje sa njom
+        tracks = self.tracker.update([box(102, 200, cls=1), box(402, 200, cls=1)], FRAME)
+        byId = {track[0]: track for track in tracks}
+        self.assertEqual(self.tracker.matched, 1)
+        self.assertEqual(self.tracker.created, 1)
+        self.assertEqual(byId[2][6], 1)
+        self.assertAlmostEqual(center(byId[2])[0], 402, delta=1)
+        self.assertIn(3, byId)
+
+    def test_fast_object_without_overlap_is_matched_by_center(self):
+        # Box od 40 px, pomeraj 50 px do sledece detekcije (najveci razmak rasporeda): IoU je nula
+        self.tracker.update([box(100, 200)], 0.0)
+        tracks = self.tracker.update([box(150, 200)], 4 * FRAME)
+        self.assertEqual([track[0] for track in tracks], [1])
+        self.assertEqual(self.tracker.created, 0)
+
+    def test_far_detection_starts_a_new_track(self):
+        self.tracker.update([box(100, 200)], 0.0)
+        tracks = self.tracker.update([box(400, 200)], FRAME)
+        self.assertEqual(sorted(track[0] for track in tracks), [1, 2])
+        self.assertEqual(self.tracker.created, 1)
+
+    def test_tracks_between_detections_are_extrapolated(self):
+        velocity = 80.0
+        last = self.follow(velocity, 8)
+        # Filter je naucio brzinu: frejmovi bez detekcije dobijaju pomerene boxove
+        for frames in (1, 2, 4):
+            timestamp = last + frames * FRAME
+            tracks = self.tracker.tracks(timestamp)
+            self.assertEqual(len(tracks), 1)
+            self.assertAlmostEqual(center(tracks[0])[0], 100 + velocity * timestamp, delta=2)
+            self.assertAlmostEqual(center(tracks[0])[1], 200, delta=1)
+        # tracks ne menja filter
+        self.assertAlmostEqual(center(self.tracker.tracks(last)[0])[0], 100 + velocity * last, delta=2)
+
+    def test_track_coasts_through_missed_detections(self):
+        velocity = 80.0
+        last = self.follow(velocity, 8)
+        # Detektor ne vidi objekat nekoliko frejmova (manje od maxAge)
+        for frame in range(1, 5):
+            tracks = self.tracker.update([], last + frame * FRAME)
+            self.assertEqual([track[0] for track in tracks], [1])
+            self.assertEqual(self.tracker.lost, 0)
+        timestamp = last + 5 * FRAME
+        tracks = self.tracker.update([box(100 + velocity * timestamp, 200)], timestamp)
+        self.assertEqual([track[0] for track in tracks], [1])
+        self.assertEqual(self.tracker.created, 0)
+
+    def test_track_is_dropped_after_max_age(self):
+        last = self.follow(80.0, 4)
+        self.assertEqual(len(self.tracker.tracks(last + self.tracker.maxAge)), 1)
+        # Ekstrapolacija vise ne prikazuje traku, a prvi update je brise
+        self.assertEqual(self.tracker.tracks(last + self.tracker.maxAge + FRAME), [])
+        self.assertEqual(self.tracker.update([], last + self.tracker.maxAge + FRAME), [])
+        self.assertEqual(self.tracker.lost, 1)
+        self.assertEqual(len(self.tracker.ids), 0)
+        # Objekat koji se ponovo pojavi dobija novi id
+        tracks = self.tracker.update([box(200, 200)], last + 1.0)
+        self.assertEqual([track[0] for track in tracks], [2])
+
+    def test_min_hits_hides_new_tracks(self):
+        tracker = ObjectTracker(minHits=2)
+        self.assertEqual(tracker.update([box(100, 200)], 0.0), [])
+        self.assertEqual([track[0] for track in tracker.update([box(102, 200)], FRAME)], [1])
+
+
+class TestDetectionSchedule(unittest.TestCase):
+    def test_interval_grows_while_the_scene_is_stable(self):
+        tracker = ObjectTracker()
+        schedule = DetectionSchedule(maxInterval=3)
+        frames = []
+        for frameId in range(12):
+            if schedule.due(frameId):
+                frames.append(frameId)
+                tracker.update([box(100 + frameId, 200)], frameId * FRAME)
+                schedule.record(frameId, tracker)
+        # Posle nove trake razmak je 1, pa raste do maxInterval
+        self.assertEqual(frames, [0, 1, 3, 6, 9])
+
+    def test_fixed_interval(self):
+        schedule = DetectionSchedule(maxInterval=4, adaptive=False)
+        frames = []
+        for frameId in range(10):
+            if schedule.due(frameId):
+                frames.append(frameId)
+                schedule.record(frameId, None)
+        self.assertEqual(frames, [0, 4, 8])
+
+
+if __name__ == "__main__":
+    unittest.main()
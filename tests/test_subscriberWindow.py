@@ -0,0 +1,123 @@
+import threading
+import unittest
+from multiprocessing import Pipe
+
+import brainPath  # noqa: F401
+import src.utils.messages.messageCodec as messageCodec
+from src.gateway.subscriberWindow import subscriberWindow
+from src.utils.messages.allMessages import BatteryLvl, SpeedMotor
+
+
+def frameOf(message, value):
+    return messageCodec.encode(message, value)
+
+
+class TestSubscriberWindow(unittest.TestCase):
+    def setUp(self):
+        self.reader, self.writer = Pipe(duplex=False)
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.close()
+
+    def window(self, **options):
+        return subscriberWindow(self.writer, "test/topic", **options)
+
+    def readAll(self):
+        frames = []
+        while self.reader.poll():
+            frames.append(self.reader.recv_bytes())
+        return [messageCodec.decode(frame)["value"] for frame in frames]
+
+    def fillCredit(self, window, message, value):
+        # Prvi frame pretplatnik ne cita: drugi vise nema kredita u prozoru
+        self.assertFalse(window.send(frameOf(message, value)))
+        self.assertEqual(window.credit, window.window - len(frameOf(message, value)) - window.LENGTH.size)
+
+    def test_deliver_keeps_the_frames_without_credit_in_order(self):
+        frame = frameOf(SpeedMotor, "0")
+        window = self.window(window=len(frame) + 4)
+        self.fillCredit(window, SpeedMotor, "0")
+        for value in ("1", "2", "3"):
+            self.assertTrue(window.send(frameOf(SpeedMotor, value), "deliver"))
+        self.assertEqual(window.buffered, 3)
+        self.assertEqual(self.readAll(), ["0"])
+        received = []
+        while window.flush():
+            received += self.readAll()
+        received += self.readAll()
+        self.assertEqual(received, ["1", "2", "3"])
+        self.assertEqual(window.sent, 4)
+
+    def test_backlog_drops_the_oldest_frames(self):
+        frame = frameOf(SpeedMotor, "0")
+        window = self.window(window=len(frame) + 4, maxBacklog=2)
+        self.fillCredit(window, SpeedMotor, "0")
+        for value in ("1", "2", "3"):
+            window.send(frameOf(SpeedMotor, value), "deliver")
+        self.assertEqual(window.dropped, 1)
+        self.assertEqual([frame for _, frame in window.backlog], [frameOf(SpeedMotor, "2"), frameOf(SpeedMotor, "3")])
+
+    def test_conflate_keeps_only_the_newest_frame(self):
+        window = self.window(window=len(frameOf(BatteryLvl, 0)) + 4)
+        self.fillCredit(window, BatteryLvl, 0)
+        for value in (1, 2, 3):
+            self.assertTrue(window.send(frameOf(BatteryLvl, value), "conflate"))
+        self.assertEqual(len(window.backlog), 1)
+        self.assertEqual(window.conflated, 2)
+        self.assertEqual(self.readAll(), [0])
+        window.flush()
+        self.assertEqual(self.readAll(), [3])
+
+    def test_rate_limit_drops_without_credit(self):
+        window = self.window(window=len(frameOf(BatteryLvl, 0)) + 4)
+        self.fillCredit(window, BatteryLvl, 0)
+        self.assertFalse(window.send(frameOf(BatteryLvl, 1), "rateLimit"))
+        self.assertEqual(window.dropped, 1)
+        self.assertEqual(len(window.backlog), 0)
+
+    def test_full_pipe_does_not_block(self):
+        # Prozor veci od pipe-a: kredita ima, ali pipe vise ne prima
+        window = self.window(window=1 << 30)
+        frame = frameOf(SpeedMotor, "x" * 4000)
+        backlog = False
+        for _ in range(100):
+            backlog = window.send(frame, "deliver")
+        self.assertTrue(backlog)
+        self.assertGreater(window.buffered, 0)
+        received = 0
+        while True:
+            more = window.flush()
+            while self.reader.poll():
+                self.assertEqual(self.reader.recv_bytes(), frame)
+                received += 1
+            if not more:
+                break
+        self.assertEqual(received, 100)
+
+    def test_frame_larger_than_the_pipe_is_written_in_pieces(self):
+        window = self.window()
+        frame = frameOf(SpeedMotor, "y" * (3 * window.window))
+        received = []
+        reader = threading.Thread(target=lambda: received.append(self.reader.recv_bytes()))
+        reader.start()
+        pending = window.send(frame)
+        while pending:
+            pending = window.flush()
+        reader.join(5)
+        self.assertEqual(received, [frame])
+
+    def test_atomic_window_drops_frames_over_pipe_buf(self):
+        window = self.window(atomic=True)
+        large = frameOf(SpeedMotor, "z" * window.ATOMIC_MAX)
+        self.assertFalse(window.send(large))
+        self.assertEqual(window.dropped, 1)
+        self.assertFalse(self.reader.poll())
+        small = [frameOf(SpeedMotor, str(value)) for value in range(3)]
+        window.sendBatch(small)
+        # Bez batch-a: svaki frame je svoj upis, koji se ne mesa sa upisima publisher-a
+        self.assertEqual([self.reader.recv_bytes() for _ in small], small)
+
+
+if __name__ == "__main__":
+    unittest.main()